@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Plano, Parcela, Consultor, Venda, ControleDeRecebimento
+from .models import Plano, Parcela, Consultor, Venda, ControleDeRecebimento, FluxoCaixaMensal, Exclusao, Tarefa
 
 
 admin.site.register(Plano)
@@ -7,3 +7,6 @@ admin.site.register(Parcela)
 admin.site.register(Consultor)
 admin.site.register(Venda)
 admin.site.register(ControleDeRecebimento)
+admin.site.register(FluxoCaixaMensal)
+admin.site.register(Exclusao)
+admin.site.register(Tarefa)
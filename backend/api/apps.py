@@ -4,3 +4,10 @@ from django.apps import AppConfig # type: ignore
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        if settings.DB_LATENCIA_SIMULADA_MS:
+            from django.db.backends.signals import connection_created
+            from .benchmark import instalar_latencia_simulada
+            connection_created.connect(instalar_latencia_simulada)
@@ -0,0 +1,151 @@
+# backend/api/assincrono.py
+"""
+Leituras assíncronas para servidores ASGI (uvicorn), em api/async/:
+
+- parcelas-atrasadas/: como ParcelasAtrasadasList;
+- venda/ e controlederecebimento/: as listagens, sempre paginadas por
+  cursor (?page_size=, padrão 100), com os mesmos filtros, ?busca= e
+  ?ordenar=;
+- indicadores/: como IndicadoresView.
+
+Sob ASGI, uma requisição à espera do banco não ocupa o processo: as
+consultas passam pelo ORM assíncrono do Django, que as executa numa thread
+própria da requisição, e o mesmo worker atende outras requisições nesse
+meio tempo. Sob WSGI as visões também funcionam, mas sem esse ganho.
+
+Filtros, paginação e serializers são os dos ViewSets e visões síncronas;
+só muda a forma de executar as consultas. A autenticação é só por JWT e
+também não bloqueia: o usuário do token é lido com o ORM assíncrono.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import ControleDeRecebimento
+from .serializers import ControleDeRecebimentoSerializer
+from .views import (
+    ControleDeRecebimentoViewSet,
+    VendaViewSet,
+    completar_indicadores,
+    consultas_indicadores,
+    ler_filtros,
+)
+
+
+class AutenticacaoJWTAssincrona(JWTAuthentication):
+    """JWTAuthentication com o usuário lido por aget(); as verificações são as mesmas."""
+
+    async def autenticar(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        # Assinatura e expiração: só CPU, sem consultas
+        validated_token = self.get_validated_token(raw_token)
+        return await self.obter_usuario(validated_token), validated_token
+
+    async def obter_usuario(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = await self.user_model.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if jwt_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+def _resposta(dados, status=200, cabecalhos=None):
+    # Mesmo JSON das visões do DRF (decimais como texto, datas em ISO 8601)
+    return HttpResponse(
+        JSONRenderer().render(dados), content_type='application/json', status=status, headers=cabecalhos
+    )
+
+
+def leitura_assincrona(visao):
+    """
+    Transforma a corrotina `visao(request) -> dados` numa visão GET que exige
+    JWT válido e responde em JSON. `request` é um Request do DRF, com user e
+    auth preenchidos; APIExceptions viram respostas de erro como no DRF.
+    """
+    autenticacao = AutenticacaoJWTAssincrona()
+
+    @require_GET
+    @wraps(visao)
+    async def executar(request):
+        try:
+            autenticado = await autenticacao.autenticar(request)
+            if autenticado is None:
+                raise NotAuthenticated()
+            requisicao = Request(request)
+            requisicao.user, requisicao.auth = autenticado
+            dados = await visao(requisicao)
+        except APIException as e:
+            cabecalhos = None
+            if isinstance(e, (NotAuthenticated, AuthenticationFailed)):
+                cabecalhos = {'WWW-Authenticate': autenticacao.authenticate_header(request)}
+            detalhe = e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}
+            return _resposta(detalhe, e.status_code, cabecalhos)
+        return _resposta(dados)
+
+    return executar
+
+
+async def _listar(classe, request):
+    # O ViewSet só é instanciado para reaproveitar queryset, filtros, paginação e serializer
+    visao = classe(request=request, format_kwarg=None, action='list', args=(), kwargs={})
+    visao.paginator.sempre_paginar = True
+    queryset = visao.filter_queryset(visao.get_queryset())
+    # A CursorPaginacao lê a página (e os prefetch_related) de uma vez; executada
+    # fora do loop de eventos, como fazem os métodos a* do ORM
+    pagina = await sync_to_async(visao.paginate_queryset)(queryset)
+    return visao.get_paginated_response(visao.get_serializer(pagina, many=True).data).data
+
+
+@leitura_assincrona
+async def listar_vendas(request):
+    return await _listar(VendaViewSet, request)
+
+
+@leitura_assincrona
+async def listar_recebimentos(request):
+    return await _listar(ControleDeRecebimentoViewSet, request)
+
+
+@leitura_assincrona
+async def parcelas_atrasadas(request):
+    parcelas = [parcela async for parcela in ControleDeRecebimento.objects.atrasados().com_status_efetivo()]
+    return ControleDeRecebimentoSerializer(parcelas, many=True).data
+
+
+@leitura_assincrona
+async def indicadores(request):
+    totais, agrupamentos = consultas_indicadores(ler_filtros(request))
+    resultado = {}
+    for nome, (queryset, metricas) in totais.items():
+        resultado[nome] = await queryset.aaggregate(**metricas)
+    for nome, queryset in agrupamentos.items():
+        resultado[nome] = [linha async for linha in queryset]
+    return completar_indicadores(resultado)
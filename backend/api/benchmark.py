@@ -0,0 +1,129 @@
+# backend/api/benchmark.py
+"""
+Dados sintéticos para os comandos seed_benchmark e run_benchmarks.
+
+Tudo é gerado a partir de um random.Random com semente fixa, de modo que
+a mesma semente produz a mesma massa de dados em qualquer banco.
+
+Com DB_LATENCIA_SIMULADA_MS, cada consulta espera também esse tempo, como
+se o banco estivesse em outra máquina (ver instalar_latencia_simulada).
+"""
+
+import datetime
+import time
+from decimal import Decimal
+
+import openpyxl
+from django.conf import settings
+
+from .models import Plano, Parcela, Consultor, Venda
+
+OPERADORAS = (
+    'Unimed', 'Amil', 'Bradesco Saúde', 'SulAmérica', 'Hapvida', 'NotreDame Intermédica',
+    'Porto Saúde', 'Golden Cross', 'Prevent Senior', 'Seguros Unimed',
+)
+NOMES = (
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João',
+    'Juliana', 'Lucas', 'Mariana', 'Nicolas', 'Patrícia', 'Rafael', 'Sofia', 'Thiago', 'Vanessa', 'Vitor',
+)
+SOBRENOMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+)
+TIPOS_EMPRESA = ('PME', 'PME (Odonto)')
+CANAIS = [valor for valor, _ in Venda._meta.get_field('canal_entrada').choices]
+PREFIXO_PROPOSTA = 'SEED-'
+
+
+def nome_pessoa(aleatorio):
+    return f'{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}'
+
+
+def documento(aleatorio, empresa):
+    if empresa:
+        digitos = f'{aleatorio.randrange(10 ** 14):014d}'
+        return f'{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}'
+    digitos = f'{aleatorio.randrange(10 ** 11):011d}'
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def novo_plano(aleatorio, operadora, tipo):
+    """Plano (não salvo) e as porcentagens de suas parcelas."""
+    numero_parcelas = aleatorio.randint(1, 6)
+    porcentagens = [Decimal(100)] + [
+        Decimal(aleatorio.choice((30, 50, 70, 100))) for _ in range(numero_parcelas - 1)
+    ]
+    taxa_tipo = aleatorio.choice(('Valor Fixo', 'Porcentagem'))
+    taxa_valor = Decimal(aleatorio.randint(0, 50)) if taxa_tipo == 'Valor Fixo' else Decimal(aleatorio.randint(0, 10))
+    plano = Plano(
+        operadora=operadora,
+        tipo=tipo,
+        comissionamento_total=sum(porcentagens),
+        numero_parcelas=numero_parcelas,
+        taxa_plano_valor=taxa_valor,
+        taxa_plano_tipo=taxa_tipo,
+    )
+    return plano, porcentagens
+
+
+def parcelas_do_plano(plano, porcentagens):
+    return [
+        Parcela(plano=plano, numero_parcela=numero, porcentagem_parcela=porcentagem)
+        for numero, porcentagem in enumerate(porcentagens, start=1)
+    ]
+
+
+def novo_consultor(aleatorio, numero):
+    nome = nome_pessoa(aleatorio)
+    return Consultor(
+        nome=nome,
+        telefone=f'(11) 9{aleatorio.randrange(10 ** 8):08d}',
+        email=f'consultor{numero}@exemplo.com',
+    )
+
+
+def dados_venda(aleatorio, numero_proposta, plano, consultor_id, hoje, dias):
+    """Campos de uma venda com data nos `dias` anteriores a `hoje` (plano como instância)."""
+    data_venda = hoje - datetime.timedelta(days=aleatorio.randrange(dias))
+    data_vigencia = data_venda + datetime.timedelta(days=aleatorio.randint(0, 30))
+    valor_plano = Decimal(aleatorio.randint(20_000, 500_000)) / 100
+    empresa = plano.tipo in TIPOS_EMPRESA
+    return {
+        'numero_proposta': numero_proposta,
+        'cliente_nome': nome_pessoa(aleatorio),
+        'cliente_documento': documento(aleatorio, empresa),
+        'cliente_email': f'{numero_proposta.lower()}@exemplo.com',
+        'cliente_telefone': f'(11) 9{aleatorio.randrange(10 ** 8):08d}',
+        'plano': plano,
+        'consultor_id': consultor_id,
+        'valor_plano': valor_plano,
+        'desconto_consultor': (valor_plano * Decimal(aleatorio.choice((0, 0, 0, 5, 10))) / 100).quantize(Decimal('0.01')),
+        'data_venda': data_venda,
+        'data_vigencia': data_vigencia,
+        'data_vencimento': data_vigencia + datetime.timedelta(days=30),
+        'canal_entrada': aleatorio.choice(CANAIS),
+    }
+
+
+def escrever_planilha(arquivo, cabecalho, linhas):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(cabecalho)
+    for linha in linhas:
+        ws.append(linha)
+    wb.save(arquivo)
+
+
+def _latencia_simulada(execute, sql, params, many, context):
+    time.sleep(settings.DB_LATENCIA_SIMULADA_MS / 1000)
+    return execute(sql, params, many, context)
+
+
+def instalar_latencia_simulada(sender, connection, **kwargs):
+    """
+    Receptor de connection_created (registrado em ApiConfig.ready quando
+    DB_LATENCIA_SIMULADA_MS > 0): a espera fica em todas as consultas da
+    conexão, inclusive fora das requisições.
+    """
+    if _latencia_simulada not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _latencia_simulada)
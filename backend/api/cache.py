@@ -0,0 +1,70 @@
+# backend/api/cache.py
+"""
+Cache dos dados de referência (Plano, Parcela e Consultor).
+
+Cada modelo tem uma versão guardada no cache: o instante, em nanossegundos,
+da última alteração. As chaves das entradas incluem as versões de que
+dependem, então uma alteração invalida todas de uma vez sem apagar nada;
+as entradas antigas expiram pelo TIMEOUT do cache.
+
+As versões são renovadas pelos sinais post_save/post_delete (ver models.py).
+Gravações em lote (bulk_create, bulk_update, update) não disparam sinais e
+devem chamar invalidar() explicitamente.
+"""
+
+import hashlib
+import threading
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+_local = threading.local()
+
+
+def _chave_versao(modelo):
+    return f'versao:{modelo._meta.label_lower}'
+
+
+def _pendentes():
+    """Modelos alterados na transação em andamento (ainda não publicados)."""
+    if not connection.in_atomic_block or not hasattr(_local, 'pendentes'):
+        _local.pendentes = set()
+    return _local.pendentes
+
+
+def versoes(*modelos):
+    """
+    Versões atuais dos modelos, na ordem informada. Retorna None quando algum
+    deles foi alterado na transação em andamento: o cache não deve ser usado,
+    pois as outras conexões ainda não enxergam a alteração.
+    """
+    if _pendentes().intersection(modelos):
+        return None
+    chaves = [_chave_versao(modelo) for modelo in modelos]
+    encontradas = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in encontradas:
+            valor = time.time_ns()
+            cache.add(chave, valor, timeout=None)
+            encontradas[chave] = cache.get(chave, valor)
+    return [encontradas[chave] for chave in chaves]
+
+
+def _renovar(modelos):
+    agora = time.time_ns()
+    cache.set_many({_chave_versao(modelo): agora for modelo in modelos}, timeout=None)
+
+
+def invalidar(*modelos):
+    """Renova as versões dos modelos após o commit da transação atual (ou já, fora de uma)."""
+    if connection.in_atomic_block:
+        _pendentes().update(modelos)
+    transaction.on_commit(partial(_renovar, modelos))
+
+
+def chave(prefixo, versoes_atuais, *partes):
+    """Chave de cache de tamanho fixo para `partes` nas versões informadas."""
+    resumo = hashlib.md5('|'.join(map(str, partes)).encode()).hexdigest()
+    return f"{prefixo}:{'-'.join(map(str, versoes_atuais))}:{resumo}"
@@ -0,0 +1,345 @@
+# backend/api/cronograma.py
+"""
+Geração do cronograma de recebimentos (ControleDeRecebimento) de uma venda.
+
+O cronograma é calculado em memória e gravado com bulk_create/bulk_update,
+alterando apenas as parcelas cujo valor, data prevista ou parcela do plano
+mudaram. Dados já registrados (data_recebimento, status, numero_extrato)
+são preservados.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import chave, versoes
+from .fluxo_caixa import adicionar_recebimentos, atualizando
+from .models import Parcela, Venda, ControleDeRecebimento
+
+PRAZO_ENTRE_PARCELAS = datetime.timedelta(days=30)
+CENTAVOS = Decimal('0.01')
+
+
+def calcular_cronograma(venda, parcelas, datas_recebimento=None):
+    """
+    Calcula (parcela, valor_parcela, data_prevista) para cada parcela do plano.
+
+    A primeira parcela incide sobre o valor líquido e vence 30 dias após a
+    vigência; as demais incidem sobre o valor do plano sem descontos e vencem
+    30 dias após o recebimento (ou a previsão) da parcela anterior.
+    `datas_recebimento` mapeia numero_parcela -> data já recebida.
+    """
+    datas_recebimento = datas_recebimento or {}
+    valor_liquido = venda.calcular_valor_liquido()
+    valor_plano_sem_descontos = venda.valor_plano
+    data_anterior = None
+
+    cronograma = []
+    for parcela in sorted(parcelas, key=lambda p: p.numero_parcela):
+        percentual = parcela.porcentagem_parcela / Decimal(100)
+        if parcela.numero_parcela == 1:
+            valor_parcela = valor_liquido * percentual
+            data_prevista = venda.data_vigencia + PRAZO_ENTRE_PARCELAS
+        else:
+            valor_parcela = valor_plano_sem_descontos * percentual
+            data_base = data_anterior or (venda.data_vigencia + PRAZO_ENTRE_PARCELAS * (parcela.numero_parcela - 1))
+            data_prevista = data_base + PRAZO_ENTRE_PARCELAS
+
+        cronograma.append((parcela, valor_parcela.quantize(CENTAVOS), data_prevista))
+        data_anterior = datas_recebimento.get(parcela.numero_parcela) or data_prevista
+    return cronograma
+
+
+def _carregar_parcelas(plano_ids=None):
+    parcelas = Parcela.objects.order_by('plano_id', 'numero_parcela')
+    if plano_ids is not None:
+        parcelas = parcelas.filter(plano_id__in=plano_ids)
+    agrupadas = {}
+    for parcela in parcelas:
+        agrupadas.setdefault(parcela.plano_id, []).append(parcela)
+    return agrupadas
+
+
+def parcelas_por_plano(plano_ids=None):
+    """
+    Carrega as parcelas (de todos os planos ou dos informados) agrupadas por
+    plano_id. As parcelas dos planos informados vêm do cache, por plano,
+    enquanto a versão de Parcela não mudar.
+    """
+    if plano_ids is None:
+        return _carregar_parcelas()
+    versoes_atuais = versoes(Parcela)
+    if versoes_atuais is None:
+        return _carregar_parcelas(plano_ids)
+
+    chaves = {chave('parcelas', versoes_atuais, plano_id): plano_id for plano_id in plano_ids}
+    agrupadas = {chaves[c]: parcelas for c, parcelas in cache.get_many(list(chaves)).items()}
+    faltando = [plano_id for plano_id in plano_ids if plano_id not in agrupadas]
+    if faltando:
+        carregadas = _carregar_parcelas(faltando)
+        # Planos sem parcelas também entram no cache, com lista vazia
+        novas = {plano_id: carregadas.get(plano_id, []) for plano_id in faltando}
+        cache.set_many({chave('parcelas', versoes_atuais, plano_id): parcelas for plano_id, parcelas in novas.items()})
+        agrupadas.update(novas)
+    return agrupadas
+
+
+def novos_recebimentos(venda, parcelas):
+    """Instâncias (não salvas) dos recebimentos de uma venda nova."""
+    return [
+        ControleDeRecebimento(
+            venda=venda,
+            parcela=parcela,
+            valor_parcela=valor_parcela,
+            data_prevista_recebimento=data_prevista,
+            status='Não Recebido'
+        )
+        for parcela, valor_parcela, data_prevista in calcular_cronograma(venda, parcelas)
+    ]
+
+
+def criar_vendas_em_lote(vendas, parcelas=None, batch_size=None):
+    """
+    Insere as vendas e os recebimentos gerados com bulk_create, sem passar
+    por Venda.save(). Deve ser chamada dentro de transaction.atomic().
+    `parcelas` é o mapeamento plano_id -> parcelas (ver parcelas_por_plano).
+    """
+    if not vendas:
+        return []
+    for venda in vendas:
+        venda.atualizar_valores()
+    Venda.objects.bulk_create(vendas, batch_size=batch_size)
+    if any(venda.pk is None for venda in vendas):
+        # Bancos sem RETURNING (ex.: MySQL) não preenchem as chaves primárias
+        ids = dict(
+            Venda.objects
+            .filter(numero_proposta__in=[venda.numero_proposta for venda in vendas])
+            .values_list('numero_proposta', 'id')
+        )
+        for venda in vendas:
+            venda.pk = ids[venda.numero_proposta]
+            venda._state.adding = False
+
+    if parcelas is None:
+        parcelas = parcelas_por_plano({venda.plano_id for venda in vendas})
+    recebimentos = []
+    for venda in vendas:
+        recebimentos.extend(novos_recebimentos(venda, parcelas.get(venda.plano_id, [])))
+    ControleDeRecebimento.objects.bulk_create(recebimentos, batch_size=batch_size)
+    adicionar_recebimentos(recebimentos)
+    return recebimentos
+
+
+def diferencas_cronograma(venda, parcelas, recebimentos):
+    """
+    Compara os recebimentos atuais da venda com o cronograma calculado.
+    Retorna (novos, alterados, removidos); os alterados já vêm com os
+    novos valores atribuídos.
+    """
+    existentes = {}
+    sobras = []
+    for recebimento in sorted(recebimentos, key=lambda r: r.pk):
+        numero = recebimento.parcela.numero_parcela
+        if numero in existentes:
+            sobras.append(recebimento)
+        else:
+            existentes[numero] = recebimento
+
+    datas_recebimento = {numero: r.data_recebimento for numero, r in existentes.items() if r.data_recebimento}
+
+    novos, alterados = [], []
+    for parcela, valor_parcela, data_prevista in calcular_cronograma(venda, parcelas, datas_recebimento):
+        recebimento = existentes.pop(parcela.numero_parcela, None)
+        if recebimento is None:
+            novos.append(ControleDeRecebimento(
+                venda=venda,
+                parcela=parcela,
+                valor_parcela=valor_parcela,
+                data_prevista_recebimento=data_prevista,
+                status='Não Recebido'
+            ))
+        elif (recebimento.parcela_id != parcela.id
+              or recebimento.valor_parcela != valor_parcela
+              or recebimento.data_prevista_recebimento != data_prevista):
+            recebimento.parcela = parcela
+            recebimento.valor_parcela = valor_parcela
+            recebimento.data_prevista_recebimento = data_prevista
+            alterados.append(recebimento)
+
+    return novos, alterados, sobras + list(existentes.values())
+
+
+def sincronizar_recebimentos_em_lote(vendas, parcelas=None, batch_size=None):
+    """
+    Ajusta os recebimentos de várias vendas ao cronograma atual de seus
+    planos com uma consulta de leitura e um bulk_create/bulk_update/delete.
+    """
+    if not vendas:
+        return [], [], []
+    if parcelas is None:
+        parcelas = parcelas_por_plano({venda.plano_id for venda in vendas})
+
+    recebimentos_por_venda = {}
+    recebimentos = ControleDeRecebimento.objects.filter(venda__in=[venda.pk for venda in vendas]).select_related('parcela')
+    for recebimento in recebimentos:
+        recebimentos_por_venda.setdefault(recebimento.venda_id, []).append(recebimento)
+
+    novos, alterados, removidos = [], [], []
+    for venda in vendas:
+        diferencas = diferencas_cronograma(
+            venda, parcelas.get(venda.plano_id, []), recebimentos_por_venda.get(venda.pk, [])
+        )
+        novos.extend(diferencas[0])
+        alterados.extend(diferencas[1])
+        removidos.extend(diferencas[2])
+
+    if not (novos or alterados or removidos):
+        return novos, alterados, removidos
+    with atualizando(Q(venda_id__in=[venda.pk for venda in vendas])):
+        if removidos:
+            ControleDeRecebimento.objects.filter(pk__in=[r.pk for r in removidos]).delete()
+        if alterados:
+            agora = timezone.now()
+            for recebimento in alterados:
+                recebimento.updated_at = agora
+            ControleDeRecebimento.objects.bulk_update(
+                alterados, ['parcela', 'valor_parcela', 'data_prevista_recebimento', 'updated_at'],
+                batch_size=batch_size
+            )
+        if novos:
+            ControleDeRecebimento.objects.bulk_create(novos, batch_size=batch_size)
+    return novos, alterados, removidos
+
+
+def sincronizar_recebimentos(venda):
+    """Ajusta os recebimentos de uma venda ao cronograma atual do plano."""
+    return sincronizar_recebimentos_em_lote([venda])
+
+
+def recalcular_datas_previstas(recebimentos, a_partir_de):
+    """
+    Reprograma em memória as parcelas posteriores a `a_partir_de`: cada uma
+    vence 30 dias após o recebimento (ou a previsão) da anterior.
+    `recebimentos` deve conter as parcelas da venda ordenadas pelo número.
+    Retorna as instâncias cuja data prevista mudou.
+    """
+    alterados = []
+    data_anterior = None
+    for recebimento in recebimentos:
+        numero = recebimento.parcela.numero_parcela
+        if numero > a_partir_de and data_anterior is not None:
+            nova_data_prevista = data_anterior + PRAZO_ENTRE_PARCELAS
+            if recebimento.data_prevista_recebimento != nova_data_prevista:
+                recebimento.data_prevista_recebimento = nova_data_prevista
+                alterados.append(recebimento)
+        if numero >= a_partir_de:
+            data_anterior = recebimento.data_recebimento or recebimento.data_prevista_recebimento
+    return alterados
+
+
+def propagar_datas_previstas(venda_id, a_partir_de):
+    """Carrega as parcelas da venda uma vez e grava as novas previsões com um único bulk_update."""
+    recebimentos = list(
+        ControleDeRecebimento.objects
+        .filter(venda_id=venda_id, parcela__numero_parcela__gte=a_partir_de)
+        .select_related('parcela')
+        .order_by('parcela__numero_parcela')
+    )
+    alterados = recalcular_datas_previstas(recebimentos, a_partir_de)
+    if alterados:
+        agora = timezone.now()
+        for recebimento in alterados:
+            recebimento.updated_at = agora
+        with atualizando(Q(pk__in=[r.pk for r in alterados])):
+            ControleDeRecebimento.objects.bulk_update(alterados, ['data_prevista_recebimento', 'updated_at'])
+    return alterados
+
+
+def registrar_recebimentos(marcacoes):
+    """
+    Marca vários recebimentos como 'Recebido' em uma transação.
+
+    `marcacoes` mapeia o ID do recebimento para (data_recebimento,
+    numero_extrato); numero_extrato None mantém o valor atual. Os
+    recebimentos das vendas afetadas são travados e carregados de uma vez,
+    as datas previstas das parcelas seguintes são recalculadas em memória
+    (como faria a propagação de cada marcação isolada) e tudo é gravado com
+    um único bulk_update. Retorna os IDs encontrados.
+    """
+    with transaction.atomic():
+        venda_ids = set(
+            ControleDeRecebimento.objects.filter(pk__in=marcacoes).values_list('venda_id', flat=True)
+        )
+        # Sem JOIN no SELECT ... FOR UPDATE: só os recebimentos ficam travados
+        recebimentos = list(ControleDeRecebimento.objects.select_for_update().filter(venda_id__in=venda_ids))
+        parcelas = Parcela.objects.in_bulk({recebimento.parcela_id for recebimento in recebimentos})
+        por_venda = {}
+        for recebimento in recebimentos:
+            recebimento.parcela = parcelas[recebimento.parcela_id]
+            por_venda.setdefault(recebimento.venda_id, []).append(recebimento)
+
+        agora = timezone.now()
+        encontrados = set()
+        alterados = {}
+        for recebimentos_da_venda in por_venda.values():
+            recebimentos_da_venda.sort(key=lambda recebimento: recebimento.parcela.numero_parcela)
+            marcados = [recebimento for recebimento in recebimentos_da_venda if recebimento.pk in marcacoes]
+            if not marcados:
+                continue
+            for recebimento in marcados:
+                data_recebimento, numero_extrato = marcacoes[recebimento.pk]
+                recebimento.status = 'Recebido'
+                recebimento.data_recebimento = data_recebimento
+                if numero_extrato is not None:
+                    recebimento.numero_extrato = numero_extrato
+                alterados[recebimento.pk] = recebimento
+                encontrados.add(recebimento.pk)
+            a_partir_de = marcados[0].parcela.numero_parcela
+            for recebimento in recalcular_datas_previstas(recebimentos_da_venda, a_partir_de):
+                alterados[recebimento.pk] = recebimento
+
+        for recebimento in alterados.values():
+            recebimento.updated_at = agora
+        with atualizando(Q(venda_id__in=venda_ids)):
+            ControleDeRecebimento.objects.bulk_update(
+                list(alterados.values()),
+                ['status', 'data_recebimento', 'numero_extrato', 'data_prevista_recebimento', 'updated_at'],
+                batch_size=1000,
+            )
+    return encontrados
+
+
+def regenerar_cronogramas(plano_id=None, batch_size=500, progresso=None):
+    """
+    Ajusta os cronogramas de todas as vendas (ou das vendas de um plano) ao
+    cronograma atual, em blocos de `batch_size` vendas lidos por chave
+    primária; cada bloco é gravado em sua própria transação.
+    `progresso(processadas, total)` é chamada após cada bloco.
+    Retorna a quantidade de recebimentos criados, alterados e removidos.
+    """
+    vendas = Venda.objects.select_related('plano')
+    if plano_id is not None:
+        vendas = vendas.filter(plano_id=plano_id)
+    total = vendas.count()
+    parcelas = parcelas_por_plano(None if plano_id is None else [plano_id])
+
+    criados = alterados = removidos = processadas = 0
+    ultimo_id = 0
+    while True:
+        bloco = list(vendas.filter(pk__gt=ultimo_id).order_by('pk')[:batch_size])
+        if not bloco:
+            break
+        with transaction.atomic():
+            diferencas = sincronizar_recebimentos_em_lote(bloco, parcelas, batch_size=batch_size)
+        criados += len(diferencas[0])
+        alterados += len(diferencas[1])
+        removidos += len(diferencas[2])
+        processadas += len(bloco)
+        ultimo_id = bloco[-1].pk
+        if progresso is not None:
+            progresso(processadas, total)
+    return criados, alterados, removidos
@@ -0,0 +1,112 @@
+# backend/api/exclusoes.py
+"""
+Exclusões em conjunto.
+
+Os sinais post_delete disparam um a um para cada registro excluído,
+inclusive os excluídos em cascata. `excluindo()` envolve a exclusão
+inteira: os sinais apenas acumulam os registros de Exclusao (tombstones)
+e as vendas a renovar, gravados ao final com um bulk_create e um único
+UPDATE, e a contribuição dos recebimentos removidos ao FluxoCaixaMensal é
+descontada de uma vez (api/fluxo_caixa.py). Model.delete() e QuerySet.delete() dos modelos com
+ExclusaoEmConjuntoMixin / ExclusaoEmConjuntoQuerySet já passam por aqui.
+"""
+
+import contextvars
+from contextlib import contextmanager, nullcontext
+
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+# Exclusões acumuladas pelo excluindo() em andamento (None fora dele)
+_pendentes = contextvars.ContextVar('exclusoes_pendentes', default=None)
+
+
+class _Pendentes:
+    def __init__(self):
+        self.exclusoes = []
+        self.vendas = set()
+
+    def gravar(self):
+        from .models import Exclusao, Venda
+        if self.exclusoes:
+            Exclusao.objects.bulk_create(
+                [Exclusao(modelo=modelo, objeto_id=objeto_id) for modelo, objeto_id in self.exclusoes],
+                batch_size=1000
+            )
+        if self.vendas:
+            # Vendas excluídas junto com os recebimentos já não existem e ficam de fora
+            Venda.objects.filter(pk__in=self.vendas).update(updated_at=timezone.now())
+
+
+def _contabilizando(modelo, ids):
+    """Contexto que desconta do fluxo de caixa os recebimentos removidos pela exclusão."""
+    from . import fluxo_caixa
+    from .models import Plano, Parcela, Consultor, Venda, ControleDeRecebimento
+    if modelo in (Plano, Consultor):
+        # As linhas do resumo do plano ou consultor são excluídas em cascata
+        return fluxo_caixa.suspenso()
+    if modelo is Venda:
+        fluxo_caixa.descontar_vendas(ids)
+        return fluxo_caixa.suspenso()
+    if modelo is Parcela:
+        return fluxo_caixa.atualizando(Q(parcela_id__in=ids))
+    if modelo is ControleDeRecebimento:
+        return fluxo_caixa.atualizando(Q(pk__in=ids))
+    return nullcontext()
+
+
+@contextmanager
+def excluindo(modelo, ids):
+    """
+    Exclusão dos registros `ids` (lista ou subconsulta de pks) de `modelo`
+    feita no bloco. Acumula os registros das exclusões, inclusive em
+    cascata, e os grava ao final. Blocos aninhados são cobertos pelo externo.
+    """
+    if _pendentes.get() is not None:
+        yield
+        return
+    pendentes = _Pendentes()
+    with transaction.atomic(), _contabilizando(modelo, ids):
+        token = _pendentes.set(pendentes)
+        try:
+            yield
+        finally:
+            _pendentes.reset(token)
+        pendentes.gravar()
+
+
+def registrar(modelo, objeto_id, venda_id=None):
+    """
+    Registra a exclusão de um registro sincronizado; `venda_id` é a venda
+    cuja representação mudou (a do recebimento excluído).
+    """
+    pendentes = _pendentes.get()
+    # Exclusão fora de excluindo(): grava na hora
+    imediato = pendentes is None
+    if imediato:
+        pendentes = _Pendentes()
+    pendentes.exclusoes.append((modelo, objeto_id))
+    if venda_id is not None:
+        pendentes.vendas.add(venda_id)
+    if imediato:
+        pendentes.gravar()
+
+
+class ExclusaoEmConjuntoQuerySet(models.QuerySet):
+    """QuerySet cujo delete() é feito dentro de excluindo()."""
+
+    def delete(self):
+        with excluindo(self.model, self.order_by().values('pk')):
+            return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class ExclusaoEmConjuntoMixin:
+    """Mixin de modelo: delete() dentro de excluindo()."""
+
+    def delete(self, *args, **kwargs):
+        with excluindo(type(self), [self.pk]):
+            return super().delete(*args, **kwargs)
@@ -0,0 +1,223 @@
+# backend/api/exportacao.py
+"""
+Exportação em streaming de vendas e recebimentos (CSV, XLSX e Parquet).
+
+As linhas são lidas em blocos por chave primária (WHERE id > último
+ORDER BY id LIMIT n) com values_list, o que mantém a memória constante
+em qualquer banco — inclusive no MySQL, cujo driver carrega o resultado
+inteiro de uma consulta mesmo com .iterator().
+"""
+
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+# (cabeçalho, campo para values_list, tipo)
+COLUNAS_VENDAS = [
+    ('ID', 'id', 'inteiro'),
+    ('Número da Proposta', 'numero_proposta', 'texto'),
+    ('Cliente', 'cliente_nome', 'texto'),
+    ('CPF/CNPJ', 'cliente_documento', 'texto'),
+    ('E-mail', 'cliente_email', 'texto'),
+    ('Telefone', 'cliente_telefone', 'texto'),
+    ('Operadora', 'plano__operadora', 'texto'),
+    ('Tipo', 'plano__tipo', 'texto'),
+    ('Consultor', 'consultor__nome', 'texto'),
+    ('Valor do Plano', 'valor_plano', 'decimal'),
+    ('Desconto do Consultor', 'desconto_consultor', 'decimal'),
+    ('Valor Líquido', 'valor_liquido', 'decimal'),
+    ('Comissão Prevista', 'comissao_prevista', 'decimal'),
+    ('Data da Venda', 'data_venda', 'data'),
+    ('Data de Vigência', 'data_vigencia', 'data'),
+    ('Data de Vencimento', 'data_vencimento', 'data'),
+    ('Canal de Entrada', 'canal_entrada', 'texto'),
+]
+
+COLUNAS_RECEBIMENTOS = [
+    ('ID', 'id', 'inteiro'),
+    ('Número da Proposta', 'venda__numero_proposta', 'texto'),
+    ('Cliente', 'venda__cliente_nome', 'texto'),
+    ('Consultor', 'venda__consultor__nome', 'texto'),
+    ('Operadora', 'venda__plano__operadora', 'texto'),
+    ('Tipo', 'venda__plano__tipo', 'texto'),
+    ('Parcela', 'parcela__numero_parcela', 'inteiro'),
+    ('Valor da Parcela', 'valor_parcela', 'decimal'),
+    ('Data Prevista', 'data_prevista_recebimento', 'data'),
+    ('Data de Recebimento', 'data_recebimento', 'data'),
+    ('Status', 'status', 'texto'),
+    ('Número do Extrato', 'numero_extrato', 'texto'),
+]
+
+
+def filtrar_vendas(queryset, data_inicio=None, data_fim=None, consultor=None):
+    if data_inicio:
+        queryset = queryset.filter(data_venda__gte=data_inicio)
+    if data_fim:
+        queryset = queryset.filter(data_venda__lte=data_fim)
+    if consultor:
+        queryset = queryset.filter(consultor_id=consultor)
+    return queryset
+
+
+def filtrar_recebimentos(queryset, data_inicio=None, data_fim=None, consultor=None):
+    if data_inicio:
+        queryset = queryset.filter(data_prevista_recebimento__gte=data_inicio)
+    if data_fim:
+        queryset = queryset.filter(data_prevista_recebimento__lte=data_fim)
+    if consultor:
+        queryset = queryset.filter(venda__consultor_id=consultor)
+    return queryset
+
+
+def iterar_em_blocos(queryset, colunas, chunk_size=2000):
+    """Gera listas de tuplas (na ordem de `colunas`) lendo no máximo `chunk_size` linhas por consulta."""
+    campos = [campo for _, campo, _ in colunas]
+    indice_id = campos.index('id')
+    ultimo_id = None
+    while True:
+        bloco = queryset.order_by('id')
+        if ultimo_id is not None:
+            bloco = bloco.filter(id__gt=ultimo_id)
+        linhas = list(bloco.values_list(*campos)[:chunk_size])
+        if not linhas:
+            return
+        yield linhas
+        ultimo_id = linhas[-1][indice_id]
+
+
+class EscritorCSV:
+    def __init__(self, arquivo, colunas):
+        self.arquivo = open(arquivo, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.arquivo)
+        self.writer.writerow([cabecalho for cabecalho, _, _ in colunas])
+
+    def escrever(self, linhas):
+        self.writer.writerows(linhas)
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+class EscritorXLSX:
+    def __init__(self, arquivo, colunas):
+        import openpyxl
+
+        self.arquivo = arquivo
+        # Modo write-only: as linhas vão para disco à medida que são adicionadas
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append([cabecalho for cabecalho, _, _ in colunas])
+
+    def escrever(self, linhas):
+        for linha in linhas:
+            self.sheet.append(linha)
+
+    def fechar(self):
+        self.workbook.save(self.arquivo)
+
+
+class EscritorParquet:
+    def __init__(self, arquivo, colunas):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise CommandError("A exportação em Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+
+        tipos = {
+            'inteiro': pa.int64(),
+            'texto': pa.string(),
+            'decimal': pa.decimal128(14, 2),
+            'data': pa.date32(),
+        }
+        self.pa = pa
+        self.schema = pa.schema([(cabecalho, tipos[tipo]) for cabecalho, _, tipo in colunas])
+        self.writer = pq.ParquetWriter(arquivo, self.schema)
+
+    def escrever(self, linhas):
+        # Cada bloco vira um row group colunar
+        colunas = list(zip(*linhas))
+        tabela = self.pa.Table.from_arrays(
+            [self.pa.array(valores, type=campo.type) for valores, campo in zip(colunas, self.schema)],
+            schema=self.schema
+        )
+        self.writer.write_table(tabela)
+
+    def fechar(self):
+        self.writer.close()
+
+
+ESCRITORES = {
+    'csv': EscritorCSV,
+    'xlsx': EscritorXLSX,
+    'parquet': EscritorParquet,
+}
+
+
+class ComandoExportacao(BaseCommand):
+    """
+    Base dos comandos export_vendas e export_recebimentos, que definem o
+    `modelo` exportado e o `filtro` (filtrar_vendas ou filtrar_recebimentos)
+    aplicado às opções --data-inicio, --data-fim e --consultor.
+    """
+    modelo = None
+    filtro = None
+    colunas = None
+    descricao = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output_file',
+            type=str,
+            help='Caminho do arquivo de saída (.csv, .xlsx ou .parquet)'
+        )
+        parser.add_argument(
+            '--formato',
+            choices=sorted(ESCRITORES),
+            help='Formato de saída; por padrão é deduzido da extensão do arquivo'
+        )
+        parser.add_argument('--data-inicio', type=str, help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--data-fim', type=str, help='Data final (AAAA-MM-DD)')
+        parser.add_argument('--consultor', type=int, help='ID do consultor')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Linhas lidas do banco por consulta (padrão: 2000)'
+        )
+
+    def handle(self, *args, **options):
+        output_file = options['output_file']
+        formato = options['formato'] or os.path.splitext(output_file)[1].lstrip('.').lower()
+        if formato not in ESCRITORES:
+            raise CommandError("Formato não reconhecido. Use --formato csv, xlsx ou parquet.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size deve ser maior que zero.")
+
+        datas = {}
+        for nome in ('data_inicio', 'data_fim'):
+            valor = options[nome]
+            if valor:
+                datas[nome] = parse_date(valor)
+                if datas[nome] is None:
+                    raise CommandError(f"--{nome.replace('_', '-')} inválida. Use o formato AAAA-MM-DD.")
+
+        queryset = self.filtro(
+            self.modelo.objects.all(), datas.get('data_inicio'), datas.get('data_fim'), options['consultor']
+        )
+
+        escritor = ESCRITORES[formato](output_file, self.colunas)
+        self.total = 0
+        try:
+            for linhas in iterar_em_blocos(queryset, self.colunas, options['chunk_size']):
+                escritor.escrever(linhas)
+                self.total += len(linhas)
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f"{self.total} linhas exportadas")
+        finally:
+            escritor.fechar()
+        self.stdout.write(self.style.SUCCESS(
+            f"Exportação concluída com sucesso: {self.total} {self.descricao} em {output_file}"
+        ))
@@ -0,0 +1,135 @@
+# backend/api/filtros.py
+"""
+Filtros, ordenação e busca das listagens de vendas e recebimentos, lidos da
+query string.
+
+Cada viewset declara:
+
+- `filtros_periodo`: parâmetro -> campo de data; aceita <parametro>_inicio
+  e <parametro>_fim (AAAA-MM-DD, inclusivos);
+- `filtros_valor`: parâmetro -> (campo, conversor); aceita vários valores
+  separados por vírgula (?status=Atrasado,Não Recebido);
+- `campos_ordenacao`: nome aceito em ?ordenar= -> campo; '-' inverte a
+  ordem. Só campos do próprio modelo: a paginação por cursor lê a posição
+  do primeiro campo na instância;
+- `prefixo_busca`: caminho até a venda ('' ou 'venda__') usado por ?busca=.
+
+?busca= formado só por dígitos e pela pontuação do CPF/CNPJ procura pelo
+prefixo de cliente_documento_normalizado (índice B-tree); caso contrário,
+pelas palavras do nome do cliente (lookup `busca`, que usa o índice
+FULLTEXT no MySQL).
+"""
+
+import re
+
+from django.db.models import Lookup, Q
+from django.db.models.lookups import IContains, IStartsWith
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ParseError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Venda, normalizar_documento
+
+DOCUMENTO = re.compile(r'[\d.\-/\s]*\d[\d.\-/\s]*')
+
+
+class BuscaPalavras(Lookup):
+    """
+    Nomes com palavras que começam por cada termo, ignorando os termos
+    menores que o tamanho mínimo indexado (innodb_ft_min_token_size). No
+    MySQL usa o índice FULLTEXT (MATCH ... AGAINST em modo booleano); nos
+    demais bancos, LIKE 'termo%' OR LIKE '% termo%' para cada termo, com o
+    mesmo resultado para palavras separadas por espaço. Sem termos
+    indexáveis, usa LIKE 'termo%' sobre o nome inteiro, atendido pelo
+    índice B-tree de cliente_nome.
+    """
+    lookup_name = 'busca'
+    TAMANHO_MINIMO = 3
+
+    def _prefixo(self, compiler, connection):
+        return compiler.compile(IStartsWith(self.lhs, self.rhs.strip()))
+
+    def _termos(self):
+        return [termo for termo in re.findall(r'\w+', self.rhs) if len(termo) >= self.TAMANHO_MINIMO]
+
+    def as_mysql(self, compiler, connection):
+        termos = self._termos()
+        if not termos:
+            return self._prefixo(compiler, connection)
+        lhs, params = self.process_lhs(compiler, connection)
+        consulta = ' '.join(f'+{termo}*' for termo in termos)
+        return f'MATCH ({lhs}) AGAINST (%s IN BOOLEAN MODE)', [*params, consulta]
+
+    def as_sql(self, compiler, connection):
+        termos = self._termos()
+        if not termos:
+            return self._prefixo(compiler, connection)
+        condicoes, params = [], []
+        for termo in termos:
+            inicio_nome, params_inicio = compiler.compile(IStartsWith(self.lhs, termo))
+            inicio_palavra, params_palavra = compiler.compile(IContains(self.lhs, f' {termo}'))
+            condicoes.append(f'({inicio_nome} OR {inicio_palavra})')
+            params.extend([*params_inicio, *params_palavra])
+        return ' AND '.join(condicoes), params
+
+
+Venda._meta.get_field('cliente_nome').register_lookup(BuscaPalavras)
+
+
+def filtro_busca(termo, prefixo=''):
+    """Q da busca por CPF/CNPJ (prefixo, só dígitos) ou pelo nome do cliente."""
+    if DOCUMENTO.fullmatch(termo):
+        return Q(**{f'{prefixo}cliente_documento_normalizado__startswith': normalizar_documento(termo)})
+    return Q(**{f'{prefixo}cliente_nome__busca': termo})
+
+
+class FiltroListagem(BaseFilterBackend):
+    parametro_busca = 'busca'
+    parametro_ordenacao = 'ordenar'
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        for parametro, campo in getattr(view, 'filtros_periodo', {}).items():
+            for sufixo, lookup in (('_inicio', 'gte'), ('_fim', 'lte')):
+                valor = params.get(parametro + sufixo)
+                if valor:
+                    data = parse_date(valor)
+                    if data is None:
+                        raise ParseError(f"Parâmetro '{parametro}{sufixo}' inválido. Use o formato AAAA-MM-DD.")
+                    queryset = queryset.filter(**{f'{campo}__{lookup}': data})
+
+        for parametro, (campo, converter) in getattr(view, 'filtros_valor', {}).items():
+            valor = params.get(parametro)
+            if valor:
+                try:
+                    valores = [converter(item.strip()) for item in valor.split(',') if item.strip()]
+                except ValueError:
+                    raise ParseError(f"Parâmetro '{parametro}' inválido.")
+                queryset = queryset.filter(**{f'{campo}__in': valores})
+
+        termo = params.get(self.parametro_busca, '').strip()
+        if termo:
+            queryset = queryset.filter(filtro_busca(termo, getattr(view, 'prefixo_busca', '')))
+
+        if params.get(self.parametro_ordenacao):
+            queryset = queryset.order_by(*self.get_ordering(request, queryset, view))
+        return queryset
+
+    def get_ordering(self, request, queryset, view):
+        # Também consultado pela CursorPaginacao, que pagina na ordem pedida
+        valor = request.query_params.get(self.parametro_ordenacao)
+        if not valor:
+            return ('id',)
+        campos_ordenacao = getattr(view, 'campos_ordenacao', {})
+        ordenacao = []
+        for nome in valor.split(','):
+            nome = nome.strip()
+            campo = campos_ordenacao.get(nome.lstrip('-'))
+            if campo is None:
+                raise ParseError(
+                    f"Ordenação inválida: '{nome}'. Use {', '.join(sorted(campos_ordenacao))} (com '-' para inverter)."
+                )
+            ordenacao.append(f'-{campo}' if nome.startswith('-') else campo)
+        # Desempate pela chave primária, para a ordem ser estável entre as páginas
+        ordenacao.append('-id' if ordenacao[0].startswith('-') else 'id')
+        return tuple(ordenacao)
@@ -0,0 +1,210 @@
+# backend/api/fluxo_caixa.py
+"""
+Manutenção incremental do resumo FluxoCaixaMensal.
+
+Cada recebimento contribui com (valor_parcela, 1) para a chave
+(mês da data prevista, plano, consultor, status). As rotinas que gravam
+recebimentos em lote usam `atualizando(filtro)`: as contribuições dos
+recebimentos do filtro são somadas antes e depois da operação e apenas a
+diferença é aplicada ao resumo. Gravações isoladas (save/delete de um
+recebimento) são tratadas pelos sinais em models.py.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Venda, ControleDeRecebimento, FluxoCaixaMensal
+
+# Indica que uma operação em lote já está contabilizando as alterações
+_em_lote = contextvars.ContextVar('fluxo_caixa_em_lote', default=False)
+
+# Chaves do resumo lidas e gravadas por consulta em aplicar()
+TAMANHO_BLOCO_CHAVES = 500
+
+
+def contribuicoes(filtro):
+    """Soma (valor, quantidade) por chave dos recebimentos que atendem ao filtro."""
+    linhas = (
+        ControleDeRecebimento.objects.filter(filtro)
+        .annotate(mes=TruncMonth('data_prevista_recebimento'))
+        .values_list('mes', 'venda__plano_id', 'venda__consultor_id', 'status')
+        .annotate(valor=Sum('valor_parcela'), quantidade=Count('id'))
+        .order_by()
+    )
+    return {(mes, plano_id, consultor_id, status): [valor, quantidade]
+            for mes, plano_id, consultor_id, status, valor, quantidade in linhas}
+
+
+def _acumular(deltas, chave, valor, quantidade):
+    atual = deltas.setdefault(chave, [Decimal('0.00'), 0])
+    atual[0] += valor
+    atual[1] += quantidade
+
+
+def _filtro_chaves(chaves):
+    filtro = Q(pk__in=[])
+    for mes, plano_id, consultor_id, status in chaves:
+        filtro |= Q(mes=mes, plano_id=plano_id, consultor_id=consultor_id, status=status)
+    return filtro
+
+
+def _somar_existentes(deltas):
+    """
+    Soma os deltas às linhas já existentes (um SELECT ... FOR UPDATE e um
+    bulk_update por bloco de chaves) e devolve os deltas das chaves sem linha.
+    """
+    faltantes = dict(deltas)
+    chaves = list(deltas)
+    for inicio in range(0, len(chaves), TAMANHO_BLOCO_CHAVES):
+        linhas = list(
+            FluxoCaixaMensal.objects.select_for_update()
+            .filter(_filtro_chaves(chaves[inicio:inicio + TAMANHO_BLOCO_CHAVES]))
+            .order_by('pk')
+        )
+        for linha in linhas:
+            valor, quantidade = faltantes.pop((linha.mes, linha.plano_id, linha.consultor_id, linha.status))
+            linha.valor_total += valor
+            linha.quantidade += quantidade
+        FluxoCaixaMensal.objects.bulk_update(linhas, ['valor_total', 'quantidade'])
+    return faltantes
+
+
+def aplicar(deltas):
+    """Soma os deltas às linhas do resumo, criando as que ainda não existem."""
+    deltas = {chave: (valor, quantidade) for chave, (valor, quantidade) in deltas.items() if valor or quantidade}
+    if not deltas:
+        return
+    with transaction.atomic():
+        faltantes = _somar_existentes(deltas)
+        if not faltantes:
+            return
+        novas = [
+            FluxoCaixaMensal(
+                mes=mes, plano_id=plano_id, consultor_id=consultor_id, status=status,
+                valor_total=valor, quantidade=quantidade
+            )
+            for (mes, plano_id, consultor_id, status), (valor, quantidade) in faltantes.items()
+        ]
+        try:
+            with transaction.atomic():
+                FluxoCaixaMensal.objects.bulk_create(novas, batch_size=TAMANHO_BLOCO_CHAVES)
+        except IntegrityError:
+            # Alguma chave foi criada por outra transação entre o SELECT e o INSERT:
+            # agora ela já existe e é somada; as demais são criadas
+            faltantes = _somar_existentes(faltantes)
+            FluxoCaixaMensal.objects.bulk_create(
+                [linha for linha in novas if (linha.mes, linha.plano_id, linha.consultor_id, linha.status) in faltantes],
+                batch_size=TAMANHO_BLOCO_CHAVES
+            )
+
+
+@contextmanager
+def atualizando(filtro):
+    """
+    Contabiliza no resumo as alterações feitas no bloco sobre os recebimentos
+    que atendem a `filtro` (um Q). Blocos aninhados são cobertos pelo externo.
+    """
+    if _em_lote.get():
+        yield
+        return
+    antes = contribuicoes(filtro)
+    token = _em_lote.set(True)
+    try:
+        yield
+    finally:
+        _em_lote.reset(token)
+    deltas = contribuicoes(filtro)
+    for chave, (valor, quantidade) in antes.items():
+        _acumular(deltas, chave, -valor, -quantidade)
+    aplicar(deltas)
+
+
+def em_lote():
+    return _em_lote.get()
+
+
+@contextmanager
+def suspenso():
+    """
+    Desliga a contabilização incremental no bloco. Para cargas muito grandes
+    (ex.: seed_benchmark), em que reconstruir() ao final sai mais barato que
+    os deltas de cada lote; quem usa deve chamá-la depois do bloco.
+    """
+    token = _em_lote.set(True)
+    try:
+        yield
+    finally:
+        _em_lote.reset(token)
+
+
+def _chave(data_prevista, status, plano_id, consultor_id):
+    return (data_prevista.replace(day=1), plano_id, consultor_id, status)
+
+
+def adicionar_recebimentos(recebimentos):
+    """Contabiliza recebimentos recém-criados em lote (com a venda já carregada em memória)."""
+    if _em_lote.get():
+        return
+    deltas = {}
+    for recebimento in recebimentos:
+        venda = recebimento.venda
+        chave = _chave(recebimento.data_prevista_recebimento, recebimento.status, venda.plano_id, venda.consultor_id)
+        _acumular(deltas, chave, recebimento.valor_parcela, 1)
+    aplicar(deltas)
+
+
+def registrar_alteracao(recebimento, valores_anteriores, venda_id=None):
+    """
+    Contabiliza a gravação (ou exclusão, com recebimento=None) de um único
+    recebimento. `valores_anteriores` vem de valores_fluxo_caixa().
+    """
+    if _em_lote.get():
+        return
+    valores_atuais = recebimento.valores_fluxo_caixa() if recebimento is not None else None
+    if valores_atuais == valores_anteriores:
+        return
+
+    venda_id = venda_id or recebimento.venda_id
+    plano_id, consultor_id = Venda.objects.values_list('plano_id', 'consultor_id').get(pk=venda_id)
+    deltas = {}
+    if valores_anteriores is not None and valores_anteriores[0] is not None:
+        data_prevista, status, valor = valores_anteriores
+        _acumular(deltas, _chave(data_prevista, status, plano_id, consultor_id), -Decimal(valor), -1)
+    if valores_atuais is not None:
+        data_prevista, status, valor = valores_atuais
+        _acumular(deltas, _chave(data_prevista, status, plano_id, consultor_id), Decimal(valor), 1)
+    aplicar(deltas)
+
+
+def descontar_vendas(venda_ids):
+    """Remove do resumo a contribuição de vendas que serão excluídas."""
+    if _em_lote.get():
+        return
+    deltas = {}
+    for chave, (valor, quantidade) in contribuicoes(Q(venda_id__in=venda_ids)).items():
+        _acumular(deltas, chave, -valor, -quantidade)
+    aplicar(deltas)
+
+
+def reconstruir(batch_size=1000):
+    """Recalcula todo o resumo a partir dos recebimentos."""
+    with transaction.atomic():
+        FluxoCaixaMensal.objects.all().delete()
+        linhas = []
+        total = 0
+        for (mes, plano_id, consultor_id, status), (valor, quantidade) in contribuicoes(Q()).items():
+            linhas.append(FluxoCaixaMensal(
+                mes=mes, plano_id=plano_id, consultor_id=consultor_id, status=status,
+                valor_total=valor, quantidade=quantidade
+            ))
+            if len(linhas) >= batch_size:
+                FluxoCaixaMensal.objects.bulk_create(linhas)
+                total += len(linhas)
+                linhas = []
+        FluxoCaixaMensal.objects.bulk_create(linhas)
+        return total + len(linhas)
@@ -0,0 +1,168 @@
+# backend/api/importacao.py
+"""
+Leitura e validação das linhas de planilhas de vendas (XLSX ou CSV).
+
+Este módulo não acessa o banco nem depende do Django configurado, para que
+as funções possam rodar em processos auxiliares (import_vendas --workers).
+"""
+
+import csv
+import datetime
+import os
+from collections import deque
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+
+COLUNAS_VENDA = (
+    'numero_proposta', 'cliente_nome', 'cliente_documento', 'cliente_email', 'cliente_telefone',
+    'plano_id', 'consultor_id', 'valor_plano', 'desconto_consultor',
+    'data_venda', 'data_vigencia', 'data_vencimento', 'canal_entrada',
+)
+
+
+class LinhaInvalida(Exception):
+    """Linha da planilha que deve ser ignorada (campo ausente ou referência inexistente)."""
+
+
+def eh_csv(arquivo):
+    return os.path.splitext(arquivo)[1].lower() == '.csv'
+
+
+def converter_data(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    return datetime.datetime.strptime(str(valor).strip(), "%Y-%m-%d").date()
+
+
+def converter_decimal(valor):
+    try:
+        return Decimal(str(valor).strip())
+    except InvalidOperation:
+        raise ValueError(f"valor numérico inválido: {valor!r}")
+
+
+def converter_id(valor):
+    if isinstance(valor, int):
+        return valor
+    return int(Decimal(str(valor).strip()))
+
+
+def contar_linhas(arquivo):
+    """Número da última linha da planilha (inclui o cabeçalho); None se desconhecido."""
+    if eh_csv(arquivo):
+        return None
+    wb = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        return wb.active.max_row
+    finally:
+        wb.close()
+
+
+def ler_linhas(arquivo, min_row=2):
+    """Gera (número da linha, valores) a partir da linha `min_row`, sem carregar o arquivo inteiro."""
+    if eh_csv(arquivo):
+        with open(arquivo, newline='', encoding='utf-8-sig') as csvfile:
+            for idx, row in enumerate(csv.reader(csvfile), start=1):
+                if idx >= min_row:
+                    yield idx, [valor if valor != '' else None for valor in row]
+        return
+
+    wb = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        sheet = wb.active  # Assume que os dados estão na primeira aba
+        for idx, row in enumerate(sheet.iter_rows(min_row=min_row, values_only=True), start=min_row):
+            yield idx, row
+    finally:
+        wb.close()
+
+
+def normalizar_venda(row, planos, consultores):
+    """
+    Converte uma linha da planilha nos valores de uma Venda.
+    `planos` e `consultores` são os conjuntos de IDs existentes.
+    """
+    row = tuple(row) + (None,) * (len(COLUNAS_VENDA) - len(row))
+    dados = dict(zip(COLUNAS_VENDA, row))
+
+    # Validação básica: campos obrigatórios
+    if (not dados['numero_proposta'] or not dados['cliente_nome'] or not dados['plano_id']
+            or not dados['consultor_id'] or not dados['data_venda']):
+        raise LinhaInvalida("campos obrigatórios ausentes.")
+    if dados['valor_plano'] is None:
+        raise LinhaInvalida("valor_plano ausente.")
+
+    plano_id = converter_id(dados['plano_id'])
+    if plano_id not in planos:
+        raise LinhaInvalida(f"Plano com ID {dados['plano_id']} não encontrado.")
+    consultor_id = converter_id(dados['consultor_id'])
+    if consultor_id not in consultores:
+        raise LinhaInvalida(f"Consultor com ID {dados['consultor_id']} não encontrado.")
+
+    desconto = dados['desconto_consultor']
+    dados.update(
+        numero_proposta=str(dados['numero_proposta']),
+        cliente_documento=dados['cliente_documento'] or '',
+        plano_id=plano_id,
+        consultor_id=consultor_id,
+        valor_plano=converter_decimal(dados['valor_plano']),
+        desconto_consultor=converter_decimal(desconto) if desconto is not None else Decimal("0.00"),
+        data_venda=converter_data(dados['data_venda']),
+        data_vigencia=converter_data(dados['data_vigencia']),
+        data_vencimento=converter_data(dados['data_vencimento']),
+        canal_entrada=dados['canal_entrada'] or "Indicação",
+    )
+    return dados
+
+
+def processar_linhas(linhas, planos, consultores):
+    """
+    Normaliza uma sequência de (idx, valores). Retorna (idx, dados, erro, ignorada):
+    `ignorada` indica linha inválida (aviso) em vez de erro de conversão.
+    """
+    resultados = []
+    for idx, row in linhas:
+        try:
+            resultados.append((idx, normalizar_venda(row, planos, consultores), None, False))
+        except LinhaInvalida as e:
+            resultados.append((idx, None, str(e), True))
+        except Exception as e:
+            resultados.append((idx, None, str(e), False))
+    return resultados
+
+
+# Estado dos processos auxiliares, definido por inicializar_processo
+_referencias = {}
+
+
+def inicializar_processo(planos, consultores):
+    _referencias['planos'] = planos
+    _referencias['consultores'] = consultores
+
+
+def processar_lote(linhas):
+    return processar_linhas(linhas, _referencias['planos'], _referencias['consultores'])
+
+
+def mapear_em_ordem(executor, funcao, itens, limite):
+    """Como executor.map, mas mantendo no máximo `limite` tarefas pendentes (memória limitada)."""
+    pendentes = deque()
+    for item in itens:
+        pendentes.append(executor.submit(funcao, item))
+        if len(pendentes) >= limite:
+            yield pendentes.popleft().result()
+    while pendentes:
+        yield pendentes.popleft().result()
+
+
+def agrupar(iteravel, tamanho):
+    lote = []
+    for item in iteravel:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
@@ -0,0 +1,50 @@
+# backend/api/management/commands/backfill_valores.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from api.models import Venda
+
+
+class Command(BaseCommand):
+    help = 'Preenche os campos calculados (valor_liquido, comissao_prevista, documento normalizado) das vendas existentes, em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de vendas atualizadas por transação (padrão: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size deve ser maior que zero.")
+
+        vendas = (
+            Venda.objects.select_related('plano')
+            .only('id', 'valor_plano', 'desconto_consultor', 'cliente_documento', 'updated_at', 'plano', *Venda.CAMPOS_CALCULADOS)
+            .order_by('id')
+        )
+        total = 0
+        ultimo_id = 0
+        while True:
+            lote = list(vendas.filter(id__gt=ultimo_id)[:batch_size])
+            if not lote:
+                break
+            alteradas = []
+            agora = timezone.now()
+            for venda in lote:
+                valores = [getattr(venda, campo) for campo in Venda.CAMPOS_CALCULADOS]
+                venda.atualizar_valores()
+                if valores != [getattr(venda, campo) for campo in Venda.CAMPOS_CALCULADOS]:
+                    venda.updated_at = agora
+                    alteradas.append(venda)
+            with transaction.atomic():
+                Venda.objects.bulk_update(alteradas, list(Venda.CAMPOS_CALCULADOS) + ['updated_at'])
+            total += len(alteradas)
+            ultimo_id = lote[-1].id
+            self.stdout.write(f"Até a venda {ultimo_id}: {total} vendas atualizadas")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill concluído. {total} vendas atualizadas."))
@@ -0,0 +1,202 @@
+# backend/api/management/commands/benchmark_asgi.py
+
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+# (nome, leitura síncrona, leitura assíncrona equivalente)
+CASOS = (
+    ('vendas', '/api/venda/?page_size=100', '/api/async/venda/?page_size=100'),
+    (
+        'recebimentos_atrasados',
+        '/api/controlederecebimento/?page_size=100&status=Atrasado',
+        '/api/async/controlederecebimento/?page_size=100&status=Atrasado',
+    ),
+    ('indicadores', '/api/indicadores/', '/api/async/indicadores/'),
+    ('parcelas_atrasadas', '/api/parcelas-atrasadas/', '/api/async/parcelas-atrasadas/'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão de requisições concorrentes por worker entre o servidor WSGI (gunicorn, worker '
+        'síncrono) com as visões atuais e o ASGI (uvicorn) com as leituras de api/async/. Cada servidor sobe '
+        'com um único worker, no banco configurado (DB_* no .env). Use a massa do seed_benchmark. Num banco '
+        'local (ex.: SQLite), em que as consultas não esperam pela rede, use --latencia-ms para simular um '
+        'banco remoto nos dois servidores.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concorrencia', type=int, default=16, help='Requisições simultâneas (padrão: 16)')
+        parser.add_argument('--requisicoes', type=int, default=200, help='Requisições medidas por caso e servidor (padrão: 200)')
+        parser.add_argument(
+            '--apenas',
+            type=str,
+            help=f"Casos a executar, separados por vírgula: {', '.join(nome for nome, _, _ in CASOS)}"
+        )
+        parser.add_argument('--porta', type=int, default=8765, help='Porta dos servidores, um de cada vez (padrão: 8765)')
+        parser.add_argument('--espera', type=float, default=30, help='Segundos aguardando cada servidor subir (padrão: 30)')
+        parser.add_argument(
+            '--latencia-ms',
+            type=float,
+            default=0,
+            help='Espera somada a cada consulta nos dois servidores, como DB_LATENCIA_SIMULADA_MS (padrão: 0)'
+        )
+        parser.add_argument('--saida', type=str, help='Arquivo JSON que recebe os resultados')
+
+    def handle(self, *args, **options):
+        if options['concorrencia'] < 1 or options['requisicoes'] < 1:
+            raise CommandError("--concorrencia e --requisicoes devem ser maiores que zero.")
+        if options['latencia_ms'] < 0:
+            raise CommandError("--latencia-ms não pode ser negativo.")
+        casos = CASOS
+        if options['apenas']:
+            nomes = {nome.strip() for nome in options['apenas'].split(',')}
+            casos = [caso for caso in CASOS if caso[0] in nomes]
+            if not casos:
+                raise CommandError(f"Nenhum caso corresponde a --apenas={options['apenas']}.")
+        self.options = options
+
+        usuario, _ = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True})
+        self.token = str(AccessToken.for_user(usuario))
+
+        porta = options['porta']
+        servidores = {
+            'wsgi': [
+                sys.executable, '-m', 'gunicorn', 'backend.wsgi:application',
+                '--workers', '1', '--bind', f'127.0.0.1:{porta}', '--log-level', 'warning',
+            ],
+            'asgi': [
+                sys.executable, '-m', 'uvicorn', 'backend.asgi:application',
+                '--workers', '1', '--host', '127.0.0.1', '--port', str(porta),
+                '--log-level', 'warning', '--no-access-log',
+            ],
+        }
+        resultados = {nome: {} for nome, _, _ in casos}
+        for servidor, comando in servidores.items():
+            with self.servidor(servidor, comando):
+                for nome, caminho_wsgi, caminho_asgi in casos:
+                    caminho = caminho_asgi if servidor == 'asgi' else caminho_wsgi
+                    resultados[nome][servidor] = resultado = self.medir(caminho)
+                    self.stdout.write(
+                        f"{servidor} {nome:<24} {resultado['requisicoes_por_segundo']:>8.1f} req/s  "
+                        f"mediana {resultado['mediana_ms']:>9.1f} ms  p95 {resultado['p95_ms']:>9.1f} ms"
+                    )
+
+        latencia = f" e {options['latencia_ms']:g} ms de latência simulada por consulta" if options['latencia_ms'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Vazão por worker com {options['concorrencia']} requisições simultâneas{latencia} (ASGI / WSGI):"
+        ))
+        for nome, por_servidor in resultados.items():
+            razao = por_servidor['asgi']['requisicoes_por_segundo'] / por_servidor['wsgi']['requisicoes_por_segundo']
+            por_servidor['razao'] = round(razao, 2)
+            self.stdout.write(f"  {nome:<24} {razao:.2f}x")
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump({
+                    'banco': settings.DATABASES['default']['ENGINE'],
+                    'concorrencia': options['concorrencia'],
+                    'requisicoes': options['requisicoes'],
+                    'latencia_simulada_ms': options['latencia_ms'],
+                    'resultados': resultados,
+                }, arquivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['saida']}"))
+
+    @contextmanager
+    def servidor(self, nome, comando):
+        # Sem os avisos de requisição lenta, esperados sob carga
+        ambiente = dict(
+            os.environ, API_LOG_LEVEL='ERROR', DB_LATENCIA_SIMULADA_MS=str(self.options['latencia_ms'])
+        )
+        with tempfile.TemporaryFile() as log:
+            try:
+                processo = subprocess.Popen(
+                    comando, cwd=settings.BASE_DIR, env=ambiente, stdout=log, stderr=subprocess.STDOUT
+                )
+            except OSError as e:
+                raise CommandError(f"Não foi possível iniciar o servidor {nome}: {e}")
+            try:
+                self.aguardar(nome, processo, log)
+                yield
+            finally:
+                processo.terminate()
+                try:
+                    processo.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    processo.kill()
+                    processo.wait()
+
+    def aguardar(self, nome, processo, log):
+        limite = time.monotonic() + self.options['espera']
+        while time.monotonic() < limite:
+            if processo.poll() is not None:
+                log.seek(0)
+                raise CommandError(
+                    f"O servidor {nome} terminou ao iniciar (os pacotes gunicorn e uvicorn estão instalados?):\n"
+                    f"{log.read().decode(errors='replace')[-2000:]}"
+                )
+            try:
+                socket.create_connection(('127.0.0.1', self.options['porta']), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"O servidor {nome} não respondeu em {self.options['espera']:.0f}s.")
+
+    def medir(self, caminho):
+        """Dispara as requisições com `concorrencia` conexões simultâneas; a primeira rodada aquece o servidor."""
+        concorrencia = self.options['concorrencia']
+        self.disparar(caminho, concorrencia, concorrencia)
+        inicio = time.perf_counter()
+        tempos = self.disparar(caminho, self.options['requisicoes'], concorrencia)
+        decorrido = time.perf_counter() - inicio
+
+        tempos.sort()
+        return {
+            'requisicoes_por_segundo': round(len(tempos) / decorrido, 2),
+            'mediana_ms': round(statistics.median(tempos), 3),
+            'p95_ms': round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+            'max_ms': round(tempos[-1], 3),
+        }
+
+    def disparar(self, caminho, quantidade, concorrencia):
+        restantes = iter(range(quantidade))
+        trava = threading.Lock()
+        cabecalhos = {'Authorization': f'Bearer {self.token}'}
+
+        def cliente():
+            # Conexão persistente quando o servidor permite (o worker síncrono do gunicorn fecha a cada resposta)
+            conexao = http.client.HTTPConnection('127.0.0.1', self.options['porta'], timeout=300)
+            tempos = []
+            try:
+                while True:
+                    with trava:
+                        if next(restantes, None) is None:
+                            return tempos
+                    inicio = time.perf_counter()
+                    conexao.request('GET', caminho, headers=cabecalhos)
+                    response = conexao.getresponse()
+                    corpo = response.read()
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                    if response.status != 200:
+                        raise CommandError(f"{caminho}: status {response.status}: {corpo[:300]!r}")
+            finally:
+                conexao.close()
+
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            futuros = [executor.submit(cliente) for _ in range(concorrencia)]
+            return [tempo for futuro in futuros for tempo in futuro.result()]
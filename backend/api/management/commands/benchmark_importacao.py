@@ -0,0 +1,133 @@
+# backend/api/management/commands/benchmark_importacao.py
+
+import csv
+import datetime
+import io
+import os
+import random
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.models import Plano, Parcela, Consultor, Venda
+from api.cache import invalidar
+import openpyxl
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma planilha sintética de vendas e mede a vazão do import_vendas com 1, 2, 4 e 8 processos. '
+        'Tudo o que é gravado no banco é desfeito ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=500000, help='Linhas da planilha sintética (padrão: 500000)')
+        parser.add_argument(
+            '--workers',
+            type=str,
+            default='1,2,4,8',
+            help='Quantidades de processos a medir, separadas por vírgula (padrão: 1,2,4,8)'
+        )
+        parser.add_argument('--formato', choices=['xlsx', 'csv'], default='xlsx', help='Formato do arquivo gerado')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Repassado ao import_vendas')
+        parser.add_argument('--arquivo', type=str, help='Grava a planilha gerada neste caminho em vez de um temporário')
+
+    def handle(self, *args, **options):
+        try:
+            workers = [int(valor) for valor in options['workers'].split(',')]
+        except ValueError:
+            raise CommandError("--workers deve ser uma lista de inteiros, ex.: 1,2,4,8")
+
+        diretorio_temporario = None
+        arquivo = options['arquivo']
+        if not arquivo:
+            diretorio_temporario = tempfile.TemporaryDirectory()
+            arquivo = os.path.join(diretorio_temporario.name, f"vendas_benchmark.{options['formato']}")
+
+        resultados = []
+        try:
+            with transaction.atomic():
+                plano, consultor = self.criar_referencias()
+                inicio = time.monotonic()
+                self.gerar_planilha(arquivo, options['linhas'], plano.id, consultor.id)
+                self.stdout.write(f"Planilha com {options['linhas']} linhas gerada em {time.monotonic() - inicio:.1f}s: {arquivo}")
+
+                for quantidade in workers:
+                    with transaction.atomic():
+                        inicio = time.monotonic()
+                        call_command(
+                            'import_vendas', arquivo,
+                            workers=quantidade, batch_size=options['batch_size'], stdout=io.StringIO()
+                        )
+                        decorrido = time.monotonic() - inicio
+                        importadas = Venda.objects.filter(numero_proposta__startswith='BENCH-').count()
+                        # Desfaz a importação para que a próxima rodada parta do mesmo estado
+                        transaction.set_rollback(True)
+                    resultados.append((quantidade, importadas, decorrido))
+                    self.stdout.write(
+                        f"{quantidade} processo(s): {importadas} vendas em {decorrido:.1f}s "
+                        f"({importadas / decorrido:.0f} linhas/s)"
+                    )
+                transaction.set_rollback(True)
+        finally:
+            if diretorio_temporario is not None:
+                diretorio_temporario.cleanup()
+
+        if resultados:
+            base = resultados[0][1] / resultados[0][2]
+            self.stdout.write(self.style.SUCCESS("Resumo (aceleração em relação à primeira medição):"))
+            for quantidade, importadas, decorrido in resultados:
+                self.stdout.write(f"  {quantidade:>2} processo(s): {(importadas / decorrido) / base:.2f}x")
+
+    def criar_referencias(self):
+        plano = Plano.objects.create(
+            operadora='Benchmark',
+            comissionamento_total=300,
+            tipo='PME',
+            numero_parcelas=3,
+            taxa_plano_valor=10,
+            taxa_plano_tipo='Valor Fixo'
+        )
+        Parcela.objects.bulk_create([
+            Parcela(plano=plano, numero_parcela=numero, porcentagem_parcela=100) for numero in range(1, 4)
+        ])
+        invalidar(Parcela)
+        consultor = Consultor.objects.create(nome='Benchmark')
+        return plano, consultor
+
+    def gerar_planilha(self, arquivo, linhas, plano_id, consultor_id):
+        aleatorio = random.Random(42)
+        inicio = datetime.date(2023, 1, 1)
+        cabecalho = [
+            'numero_proposta', 'cliente_nome', 'cliente_documento', 'cliente_email', 'cliente_telefone',
+            'plano_id', 'consultor_id', 'valor_plano', 'desconto_consultor',
+            'data_venda', 'data_vigencia', 'data_vencimento', 'canal_entrada',
+        ]
+
+        def gerar():
+            for i in range(linhas):
+                data_venda = inicio + datetime.timedelta(days=aleatorio.randrange(730))
+                yield [
+                    f'BENCH-{i:08d}', f'Cliente {i}', f'{aleatorio.randrange(10**11):011d}',
+                    f'cliente{i}@exemplo.com', None, plano_id, consultor_id,
+                    round(aleatorio.uniform(200, 5000), 2), round(aleatorio.uniform(0, 100), 2),
+                    data_venda.isoformat(), (data_venda + datetime.timedelta(days=10)).isoformat(),
+                    (data_venda + datetime.timedelta(days=40)).isoformat(),
+                    aleatorio.choice(['Indicação', 'Portifolio', 'Site', 'Rede Social']),
+                ]
+
+        if arquivo.lower().endswith('.csv'):
+            with open(arquivo, 'w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(cabecalho)
+                writer.writerows(gerar())
+            return
+
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(cabecalho)
+        for row in gerar():
+            ws.append(row)
+        wb.save(arquivo)
@@ -0,0 +1,62 @@
+# backend/api/management/commands/explain_hot_queries.py
+
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from api.models import Parcela, Venda, ControleDeRecebimento
+
+
+class Command(BaseCommand):
+    help = 'Exibe o plano de execução (EXPLAIN) das consultas mais frequentes da aplicação'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Executa as consultas e mostra tempos reais (EXPLAIN ANALYZE; PostgreSQL e MySQL 8.0.18+)'
+        )
+        parser.add_argument('--consulta', type=str, help='Mostra apenas a consulta com este nome')
+
+    def consultas(self):
+        hoje = datetime.date.today()
+        inicio = hoje - datetime.timedelta(days=365)
+        venda = Venda.objects.order_by('id').values('id', 'plano_id', 'consultor_id').first() or {
+            'id': 0, 'plano_id': 0, 'consultor_id': 0
+        }
+        return {
+            'parcelas_atrasadas': ControleDeRecebimento.objects.atrasados(hoje),
+            'sweep_overdue': ControleDeRecebimento.objects.filter(
+                status='Não Recebido', data_prevista_recebimento__lt=hoje
+            ).order_by('id').values_list('id', flat=True)[:1000],
+            'propagar_datas_previstas': ControleDeRecebimento.objects.filter(
+                venda_id=venda['id'], parcela__numero_parcela__gte=1
+            ).select_related('parcela').order_by('parcela__numero_parcela'),
+            'parcelas_do_plano': Parcela.objects.filter(plano_id=venda['plano_id']).order_by('numero_parcela'),
+            'parcela_por_numero': Parcela.objects.filter(plano_id=venda['plano_id'], numero_parcela=1),
+            'vendas_por_periodo': Venda.objects.filter(data_venda__range=(inicio, hoje)),
+            'vendas_por_consultor_e_periodo': Venda.objects.filter(
+                consultor_id=venda['consultor_id'], data_venda__range=(inicio, hoje)
+            ),
+            'indicadores_por_consultor': Venda.objects.filter(data_venda__range=(inicio, hoje))
+                .values('consultor_id').annotate(quantidade=Count('id'), volume=Sum('valor_plano')),
+            'recebimentos_por_periodo': ControleDeRecebimento.objects.filter(
+                data_prevista_recebimento__range=(inicio, hoje)
+            ).values('status').annotate(total=Sum('valor_parcela')),
+        }
+
+    def handle(self, *args, **options):
+        consultas = self.consultas()
+        if options['consulta']:
+            if options['consulta'] not in consultas:
+                raise CommandError(f"Consulta desconhecida. Opções: {', '.join(consultas)}")
+            consultas = {options['consulta']: consultas[options['consulta']]}
+
+        opcoes = {'analyze': True} if options['analyze'] else {}
+        for nome, queryset in consultas.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {nome}"))
+            self.stdout.write(str(queryset.query))
+            try:
+                self.stdout.write(queryset.explain(**opcoes))
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"Erro ao executar EXPLAIN: {e}"))
+            self.stdout.write('')
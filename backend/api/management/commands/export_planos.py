@@ -16,7 +16,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         output_file = options['output_file']
-        planos = Plano.objects.all()
+        planos = Plano.objects.all().iterator()
 
         try:
             with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
@@ -0,0 +1,12 @@
+# backend/api/management/commands/export_recebimentos.py
+
+from api.exportacao import ComandoExportacao, COLUNAS_RECEBIMENTOS, filtrar_recebimentos
+from api.models import ControleDeRecebimento
+
+
+class Command(ComandoExportacao):
+    help = 'Exporta os controles de recebimento para CSV, XLSX ou Parquet, em streaming'
+    modelo = ControleDeRecebimento
+    filtro = staticmethod(filtrar_recebimentos)
+    colunas = COLUNAS_RECEBIMENTOS
+    descricao = 'recebimentos'
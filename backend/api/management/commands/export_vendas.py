@@ -0,0 +1,12 @@
+# backend/api/management/commands/export_vendas.py
+
+from api.exportacao import ComandoExportacao, COLUNAS_VENDAS, filtrar_vendas
+from api.models import Venda
+
+
+class Command(ComandoExportacao):
+    help = 'Exporta as vendas para CSV, XLSX ou Parquet, em streaming'
+    modelo = Venda
+    filtro = staticmethod(filtrar_vendas)
+    colunas = COLUNAS_VENDAS
+    descricao = 'vendas'
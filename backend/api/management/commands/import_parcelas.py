@@ -1,33 +1,52 @@
 # backend/api/management/commands/import_parcelas.py
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
 from api.models import Plano, Parcela
+from api.cache import invalidar
+from decimal import Decimal
 import openpyxl
 
+
 class Command(BaseCommand):
     help = 'Importa dados de parcelas a partir de um arquivo XLSX'
 
     def add_arguments(self, parser):
         parser.add_argument('excel_file', type=str, help='Caminho para o arquivo XLSX de parcelas')
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Atualiza as parcelas já cadastradas (chave: plano + numero_parcela) em vez de duplicá-las'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de parcelas gravadas por transação (padrão: 1000)'
+        )
 
     def handle(self, *args, **options):
         excel_file = options['excel_file']
+        self.upsert = options['upsert']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size deve ser maior que zero.")
         self.stdout.write(f"Iniciando importação de parcelas do arquivo: {excel_file}")
 
         try:
-            wb = openpyxl.load_workbook(excel_file)
+            wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
             sheet = wb.active  # Considera que os dados estão na primeira aba
         except Exception as e:
             raise CommandError(f"Erro ao abrir o arquivo: {e}")
 
-        count = 0
+        planos = set(Plano.objects.values_list('id', flat=True))
+        self.gravadas = 0
+        lote = {}
         # Itera a partir da segunda linha (a primeira contém os cabeçalhos)
-        for idx, row in enumerate(sheet.iter_rows(min_row=2), start=2):
+        for idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
             try:
-                # Extraia os valores de cada coluna conforme a ordem dos cabeçalhos
-                plano_id = row[0].value
-                numero_parcela = row[1].value
-                porcentagem_parcela = row[2].value
+                row = tuple(row) + (None,) * (3 - len(row))
+                plano_id, numero_parcela, porcentagem_parcela = row[:3]
 
                 # Validação simples: pular linha se algum campo obrigatório estiver ausente
                 if not plano_id or not numero_parcela or porcentagem_parcela is None:
@@ -36,22 +55,81 @@ class Command(BaseCommand):
                     ))
                     continue
 
-                # Busca o objeto Plano correspondente ao plano_id
-                try:
-                    plano = Plano.objects.get(id=plano_id)
-                except Plano.DoesNotExist:
+                # Células numéricas do XLSX chegam como float (3.0) ou texto ("3")
+                plano_id = int(plano_id)
+                if plano_id not in planos:
                     self.stdout.write(self.style.WARNING(
                         f"Linha {idx} ignorada: Plano com ID {plano_id} não encontrado."
                     ))
                     continue
 
-                # Cria a instância da Parcela
-                Parcela.objects.create(
-                    plano=plano,
-                    numero_parcela=numero_parcela,
-                    porcentagem_parcela=porcentagem_parcela
+                parcela = Parcela(
+                    plano_id=plano_id,
+                    numero_parcela=int(numero_parcela),
+                    porcentagem_parcela=Decimal(str(porcentagem_parcela))
                 )
-                count += 1
+                chave = (parcela.plano_id, parcela.numero_parcela)
+                if chave in lote and not self.upsert:
+                    self.stdout.write(self.style.ERROR(
+                        f"Erro na linha {idx}: parcela {chave[1]} do plano {chave[0]} repetida no arquivo."
+                    ))
+                    continue
+                # Em modo upsert, a última ocorrência de (plano, numero_parcela) prevalece
+                lote[chave] = (idx, parcela)
+                if len(lote) >= batch_size:
+                    self.gravar_lote(lote)
+                    lote = {}
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Erro na linha {idx}: {e}"))
-        self.stdout.write(self.style.SUCCESS(f"Importação concluída. {count} parcelas importadas com sucesso!"))
+        if lote:
+            self.gravar_lote(lote)
+        wb.close()
+
+        if self.upsert:
+            self.stdout.write(self.style.SUCCESS(
+                f"Importação concluída. {self.gravadas} parcelas criadas ou atualizadas com sucesso!"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Importação concluída. {self.gravadas} parcelas importadas com sucesso!"))
+
+    def gravar_lote(self, lote):
+        try:
+            if self.upsert:
+                self.gravar_upsert(lote)
+            else:
+                self.gravar_novas(lote)
+        except IntegrityError as e:
+            linhas = ', '.join(str(idx) for idx, _ in lote.values())
+            self.stdout.write(self.style.ERROR(f"Erro ao gravar as linhas {linhas}: {e}"))
+
+    def gravar_novas(self, lote):
+        # A restrição parcela_plano_numero_uniq rejeitaria o lote inteiro: as
+        # parcelas já cadastradas são recusadas linha a linha antes do INSERT
+        existentes = [
+            chave
+            for chave in Parcela.objects.filter(
+                plano_id__in={plano_id for plano_id, _ in lote}
+            ).values_list('plano_id', 'numero_parcela')
+            if chave in lote
+        ]
+        for chave in existentes:
+            idx, _ = lote.pop(chave)
+            self.stdout.write(self.style.ERROR(
+                f"Erro na linha {idx}: parcela {chave[1]} do plano {chave[0]} já cadastrada."
+            ))
+        with transaction.atomic():
+            Parcela.objects.bulk_create([parcela for _, parcela in lote.values()])
+            # bulk_create não dispara post_save: invalida o cache das parcelas
+            invalidar(Parcela)
+        self.gravadas += len(lote)
+
+    def gravar_upsert(self, lote):
+        # INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE sobre parcela_plano_numero_uniq
+        opcoes = {'update_conflicts': True, 'update_fields': ['porcentagem_parcela']}
+        if connection.features.supports_update_conflicts_with_target:
+            opcoes['unique_fields'] = ['plano', 'numero_parcela']
+        with transaction.atomic():
+            Parcela.objects.bulk_create([parcela for _, parcela in lote.values()], **opcoes)
+            # bulk_create não dispara post_save: invalida o cache das parcelas
+            invalidar(Parcela)
+        self.gravadas += len(lote)
@@ -1,36 +1,59 @@
 # backend/api/management/commands/import_planos.py
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from api.models import Plano
+from api.cache import invalidar
+from decimal import Decimal
 import openpyxl
 
+CAMPOS_ATUALIZAVEIS = ['comissionamento_total', 'numero_parcelas', 'taxa_plano_valor', 'taxa_plano_tipo']
+
+
+def decimal_2(valor):
+    """Valor da planilha (float, texto ou vazio) como Decimal de 2 casas, comparável ao DecimalField."""
+    return Decimal(str(valor or 0)).quantize(Decimal('0.01'))
+
+
 class Command(BaseCommand):
     help = 'Importa dados de planos a partir de um arquivo XLSX'
 
     def add_arguments(self, parser):
         parser.add_argument('excel_file', type=str, help='Caminho para o arquivo XLSX de planos')
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Atualiza os planos já cadastrados (chave: operadora + tipo) em vez de recriá-los'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de planos gravados por transação (padrão: 1000)'
+        )
 
     def handle(self, *args, **options):
         excel_file = options['excel_file']
+        self.upsert = options['upsert']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size deve ser maior que zero.")
         self.stdout.write(f"Iniciando importação de planos do arquivo: {excel_file}")
 
         try:
-            wb = openpyxl.load_workbook(excel_file)
+            wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
             sheet = wb.active  # Assume que os dados estão na primeira aba
         except Exception as e:
             raise CommandError(f"Erro ao abrir o arquivo: {e}")
 
-        count = 0
+        self.criados = 0
+        self.atualizados = 0
+        lote = {}
         # Itera a partir da segunda linha (a primeira contém os cabeçalhos)
-        for idx, row in enumerate(sheet.iter_rows(min_row=2), start=2):
+        for idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
             try:
-                # Extraia os valores de cada coluna conforme a ordem dos cabeçalhos
-                operadora = row[0].value
-                comissionamento_total = row[1].value
-                tipo = row[2].value
-                numero_parcelas = row[3].value
-                taxa_plano_valor = row[4].value
-                taxa_plano_tipo = row[5].value
+                row = tuple(row) + (None,) * (6 - len(row))
+                operadora, comissionamento_total, tipo, numero_parcelas, taxa_plano_valor, taxa_plano_tipo = row[:6]
 
                 # Validação simples: pular linha se algum campo obrigatório estiver ausente
                 if not operadora or not tipo or not numero_parcelas:
@@ -39,16 +62,82 @@ class Command(BaseCommand):
                     ))
                     continue
 
-                # Cria o objeto Plano
-                Plano.objects.create(
+                plano = Plano(
                     operadora=operadora,
-                    comissionamento_total=comissionamento_total or 0.00,
+                    comissionamento_total=decimal_2(comissionamento_total),
                     tipo=tipo,
-                    numero_parcelas=numero_parcelas,
-                    taxa_plano_valor=taxa_plano_valor or 0.00,
+                    numero_parcelas=int(numero_parcelas),
+                    taxa_plano_valor=decimal_2(taxa_plano_valor),
                     taxa_plano_tipo=taxa_plano_tipo or 'Valor Fixo'
                 )
-                count += 1
+                chave = (plano.operadora, plano.tipo)
+                if chave in lote and not self.upsert:
+                    self.stdout.write(self.style.ERROR(
+                        f"Erro na linha {idx}: plano {operadora} - {tipo} repetido no arquivo."
+                    ))
+                    continue
+                # Em modo upsert, a última ocorrência da chave prevalece
+                lote[chave] = (idx, plano)
+                if len(lote) >= batch_size:
+                    self.gravar_lote(lote)
+                    lote = {}
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Erro na linha {idx}: {e}"))
-        self.stdout.write(self.style.SUCCESS(f"Importação concluída. {count} planos importados com sucesso!"))
+        if lote:
+            self.gravar_lote(lote)
+        wb.close()
+
+        if self.upsert:
+            self.stdout.write(self.style.SUCCESS(
+                f"Importação concluída. {self.criados} planos criados e {self.atualizados} atualizados com sucesso!"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Importação concluída. {self.criados} planos importados com sucesso!"))
+
+    def gravar_lote(self, lote):
+        operadoras = {operadora for operadora, _ in lote}
+        cadastrados = {
+            (plano.operadora, plano.tipo): plano
+            for plano in Plano.objects.filter(operadora__in=operadoras)
+            if (plano.operadora, plano.tipo) in lote
+        }
+        existentes = set(cadastrados)
+
+        if not self.upsert:
+            for chave in existentes:
+                idx, _ = lote.pop(chave)
+                self.stdout.write(self.style.ERROR(
+                    f"Erro na linha {idx}: plano {chave[0]} - {chave[1]} já cadastrado."
+                ))
+
+        planos = [plano for _, plano in lote.values()]
+        try:
+            with transaction.atomic():
+                if self.upsert:
+                    # INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE sobre unique_together (operadora, tipo)
+                    opcoes = {'update_conflicts': True, 'update_fields': CAMPOS_ATUALIZAVEIS}
+                    if connection.features.supports_update_conflicts_with_target:
+                        opcoes['unique_fields'] = ['operadora', 'tipo']
+                    Plano.objects.bulk_create(planos, **opcoes)
+                    # O bulk_create não passa por Plano.save(): recalcula as vendas dos planos alterados
+                    for chave, plano in cadastrados.items():
+                        novo = lote[chave][1]
+                        alterado = any(getattr(plano, campo) != getattr(novo, campo) for campo in CAMPOS_ATUALIZAVEIS)
+                        for campo in Plano.CAMPOS_VALORES:
+                            setattr(plano, campo, getattr(novo, campo))
+                        if plano._valores_anteriores != plano._capturar_valores():
+                            plano.recalcular_vendas()
+                        elif alterado:
+                            plano.marcar_vendas_alteradas()
+                else:
+                    Plano.objects.bulk_create(planos)
+                # bulk_create não dispara post_save: invalida o cache dos planos
+                invalidar(Plano)
+        except Exception as e:
+            linhas = ', '.join(str(idx) for idx, _ in lote.values())
+            self.stdout.write(self.style.ERROR(f"Erro ao gravar as linhas {linhas}: {e}"))
+            return
+
+        atualizados = len(existentes) if self.upsert else 0
+        self.atualizados += atualizados
+        self.criados += len(planos) - atualizados
@@ -1,113 +1,235 @@
 # backend/api/management/commands/import_vendas.py
 
+from concurrent.futures import ProcessPoolExecutor
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
 from api.models import Venda, Plano, Consultor
-import openpyxl
-import datetime
-from decimal import Decimal
+from django.db.models import Q
+from django.utils import timezone
+from api.cronograma import criar_vendas_em_lote, parcelas_por_plano, sincronizar_recebimentos_em_lote
+from api.fluxo_caixa import atualizando
+from api import importacao
+import csv
+import time
+
+CAMPOS_ATUALIZAVEIS = [
+    'cliente_nome', 'cliente_documento', 'cliente_email', 'cliente_telefone', 'plano', 'consultor',
+    'valor_plano', 'desconto_consultor', 'data_venda', 'data_vigencia', 'data_vencimento', 'canal_entrada',
+]
+
 
 class Command(BaseCommand):
-    help = 'Importa dados de vendas a partir de um arquivo XLSX'
+    help = 'Importa dados de vendas a partir de um arquivo XLSX (ou CSV com as mesmas colunas)'
 
     def add_arguments(self, parser):
         parser.add_argument(
             'excel_file',
             type=str,
-            help='Caminho para o arquivo XLSX com os dados de vendas'
+            help='Caminho para o arquivo XLSX ou CSV com os dados de vendas'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de vendas gravadas por transação (padrão: 1000)'
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Atualiza as vendas já cadastradas (chave: numero_proposta) em vez de ignorá-las'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processos usados para ler e validar as linhas; a gravação continua em um único processo'
+        )
+        parser.add_argument(
+            '--reject-file',
+            type=str,
+            help='Arquivo CSV que recebe as linhas rejeitadas (linha, motivo) em vez da saída padrão'
         )
 
     def handle(self, *args, **options):
         excel_file = options['excel_file']
+        batch_size = options['batch_size']
+        workers = options['workers']
+        self.upsert = options['upsert']
+        if batch_size < 1:
+            raise CommandError("--batch-size deve ser maior que zero.")
+        if workers < 1:
+            raise CommandError("--workers deve ser maior que zero.")
         self.stdout.write(f"Iniciando importação de vendas do arquivo: {excel_file}")
 
         try:
-            wb = openpyxl.load_workbook(excel_file)
-            sheet = wb.active  # Assume que os dados estão na primeira aba
+            # Valida o arquivo antes de iniciar (XLSX aberto em modo somente leitura)
+            importacao.contar_linhas(excel_file)
+            if importacao.eh_csv(excel_file):
+                open(excel_file, encoding='utf-8-sig').close()
         except Exception as e:
             raise CommandError(f"Erro ao abrir o arquivo: {e}")
 
-        count = 0
-        # Itera a partir da segunda linha (a primeira contém os cabeçalhos)
-        for idx, row in enumerate(sheet.iter_rows(min_row=2), start=2):
-            try:
-                numero_proposta    = row[0].value
-                cliente_nome       = row[1].value
-                cliente_documento  = row[2].value
-                cliente_email      = row[3].value
-                cliente_telefone   = row[4].value
-                plano_id           = row[5].value
-                consultor_id       = row[6].value
-                valor_plano        = row[7].value
-                desconto_consultor = row[8].value
-                data_venda         = row[9].value
-                data_vigencia      = row[10].value
-                data_vencimento    = row[11].value
-                canal_entrada      = row[12].value  # Novo campo
-
-                # Validação básica: campos obrigatórios
-                if not numero_proposta or not cliente_nome or not plano_id or not consultor_id or not data_venda:
-                    self.stdout.write(self.style.WARNING(
-                        f"Linha {idx} ignorada: campos obrigatórios ausentes."
-                    ))
-                    continue
+        # Tabelas de referência carregadas uma única vez
+        self.planos = {plano.id: plano for plano in Plano.objects.all()}
+        self.consultores = set(Consultor.objects.values_list('id', flat=True))
+        self.parcelas = parcelas_por_plano()
+        self.propostas_vistas = set()
 
-                # Converte as datas se necessário
-                if not isinstance(data_venda, datetime.date):
-                    data_venda = datetime.datetime.strptime(data_venda, "%Y-%m-%d").date()
-                if not isinstance(data_vigencia, datetime.date):
-                    data_vigencia = datetime.datetime.strptime(data_vigencia, "%Y-%m-%d").date()
-                if not isinstance(data_vencimento, datetime.date):
-                    data_vencimento = datetime.datetime.strptime(data_vencimento, "%Y-%m-%d").date()
-
-                # Converte valores numéricos para Decimal
-                if valor_plano is not None:
-                    valor_plano = Decimal(str(valor_plano))
-                else:
-                    self.stdout.write(self.style.WARNING(
-                        f"Linha {idx} ignorada: valor_plano ausente."
-                    ))
-                    continue
+        self.rejeitados = None
+        reject_file = options.get('reject_file')
+        if reject_file:
+            arquivo_rejeitados = open(reject_file, 'w', newline='', encoding='utf-8')
+            self.rejeitados = csv.writer(arquivo_rejeitados)
+            self.rejeitados.writerow(['linha', 'motivo'])
+            self.total_rejeitados = 0
 
-                if desconto_consultor is not None:
-                    desconto_consultor = Decimal(str(desconto_consultor))
-                else:
-                    desconto_consultor = Decimal("0.00")
+        self.count = 0
+        self.atualizadas = 0
+        self.inicio = time.monotonic()
+        self.linhas_lidas = 0
+        try:
+            if workers == 1:
+                planos = set(self.planos)
+                resultados = (
+                    importacao.processar_linhas(linhas, planos, self.consultores)
+                    for linhas in importacao.agrupar(importacao.ler_linhas(excel_file), batch_size)
+                )
+                self.gravar_resultados(resultados, batch_size)
+            else:
+                self.importar_em_paralelo(excel_file, workers, batch_size)
+        finally:
+            if self.rejeitados is not None:
+                arquivo_rejeitados.close()
+                self.stdout.write(f"{self.total_rejeitados} linhas rejeitadas registradas em: {reject_file}")
 
-                # Busque o objeto Plano
-                try:
-                    plano = Plano.objects.get(id=plano_id)
-                except Plano.DoesNotExist:
-                    self.stdout.write(self.style.WARNING(
-                        f"Linha {idx} ignorada: Plano com ID {plano_id} não encontrado."
-                    ))
+        if self.upsert:
+            self.stdout.write(self.style.SUCCESS(
+                f"Importação concluída. {self.count} vendas importadas e {self.atualizadas} atualizadas com sucesso!"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Importação concluída. {self.count} vendas importadas com sucesso!"))
+
+    def importar_em_paralelo(self, arquivo, workers, batch_size):
+        # Os processos auxiliares não usam o banco; fecha as conexões antes de criá-los
+        # (exceto dentro de uma transação em andamento, que seria perdida)
+        if not connection.in_atomic_block:
+            connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=importacao.inicializar_processo,
+            initargs=(set(self.planos), self.consultores),
+        ) as executor:
+            # Um único leitor percorre o arquivo uma vez (o XLSX só é lido em sequência:
+            # começar no meio exigiria reler as linhas anteriores); os lotes de valores
+            # brutos são convertidos e validados nos processos
+            lotes = importacao.agrupar(importacao.ler_linhas(arquivo), batch_size)
+            resultados = importacao.mapear_em_ordem(executor, importacao.processar_lote, lotes, workers * 2)
+            self.gravar_resultados(resultados, batch_size)
+
+    def gravar_resultados(self, blocos, batch_size):
+        lote = []
+        for resultados in blocos:
+            for idx, dados, erro, ignorada in resultados:
+                self.linhas_lidas += 1
+                if dados is None:
+                    self.rejeitar(idx, erro, ignorada)
                     continue
+                if dados['numero_proposta'] in self.propostas_vistas:
+                    self.rejeitar(idx, f"proposta {dados['numero_proposta']} repetida no arquivo.")
+                    continue
+                self.propostas_vistas.add(dados['numero_proposta'])
+
+                plano_id = dados.pop('plano_id')
+                lote.append((idx, Venda(plano=self.planos[plano_id], **dados)))
+                if len(lote) >= batch_size:
+                    self.gravar_lote(lote)
+                    self.relatar_progresso()
+                    lote = []
+        if lote:
+            self.gravar_lote(lote)
+            self.relatar_progresso()
 
-                # Busque o objeto Consultor
+    def rejeitar(self, idx, motivo, ignorada=True):
+        if self.rejeitados is not None:
+            self.rejeitados.writerow([idx, motivo])
+            self.total_rejeitados += 1
+        elif ignorada:
+            self.stdout.write(self.style.WARNING(f"Linha {idx} ignorada: {motivo}"))
+        else:
+            self.stdout.write(self.style.ERROR(f"Erro na linha {idx}: {motivo}"))
+
+    def gravar_lote(self, lote):
+        existentes = {
+            venda.numero_proposta: venda
+            for venda in Venda.objects.filter(numero_proposta__in=[venda.numero_proposta for _, venda in lote])
+        }
+        novos = []
+        for idx, venda in lote:
+            if venda.numero_proposta not in existentes:
+                novos.append((idx, venda))
+            elif not self.upsert:
+                self.rejeitar(idx, f"proposta {venda.numero_proposta} já cadastrada.")
+
+        if self.upsert:
+            self.atualizar_existentes(lote, existentes)
+
+        try:
+            with transaction.atomic():
+                criar_vendas_em_lote([venda for _, venda in novos], self.parcelas)
+            self.count += len(novos)
+        except Exception:
+            # Regrava linha a linha para identificar quais registros falharam
+            for idx, venda in novos:
+                venda.pk = None
+                venda._state.adding = True
                 try:
-                    consultor = Consultor.objects.get(id=consultor_id)
-                except Consultor.DoesNotExist:
-                    self.stdout.write(self.style.WARNING(
-                        f"Linha {idx} ignorada: Consultor com ID {consultor_id} não encontrado."
-                    ))
-                    continue
+                    with transaction.atomic():
+                        criar_vendas_em_lote([venda], self.parcelas)
+                    self.count += 1
+                except Exception as e:
+                    self.rejeitar(idx, str(e), ignorada=False)
+
+    def atualizar_existentes(self, lote, existentes):
+        alteradas = []
+        for idx, nova in lote:
+            venda = existentes.get(nova.numero_proposta)
+            if venda is None:
+                continue
+            # Compara pelos atributos de coluna (plano_id, consultor_id) para não consultar as FKs
+            valores = {
+                Venda._meta.get_field(campo).attname: getattr(nova, Venda._meta.get_field(campo).attname)
+                for campo in CAMPOS_ATUALIZAVEIS
+            }
+            if any(getattr(venda, attname) != valor for attname, valor in valores.items()):
+                for attname, valor in valores.items():
+                    setattr(venda, attname, valor)
+                venda.plano = self.planos[venda.plano_id]
+                alteradas.append((idx, venda))
+        if not alteradas:
+            return
 
-                # Criação da venda; o método save() do modelo gerará os controles de recebimento automaticamente
-                Venda.objects.create(
-                    numero_proposta=numero_proposta,
-                    cliente_nome=cliente_nome,
-                    cliente_documento=cliente_documento,
-                    cliente_email=cliente_email,
-                    cliente_telefone=cliente_telefone,
-                    plano=plano,
-                    consultor=consultor,
-                    valor_plano=valor_plano,
-                    desconto_consultor=desconto_consultor,
-                    data_venda=data_venda,
-                    data_vigencia=data_vigencia,
-                    data_vencimento=data_vencimento,
-                    canal_entrada=canal_entrada or "Indicação"
+        vendas = [venda for _, venda in alteradas]
+        try:
+            with transaction.atomic(), atualizando(Q(venda_id__in=[venda.pk for venda in vendas])):
+                agora = timezone.now()
+                for venda in vendas:
+                    venda.atualizar_valores()
+                    venda.updated_at = agora
+                Venda.objects.bulk_update(
+                    vendas, CAMPOS_ATUALIZAVEIS + list(Venda.CAMPOS_CALCULADOS) + ['updated_at']
+                )
+                # Regenera (por diferença) apenas os cronogramas afetados
+                sincronizar_recebimentos_em_lote(
+                    [venda for venda in vendas if venda.cronograma_alterado()], self.parcelas
                 )
-                count += 1
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Erro na linha {idx}: {e}"))
-        self.stdout.write(self.style.SUCCESS(f"Importação concluída. {count} vendas importadas com sucesso!"))
+            self.atualizadas += len(alteradas)
+        except Exception as e:
+            for idx, _ in alteradas:
+                self.rejeitar(idx, f"erro ao atualizar: {e}", ignorada=False)
+
+    def relatar_progresso(self):
+        decorrido = time.monotonic() - self.inicio
+        taxa = self.linhas_lidas / decorrido if decorrido > 0 else 0
+        self.stdout.write(
+            f"{self.linhas_lidas} linhas processadas, {self.count} vendas gravadas ({taxa:.0f} linhas/s)"
+        )
@@ -0,0 +1,24 @@
+# backend/api/management/commands/rebuild_cashflow.py
+
+from django.core.management.base import BaseCommand, CommandError
+from api.fluxo_caixa import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o resumo FluxoCaixaMensal a partir de todos os controles de recebimento'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de linhas do resumo gravadas por INSERT (padrão: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size deve ser maior que zero.")
+
+        total = reconstruir(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Fluxo de caixa reconstruído: {total} linhas no resumo."))
@@ -0,0 +1,37 @@
+# backend/api/management/commands/rebuild_schedules.py
+
+from django.core.management.base import BaseCommand, CommandError
+from api.cronograma import regenerar_cronogramas
+from api.models import Plano
+
+
+class Command(BaseCommand):
+    help = (
+        'Regenera os cronogramas de recebimento das vendas conforme as parcelas atuais dos planos, '
+        'preservando os recebimentos já registrados'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plano', type=int, help='Regenera apenas as vendas do plano informado')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Quantidade de vendas processadas por transação (padrão: 500)'
+        )
+
+    def handle(self, *args, **options):
+        plano_id = options['plano']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size deve ser maior que zero.")
+        if plano_id is not None and not Plano.objects.filter(pk=plano_id).exists():
+            raise CommandError(f"Plano {plano_id} não encontrado.")
+
+        def relatar_progresso(processadas, total):
+            self.stdout.write(f"{processadas} de {total} vendas processadas")
+
+        criados, alterados, removidos = regenerar_cronogramas(plano_id, batch_size, relatar_progresso)
+        self.stdout.write(self.style.SUCCESS(
+            f"Cronogramas regenerados: {criados} recebimentos criados, {alterados} alterados e {removidos} removidos."
+        ))
@@ -0,0 +1,319 @@
+# backend/api/management/commands/run_benchmarks.py
+
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api import benchmark
+from api.middleware import ColetorConsultas
+from api.models import Plano, Consultor, Venda, ControleDeRecebimento
+
+# Página pedida nas listagens paginadas (a mesma do padrão da CursorPaginacao)
+TAMANHO_PAGINA = 100
+# ParcelasAtrasadasList serializa todas as parcelas atrasadas: poucas repetições bastam
+REPETICOES_ATRASADAS = 3
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede os caminhos críticos (Venda.save, marcar_parcela_recebida, parcelas atrasadas, listagens e '
+        'importadores) sobre a massa do seed_benchmark e grava os resultados em JSON para comparar commits. '
+        'Cada repetição é desfeita ao final, então o custo do COMMIT não entra nas medições.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=20, help='Repetições medidas de cada caso (padrão: 20)')
+        parser.add_argument('--aquecimento', type=int, default=2, help='Repetições descartadas antes de medir (padrão: 2)')
+        parser.add_argument(
+            '--apenas',
+            type=str,
+            help='Casos a executar, separados por vírgula (prefixos aceitos, ex.: listagem,importacao_planos)'
+        )
+        parser.add_argument('--linhas-importacao', type=int, default=1000, help='Linhas das planilhas importadas (padrão: 1000)')
+        parser.add_argument('--saida', type=str, help='Arquivo JSON que recebe os resultados')
+        parser.add_argument('--comparar', type=str, help='JSON de uma execução anterior: mostra a variação das medianas')
+        parser.add_argument('--semente', type=int, default=42, help='Semente usada na escolha dos registros (padrão: 42)')
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1 or options['aquecimento'] < 0 or options['linhas_importacao'] < 1:
+            raise CommandError("--repeticoes e --linhas-importacao devem ser maiores que zero e --aquecimento não negativo.")
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as arquivo:
+                    anterior = json.load(arquivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Erro ao ler {options['comparar']}: {e}")
+        if not Venda.objects.exists():
+            raise CommandError("Nenhuma venda no banco. Gere a massa de dados com o seed_benchmark antes.")
+
+        self.options = options
+        self.aleatorio = random.Random(options['semente'])
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.usuario())
+        self.diretorio = tempfile.TemporaryDirectory()
+
+        casos = self.casos()
+        if options['apenas']:
+            prefixos = [prefixo.strip() for prefixo in options['apenas'].split(',') if prefixo.strip()]
+            casos = [caso for caso in casos if any(caso[0].startswith(prefixo) for prefixo in prefixos)]
+            if not casos:
+                raise CommandError(f"Nenhum caso corresponde a --apenas={options['apenas']}.")
+
+        resultados = {}
+        # Sem os avisos de requisição lenta do MetricasMiddleware a cada repetição
+        log_desempenho = logging.getLogger('api.desempenho')
+        nivel_anterior = log_desempenho.level
+        log_desempenho.setLevel(logging.ERROR)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for nome, preparar, executar, repeticoes in casos:
+                    resultados[nome] = self.medir(nome, preparar, executar, repeticoes)
+        finally:
+            log_desempenho.setLevel(nivel_anterior)
+            self.diretorio.cleanup()
+
+        relatorio = {
+            'commit': self.commit(),
+            'data': timezone.now().isoformat(),
+            'banco': connection.vendor,
+            'python': platform.python_version(),
+            'repeticoes': options['repeticoes'],
+            'volumes': {
+                'planos': Plano.objects.count(),
+                'consultores': Consultor.objects.count(),
+                'vendas': Venda.objects.count(),
+                'recebimentos': ControleDeRecebimento.objects.count(),
+            },
+            'resultados': resultados,
+        }
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['saida']}"))
+        if anterior is not None:
+            self.comparar(anterior, relatorio)
+
+    def usuario(self):
+        usuario, _ = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True})
+        return usuario
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def medir(self, nome, preparar, executar, repeticoes):
+        """
+        Executa o caso `aquecimento` + `repeticoes` vezes, cada uma numa
+        transação desfeita ao final. Só `executar` é cronometrado; `preparar`
+        monta a entrada (registro escolhido, planilha) fora da medição.
+        """
+        tempos = []
+        consultas = []
+        for indice in range(self.options['aquecimento'] + repeticoes):
+            with transaction.atomic():
+                entrada = preparar()
+                coletor = ColetorConsultas()
+                with connection.execute_wrapper(coletor):
+                    inicio = time.perf_counter()
+                    executar(entrada)
+                    decorrido = time.perf_counter() - inicio
+                transaction.set_rollback(True)
+            if indice >= self.options['aquecimento']:
+                tempos.append(decorrido * 1000)
+                consultas.append(coletor.quantidade)
+
+        tempos.sort()
+        resultado = {
+            'repeticoes': len(tempos),
+            'min_ms': round(tempos[0], 3),
+            'mediana_ms': round(statistics.median(tempos), 3),
+            'p95_ms': round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+            'max_ms': round(tempos[-1], 3),
+            'media_ms': round(statistics.fmean(tempos), 3),
+            'consultas': max(consultas),
+        }
+        self.stdout.write(
+            f"{nome:<32} mediana {resultado['mediana_ms']:>10.3f} ms  p95 {resultado['p95_ms']:>10.3f} ms  "
+            f"{resultado['consultas']:>5} consultas"
+        )
+        return resultado
+
+    def comparar(self, anterior, atual):
+        self.stdout.write(self.style.SUCCESS(
+            f"Variação das medianas em relação a {anterior.get('commit') or anterior.get('data')}:"
+        ))
+        for nome, resultado in atual['resultados'].items():
+            antes = anterior.get('resultados', {}).get(nome)
+            if not antes or not antes.get('mediana_ms'):
+                self.stdout.write(f"  {nome:<32} (sem medição anterior)")
+                continue
+            variacao = (resultado['mediana_ms'] - antes['mediana_ms']) / antes['mediana_ms'] * 100
+            linha = (
+                f"  {nome:<32} {antes['mediana_ms']:>10.3f} -> {resultado['mediana_ms']:>10.3f} ms ({variacao:+.1f}%)"
+                f"  consultas {antes.get('consultas')} -> {resultado['consultas']}"
+            )
+            if variacao > 10:
+                self.stdout.write(self.style.WARNING(linha))
+            else:
+                self.stdout.write(linha)
+
+    # Casos: (nome, preparar, executar, repetições)
+
+    def casos(self):
+        repeticoes = self.options['repeticoes']
+        amostra_vendas = self.amostra(Venda.objects.all())
+        amostra_abertas = self.amostra(ControleDeRecebimento.objects.exclude(status='Recebido'))
+        venda = Venda.objects.select_related('plano').get(pk=amostra_vendas[0])
+        hoje = datetime.date.today()
+        sequencia = iter(range(10 ** 9))
+
+        def venda_existente():
+            escolhida = Venda.objects.get(pk=self.aleatorio.choice(amostra_vendas))
+            escolhida.valor_plano += 1
+            return escolhida
+
+        def venda_nova():
+            return Venda(**benchmark.dados_venda(
+                self.aleatorio, f'BENCH-RUN-{next(sequencia):09d}', venda.plano, venda.consultor_id, hoje, 365
+            ))
+
+        def recebimento_aberto():
+            if not amostra_abertas:
+                raise CommandError("Nenhum recebimento em aberto para medir marcar_parcela_recebida.")
+            return self.aleatorio.choice(amostra_abertas)
+
+        def marcar(pk):
+            self.verificar(self.cliente.post(f'/api/parcelas/{pk}/marcar-recebida/'), 200)
+
+        casos = [
+            ('venda_save_atualizacao', venda_existente, lambda instancia: instancia.save(), repeticoes),
+            ('venda_save_criacao', venda_nova, lambda instancia: instancia.save(), repeticoes),
+            ('marcar_parcela_recebida', recebimento_aberto, marcar, repeticoes),
+            ('parcelas_atrasadas', lambda: None, self.get('/api/parcelas-atrasadas/'),
+             min(repeticoes, REPETICOES_ATRASADAS)),
+        ]
+        listagens = {
+            'listagem_vendas': f'/api/venda/?page_size={TAMANHO_PAGINA}',
+            'listagem_vendas_ordenada': f'/api/venda/?page_size={TAMANHO_PAGINA}&ordenar=-data_venda',
+            'listagem_vendas_busca': f'/api/venda/?page_size={TAMANHO_PAGINA}&busca={venda.cliente_nome.split()[0]}',
+            'listagem_vendas_filtro': (
+                f'/api/venda/?page_size={TAMANHO_PAGINA}&consultor={venda.consultor_id}'
+                f'&data_venda_inicio={hoje - datetime.timedelta(days=90)}'
+            ),
+            'listagem_recebimentos': f'/api/controlederecebimento/?page_size={TAMANHO_PAGINA}',
+            'listagem_recebimentos_atrasados': f'/api/controlederecebimento/?page_size={TAMANHO_PAGINA}&status=Atrasado',
+            'listagem_planos': '/api/plano/',
+            'listagem_consultores': '/api/consultor/',
+            'fluxo_caixa': '/api/fluxo-caixa/',
+            'indicadores': '/api/indicadores/',
+        }
+        casos.extend((nome, lambda: None, self.get(url), repeticoes) for nome, url in listagens.items())
+        casos.extend(self.casos_importacao(venda))
+        return casos
+
+    def casos_importacao(self, venda):
+        linhas = self.options['linhas_importacao']
+        tipos = [valor for valor, _ in Plano.TIPO_CHOICES]
+        repeticoes = self.options['repeticoes']
+
+        def linha_plano(numero):
+            plano, _ = benchmark.novo_plano(self.aleatorio, f'Benchmark {numero}', self.aleatorio.choice(tipos))
+            return [
+                plano.operadora, plano.comissionamento_total, plano.tipo, plano.numero_parcelas,
+                plano.taxa_plano_valor, plano.taxa_plano_tipo,
+            ]
+
+        arquivo_planos = os.path.join(self.diretorio.name, 'planos.xlsx')
+        benchmark.escrever_planilha(
+            arquivo_planos,
+            ['operadora', 'comissionamento_total', 'tipo', 'numero_parcelas', 'taxa_plano_valor', 'taxa_plano_tipo'],
+            (linha_plano(numero) for numero in range(linhas)),
+        )
+
+        arquivo_vendas = os.path.join(self.diretorio.name, 'vendas.xlsx')
+        planos = list(Plano.objects.all())
+        consultores = list(Consultor.objects.values_list('id', flat=True))
+        hoje = datetime.date.today()
+        campos = [
+            'numero_proposta', 'cliente_nome', 'cliente_documento', 'cliente_email', 'cliente_telefone',
+            'plano_id', 'consultor_id', 'valor_plano', 'desconto_consultor',
+            'data_venda', 'data_vigencia', 'data_vencimento', 'canal_entrada',
+        ]
+
+        def linha_venda(numero):
+            dados = benchmark.dados_venda(
+                self.aleatorio, f'BENCH-IMP-{numero:09d}', self.aleatorio.choice(planos),
+                self.aleatorio.choice(consultores), hoje, 365,
+            )
+            dados['plano_id'] = dados.pop('plano').id
+            return [dados[campo] for campo in campos]
+
+        benchmark.escrever_planilha(arquivo_vendas, campos, (linha_venda(numero) for numero in range(linhas)))
+
+        def planos_sem_parcelas():
+            # Os IDs só existem dentro da transação da repetição: a planilha é gerada a cada vez
+            criados = []
+            for numero in range(max(1, linhas // 4)):
+                plano, _ = benchmark.novo_plano(self.aleatorio, f'Benchmark {numero}', self.aleatorio.choice(tipos))
+                plano.numero_parcelas = 4
+                plano.save()
+                criados.append(plano.id)
+            arquivo = os.path.join(self.diretorio.name, 'parcelas.xlsx')
+            benchmark.escrever_planilha(
+                arquivo,
+                ['plano_id', 'numero_parcela', 'porcentagem_parcela'],
+                ([plano_id, numero, 100] for plano_id in criados for numero in range(1, 5)),
+            )
+            return arquivo
+
+        def importar(comando, **opcoes):
+            return lambda arquivo: call_command(comando, arquivo, stdout=io.StringIO(), stderr=io.StringIO(), **opcoes)
+
+        return [
+            ('importacao_planos', lambda: arquivo_planos, importar('import_planos'), repeticoes),
+            ('importacao_parcelas', planos_sem_parcelas, importar('import_parcelas'), repeticoes),
+            ('importacao_vendas', lambda: arquivo_vendas, importar('import_vendas', workers=1), repeticoes),
+        ]
+
+    def amostra(self, queryset, tamanho=1000, bloco=100):
+        """IDs de até `tamanho` registros espalhados pela tabela, lidos em blocos a partir de IDs sorteados."""
+        limites = queryset.aggregate(menor=Min('id'), maior=Max('id'))
+        if limites['menor'] is None:
+            return []
+        ids = set()
+        for _ in range(max(1, tamanho // bloco)):
+            inicio = self.aleatorio.randint(limites['menor'], limites['maior'])
+            ids.update(queryset.filter(id__gte=inicio).order_by('id').values_list('id', flat=True)[:bloco])
+        return sorted(ids)
+
+    def get(self, url):
+        return lambda entrada: self.verificar(self.cliente.get(url), 200)
+
+    def verificar(self, response, esperado):
+        if response.status_code != esperado:
+            raise CommandError(f"{response.request['PATH_INFO']}: status {response.status_code} (esperado {esperado}).")
+        # Respostas em streaming só são geradas ao serem consumidas
+        if response.streaming:
+            b''.join(response.streaming_content)
@@ -0,0 +1,112 @@
+# backend/api/management/commands/run_jobs.py
+
+import datetime
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from api import tarefas
+
+INTERVALO_RENOVACAO = 30  # segundos
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa as tarefas em segundo plano enfileiradas pela API (api/jobs/). '
+        'Deve ficar em execução como um serviço (ex.: systemd ou supervisor).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Quantidade de tarefas executadas ao mesmo tempo (padrão: 2)'
+        )
+        parser.add_argument(
+            '--processos',
+            action='store_true',
+            help='Executa as tarefas em processos em vez de threads'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos entre as consultas à fila quando não há tarefas (padrão: 2)'
+        )
+        parser.add_argument(
+            '--prazo-interrompidas',
+            type=int,
+            default=300,
+            help='Segundos sem renovação após os quais uma tarefa em execução é reenfileirada (padrão: 300)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Executa as tarefas pendentes e termina, em vez de aguardar novas'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError("--workers deve ser maior que zero.")
+        if options['prazo_interrompidas'] <= INTERVALO_RENOVACAO:
+            raise CommandError(f"--prazo-interrompidas deve ser maior que {INTERVALO_RENOVACAO} segundos.")
+        self.prazo = datetime.timedelta(seconds=options['prazo_interrompidas'])
+
+        self.reenfileirar()
+        if options['processos']:
+            # Os processos abrem suas próprias conexões; fecha as herdadas antes de criá-los
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=tarefas.inicializar_processo)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+
+        self.stdout.write(f"Aguardando tarefas com {workers} workers...")
+        em_execucao = {}
+        renovado_em = time.monotonic()
+        try:
+            with executor:
+                while True:
+                    livres = workers - len(em_execucao)
+                    for tarefa_id in tarefas.reservar(livres) if livres else []:
+                        self.stdout.write(f"Tarefa {tarefa_id} iniciada.")
+                        em_execucao[executor.submit(tarefas.executar, tarefa_id)] = tarefa_id
+
+                    if not em_execucao:
+                        if options['once']:
+                            break
+                        time.sleep(options['intervalo'])
+                        continue
+
+                    concluidas, _ = wait(em_execucao, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                    for futuro in concluidas:
+                        self.relatar(em_execucao.pop(futuro), futuro)
+
+                    if time.monotonic() - renovado_em >= INTERVALO_RENOVACAO:
+                        tarefas.renovar(list(em_execucao.values()))
+                        self.reenfileirar()
+                        renovado_em = time.monotonic()
+        except KeyboardInterrupt:
+            # As tarefas interrompidas voltam para a fila na próxima inicialização
+            self.stdout.write(self.style.WARNING("Worker interrompido."))
+
+    def reenfileirar(self):
+        reenfileiradas, com_erro = tarefas.reenfileirar_interrompidas(self.prazo)
+        if reenfileiradas:
+            self.stdout.write(self.style.WARNING(f"{reenfileiradas} tarefas interrompidas reenfileiradas."))
+        if com_erro:
+            self.stdout.write(self.style.ERROR(
+                f"{com_erro} tarefas interrompidas marcadas com erro após {tarefas.MAXIMO_TENTATIVAS} tentativas."
+            ))
+
+    def relatar(self, tarefa_id, futuro):
+        try:
+            status = futuro.result()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Tarefa {tarefa_id} falhou no worker: {e}"))
+            return
+        if status == 'concluida':
+            self.stdout.write(self.style.SUCCESS(f"Tarefa {tarefa_id} concluída."))
+        else:
+            self.stdout.write(self.style.ERROR(f"Tarefa {tarefa_id} terminou com erro."))
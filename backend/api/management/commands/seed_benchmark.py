@@ -0,0 +1,124 @@
+# backend/api/management/commands/seed_benchmark.py
+
+import datetime
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from api import benchmark
+from api.cache import invalidar
+from api.cronograma import criar_vendas_em_lote, parcelas_por_plano
+from api import fluxo_caixa
+from api.models import Plano, Parcela, Consultor, Venda, ControleDeRecebimento
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma massa de dados sintética (planos, parcelas, consultores, vendas e recebimentos) para os '
+        'benchmarks. Use um banco dedicado (DB_ENGINE/DB_NAME no .env); execuções seguintes acrescentam vendas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendas', type=int, default=1_000_000, help='Vendas a gerar (padrão: 1000000)')
+        parser.add_argument('--planos', type=int, default=40, help='Planos (operadora e tipo) existentes ao final (padrão: 40)')
+        parser.add_argument('--consultores', type=int, default=200, help='Consultores existentes ao final (padrão: 200)')
+        parser.add_argument('--dias', type=int, default=730, help='Período, em dias até hoje, das datas de venda (padrão: 730)')
+        parser.add_argument(
+            '--percentual-recebido',
+            type=int,
+            default=85,
+            help='Percentual das parcelas já vencidas marcadas como recebidas; as demais ficam atrasadas (padrão: 85)'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Vendas gravadas por transação (padrão: 5000)')
+        parser.add_argument('--semente', type=int, default=42, help='Semente do gerador aleatório (padrão: 42)')
+
+    def handle(self, *args, **options):
+        for nome in ('vendas', 'batch_size', 'dias'):
+            if options[nome] < 1:
+                raise CommandError(f"--{nome.replace('_', '-')} deve ser maior que zero.")
+        if not 0 <= options['percentual_recebido'] <= 100:
+            raise CommandError("--percentual-recebido deve estar entre 0 e 100.")
+        tipos = [valor for valor, _ in Plano.TIPO_CHOICES]
+        if options['planos'] > len(benchmark.OPERADORAS) * len(tipos):
+            raise CommandError(f"--planos deve ser no máximo {len(benchmark.OPERADORAS) * len(tipos)}.")
+
+        aleatorio = random.Random(options['semente'])
+        planos = self.criar_planos(aleatorio, options['planos'], tipos)
+        consultores = self.criar_consultores(aleatorio, options['consultores'])
+        if not planos or not consultores:
+            raise CommandError("São necessários ao menos um plano e um consultor.")
+        self.gerar_vendas(aleatorio, planos, consultores, options)
+
+    def criar_planos(self, aleatorio, quantidade, tipos):
+        existentes = set(Plano.objects.values_list('operadora', 'tipo'))
+        combinacoes = [(operadora, tipo) for operadora in benchmark.OPERADORAS for tipo in tipos]
+        aleatorio.shuffle(combinacoes)
+        novos = []
+        for operadora, tipo in combinacoes:
+            if len(existentes) + len(novos) >= quantidade:
+                break
+            if (operadora, tipo) not in existentes:
+                novos.append(benchmark.novo_plano(aleatorio, operadora, tipo))
+        with transaction.atomic():
+            for plano, porcentagens in novos:
+                plano.save()
+                Parcela.objects.bulk_create(benchmark.parcelas_do_plano(plano, porcentagens))
+            invalidar(Parcela)
+        self.stdout.write(f"{len(novos)} planos criados.")
+        return list(Plano.objects.all())
+
+    def criar_consultores(self, aleatorio, quantidade):
+        existentes = Consultor.objects.count()
+        novos = [benchmark.novo_consultor(aleatorio, numero) for numero in range(existentes, quantidade)]
+        Consultor.objects.bulk_create(novos, batch_size=1000)
+        invalidar(Consultor)
+        self.stdout.write(f"{len(novos)} consultores criados.")
+        return list(Consultor.objects.values_list('id', flat=True))
+
+    def gerar_vendas(self, aleatorio, planos, consultores, options):
+        total = options['vendas']
+        batch_size = options['batch_size']
+        hoje = datetime.date.today()
+        parcelas = parcelas_por_plano()
+        # Continua a numeração de execuções anteriores
+        inicio_numeracao = Venda.objects.filter(numero_proposta__startswith=benchmark.PREFIXO_PROPOSTA).count()
+
+        gravadas = 0
+        inicio = time.monotonic()
+        # Os deltas do resumo a cada lote custam mais que a própria carga: reconstrói ao final
+        with fluxo_caixa.suspenso():
+            while gravadas < total:
+                lote = [
+                    Venda(**benchmark.dados_venda(
+                        aleatorio, f'{benchmark.PREFIXO_PROPOSTA}{numero:09d}',
+                        aleatorio.choice(planos), aleatorio.choice(consultores), hoje, options['dias'],
+                    ))
+                    for numero in range(inicio_numeracao + gravadas, inicio_numeracao + min(total, gravadas + batch_size))
+                ]
+                with transaction.atomic():
+                    criar_vendas_em_lote(lote, parcelas, batch_size=1000)
+                    self.registrar_situacao([venda.pk for venda in lote], hoje, options['percentual_recebido'])
+                gravadas += len(lote)
+                decorrido = time.monotonic() - inicio
+                self.stdout.write(f"{gravadas} de {total} vendas gravadas ({gravadas / decorrido:.0f} vendas/s)")
+
+        linhas = fluxo_caixa.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"Massa de dados gerada: {gravadas} vendas em {time.monotonic() - inicio:.1f}s; "
+            f"fluxo de caixa reconstruído com {linhas} linhas."
+        ))
+
+    def registrar_situacao(self, venda_ids, hoje, percentual_recebido):
+        """
+        Marca como recebidas (na data prevista) cerca de `percentual_recebido`% das
+        parcelas vencidas, escolhidas pelo ID, e as demais vencidas como atrasadas.
+        Recebidas na data prevista, as datas das parcelas seguintes não mudam.
+        """
+        vencidas = ControleDeRecebimento.objects.filter(venda_id__in=venda_ids, data_prevista_recebimento__lt=hoje)
+        agora = timezone.now()
+        vencidas.annotate(sorteio=F('id') % 100).filter(sorteio__lt=percentual_recebido).update(
+            status='Recebido', data_recebimento=F('data_prevista_recebimento'), updated_at=agora
+        )
+        vencidas.filter(status='Não Recebido').update(status='Atrasado', updated_at=agora)
@@ -0,0 +1,88 @@
+# backend/api/management/commands/simulate_cashflow.py
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api import simulacao
+from api.serializers import SimulacaoSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Projeta o fluxo de caixa mensal das comissões com alterações hipotéticas nos planos, '
+        'sem gravar nada no banco (requer numpy e pandas)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cenario',
+            type=str,
+            help='Arquivo JSON com o mesmo corpo aceito por POST api/simulacao/'
+        )
+        parser.add_argument('--plano', type=int, help='ID do plano a alterar')
+        parser.add_argument('--operadora', type=str, help='Altera todos os planos da operadora')
+        parser.add_argument('--tipo', type=str, help='Com --operadora, restringe ao tipo de plano')
+        parser.add_argument('--taxa-plano-valor', type=str, help='Nova taxa do plano')
+        parser.add_argument('--taxa-plano-tipo', choices=['Valor Fixo', 'Porcentagem'], help='Novo tipo de taxa')
+        parser.add_argument(
+            '--parcelas',
+            type=str,
+            help='Novas porcentagens das parcelas, em ordem, separadas por vírgula (ex.: 100,50,50)'
+        )
+        parser.add_argument('--consultor', type=int, help='Considera apenas as vendas do consultor')
+        parser.add_argument('--data-inicio', type=str, help='Primeiro mês exibido (AAAA-MM-DD)')
+        parser.add_argument('--data-fim', type=str, help='Último mês exibido (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        dados = {}
+        if options['cenario']:
+            try:
+                with open(options['cenario'], encoding='utf-8') as arquivo:
+                    dados = json.load(arquivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Não foi possível ler o cenário: {e}")
+
+        alteracao = {}
+        if options['plano'] is not None:
+            alteracao['id'] = options['plano']
+        elif options['operadora']:
+            alteracao['operadora'] = options['operadora']
+            if options['tipo']:
+                alteracao['tipo'] = options['tipo']
+        if options['taxa_plano_valor'] is not None:
+            alteracao['taxa_plano_valor'] = options['taxa_plano_valor']
+        if options['taxa_plano_tipo']:
+            alteracao['taxa_plano_tipo'] = options['taxa_plano_tipo']
+        if options['parcelas']:
+            alteracao['parcelas'] = [
+                {'numero_parcela': numero, 'porcentagem_parcela': porcentagem.strip()}
+                for numero, porcentagem in enumerate(options['parcelas'].split(','), start=1)
+            ]
+        if alteracao:
+            dados.setdefault('planos', []).append(alteracao)
+        for nome in ('consultor', 'data_inicio', 'data_fim'):
+            if options[nome] is not None:
+                dados[nome] = options[nome]
+
+        serializer = SimulacaoSerializer(data=dados)
+        if not serializer.is_valid():
+            raise CommandError(f"Cenário inválido: {json.dumps(serializer.errors, ensure_ascii=False)}")
+        try:
+            resultado = simulacao.simular(**serializer.parametros())
+        except simulacao.SimulacaoIndisponivel as e:
+            raise CommandError(str(e))
+
+        atual = {linha['mes']: linha['previsto'] for linha in resultado['atual']}
+        simulado = {linha['mes']: linha['previsto'] for linha in resultado['simulado']}
+        self.stdout.write(f"{'Mês':<8} {'Atual':>16} {'Simulado':>16} {'Diferença':>16}")
+        for mes in sorted(set(atual) | set(simulado)):
+            valor_atual = atual.get(mes, 0)
+            valor_simulado = simulado.get(mes, 0)
+            self.stdout.write(
+                f"{mes:%m/%Y}  {valor_atual:>16,.2f} {valor_simulado:>16,.2f} {valor_simulado - valor_atual:>16,.2f}"
+            )
+        total_atual = sum(atual.values())
+        total_simulado = sum(simulado.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Total previsto: {total_atual:,.2f} atual, {total_simulado:,.2f} simulado "
+            f"({total_simulado - total_atual:+,.2f})."
+        ))
@@ -0,0 +1,60 @@
+# backend/api/management/commands/sweep_overdue.py
+
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.db.models import Q
+from api.models import ControleDeRecebimento
+from api.fluxo_caixa import atualizando
+
+
+class Command(BaseCommand):
+    help = (
+        "Marca como 'Atrasado' as parcelas 'Não Recebido' com data prevista anterior à data de referência. "
+        "Deve ser agendado uma vez por dia (ex.: cron: 5 0 * * * python manage.py sweep_overdue)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data',
+            type=str,
+            help='Data de referência (AAAA-MM-DD); padrão: hoje'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de parcelas atualizadas por transação (padrão: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        hoje = datetime.date.today()
+        if options['data']:
+            hoje = parse_date(options['data'])
+            if hoje is None:
+                raise CommandError("--data inválida. Use o formato AAAA-MM-DD.")
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size deve ser maior que zero.")
+
+        vencidas = ControleDeRecebimento.objects.filter(
+            status='Não Recebido',
+            data_prevista_recebimento__lt=hoje
+        ).order_by('id')
+
+        total = 0
+        ultimo_id = 0
+        while True:
+            # Lotes pequenos por chave primária: cada transação trava poucas linhas
+            ids = list(vencidas.filter(id__gt=ultimo_id).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic(), atualizando(Q(id__in=ids)):
+                total += ControleDeRecebimento.objects.filter(
+                    id__in=ids, status='Não Recebido'
+                ).update(status='Atrasado', updated_at=timezone.now())
+            ultimo_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"{total} parcelas marcadas como atrasadas."))
@@ -0,0 +1,160 @@
+# backend/api/metricas.py
+"""
+Métricas de desempenho por visão, mantidas em memória e exportadas no
+formato texto do Prometheus em api/metrics/.
+
+O MetricasMiddleware registra, para cada requisição, a latência, a
+quantidade de consultas, o tempo total no banco e o tamanho da resposta,
+rotulados pela visão (ex.: VendaViewSet.list, marcar_parcela_recebida).
+Cada processo do servidor mantém os próprios valores: com vários workers,
+o Prometheus soma as séries de cada um (rótulo `instance`/`pid`).
+"""
+
+import os
+import re
+import threading
+
+_lock = threading.Lock()
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+BUCKETS_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def _rotulos(nomes, valores):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    return '{%s}' % ','.join(pares) if pares else ''
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    def __init__(self, nome, ajuda, rotulos):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.valores = {}
+
+    def incrementar(self, rotulos, valor=1):
+        with _lock:
+            self.valores[rotulos] = self.valores.get(rotulos, 0) + valor
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} counter']
+        with _lock:
+            for rotulos, valor in sorted(self.valores.items()):
+                linhas.append(f'{self.nome}{_rotulos(self.rotulos, rotulos)} {_numero(valor)}')
+        return linhas
+
+
+class Histograma:
+    def __init__(self, nome, ajuda, rotulos, buckets):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = buckets
+        # rótulos -> [contagem por bucket (não acumulada), soma, contagem]
+        self.series = {}
+
+    def observar(self, rotulos, valor):
+        with _lock:
+            serie = self.series.get(rotulos)
+            if serie is None:
+                serie = self.series[rotulos] = [[0] * len(self.buckets), 0, 0]
+            for indice, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][indice] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} histogram']
+        nomes_bucket = self.rotulos + ('le',)
+        with _lock:
+            for rotulos, (contagens, soma, total) in sorted(self.series.items()):
+                acumulado = 0
+                for limite, contagem in zip(self.buckets, contagens):
+                    acumulado += contagem
+                    linhas.append(
+                        f'{self.nome}_bucket{_rotulos(nomes_bucket, rotulos + (_numero(limite),))} {acumulado}'
+                    )
+                linhas.append(f'{self.nome}_bucket{_rotulos(nomes_bucket, rotulos + ("+Inf",))} {total}')
+                linhas.append(f'{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {_numero(soma)}')
+                linhas.append(f'{self.nome}_count{_rotulos(self.rotulos, rotulos)} {total}')
+        return linhas
+
+
+REQUISICOES = Contador(
+    'api_requisicoes_total', 'Requisições atendidas, por visão, método e status.', ('visao', 'metodo', 'status')
+)
+DURACAO = Histograma(
+    'api_requisicao_duracao_segundos', 'Latência das requisições.', ('visao', 'metodo'), BUCKETS_SEGUNDOS
+)
+CONSULTAS = Histograma(
+    'api_requisicao_consultas', 'Consultas SQL por requisição.', ('visao', 'metodo'), BUCKETS_CONSULTAS
+)
+TEMPO_BANCO = Histograma(
+    'api_requisicao_banco_segundos', 'Tempo total das consultas SQL por requisição.', ('visao', 'metodo'),
+    BUCKETS_SEGUNDOS
+)
+TAMANHO_RESPOSTA = Histograma(
+    'api_resposta_bytes', 'Tamanho das respostas (exceto streaming).', ('visao', 'metodo'), BUCKETS_BYTES
+)
+METRICAS = (REQUISICOES, DURACAO, CONSULTAS, TEMPO_BANCO, TAMANHO_RESPOSTA)
+
+
+def registrar(visao, metodo, status, duracao, consultas, tempo_banco, tamanho=None):
+    rotulos = (visao, metodo)
+    REQUISICOES.incrementar((visao, metodo, str(status)))
+    DURACAO.observar(rotulos, duracao)
+    CONSULTAS.observar(rotulos, consultas)
+    TEMPO_BANCO.observar(rotulos, tempo_banco)
+    if tamanho is not None:
+        TAMANHO_RESPOSTA.observar(rotulos, tamanho)
+
+
+def exportar():
+    """Todas as métricas no formato texto do Prometheus (versão 0.0.4)."""
+    linhas = [
+        '# HELP api_processo_info Processo que atende as requisições.',
+        '# TYPE api_processo_info gauge',
+        f'api_processo_info{_rotulos(("pid",), (os.getpid(),))} 1',
+    ]
+    for metrica in METRICAS:
+        linhas.extend(metrica.exportar())
+    return '\n'.join(linhas) + '\n'
+
+
+def nome_visao(view_func, metodo):
+    """
+    Nome estável da visão para os rótulos: Classe.ação nos ViewSets, o nome
+    da classe nas APIViews e o nome da função nas visões com @api_view.
+    """
+    classe = getattr(view_func, 'cls', None)
+    if classe is None:
+        return getattr(view_func, '__name__', 'desconhecida')
+    acoes = getattr(view_func, 'actions', None)
+    if acoes:
+        return f'{classe.__name__}.{acoes.get(metodo.lower(), metodo.lower())}'
+    return classe.__name__
+
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTA = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+
+def impressao_sql(sql):
+    """SQL sem parâmetros e literais, com listas IN (...) colapsadas: agrupa consultas repetidas."""
+    sql = _LITERAL_TEXTO.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _LITERAL_NUMERO.sub('?', sql)
+    sql = _LISTA.sub('(...)', sql)
+    return ' '.join(sql.split())
@@ -0,0 +1,278 @@
+# backend/api/middleware.py
+
+import cProfile
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from . import metricas, perfis
+
+logger = logging.getLogger('api.desempenho')
+
+
+class ColetorConsultas:
+    """
+    execute_wrapper que mede as consultas da requisição, agrupadas pelo SQL
+    exato. O agrupamento pela impressão do SQL (metricas.impressao_sql) só é
+    calculado em por_impressao(), quando há o que registrar no log. Com
+    `linha_do_tempo`, guarda também (início relativo, duração, sql) de cada
+    consulta.
+    """
+
+    def __init__(self, linha_do_tempo=False):
+        self.quantidade = 0
+        self.tempo = 0.0
+        # sql -> [execuções, tempo total]
+        self.por_sql = {}
+        self.consultas = [] if linha_do_tempo else None
+        self.criado_em = time.perf_counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.quantidade += 1
+            self.tempo += duracao
+            grupo = self.por_sql.setdefault(sql, [0, 0.0])
+            grupo[0] += 1
+            grupo[1] += duracao
+            if self.consultas is not None:
+                self.consultas.append((inicio - self.criado_em, duracao, sql))
+
+    def por_impressao(self):
+        """impressão -> [execuções, tempo total], somando os SQLs com a mesma impressão."""
+        agrupado = {}
+        for sql, (execucoes, tempo) in self.por_sql.items():
+            grupo = agrupado.setdefault(metricas.impressao_sql(sql), [0, 0.0])
+            grupo[0] += execucoes
+            grupo[1] += tempo
+        return agrupado
+
+
+def instalar_coletor(pilha, coletor):
+    """
+    Instala o coletor nas conexões da thread atual (as conexões do Django são
+    por thread). Sob ASGI, deve rodar via sync_to_async: assim cai na mesma
+    thread da requisição em que o ORM executa as consultas.
+    """
+    for conexao in connections.all():
+        pilha.enter_context(conexao.execute_wrapper(coletor))
+
+
+class AssincronoMixin:
+    """
+    Middleware que funciona tanto sob WSGI quanto sob ASGI: com get_response
+    assíncrono, __call__ devolve a corrotina de `acall` e o Django não
+    precisa levar a requisição para uma thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.acall(request)
+        return self.call(request)
+
+
+class MetricasMiddleware(AssincronoMixin):
+    """
+    Registra latência, consultas, tempo no banco e tamanho da resposta por
+    visão (api/metricas.py) e registra no log as requisições lentas e as
+    consultas repetidas (possível N+1).
+
+    Deve ser o primeiro da lista MIDDLEWARE. Consultas feitas durante o
+    envio de respostas em streaming (exportações) não são contadas.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.limite_lenta = settings.METRICAS_LIMITE_LENTA
+        self.limite_repeticoes = settings.METRICAS_LIMITE_REPETICOES
+
+    def call(self, request):
+        coletor = ColetorConsultas()
+        inicio = time.perf_counter()
+        with ExitStack() as pilha:
+            instalar_coletor(pilha, coletor)
+            response = self.get_response(request)
+        self.registrar(request, response, time.perf_counter() - inicio, coletor)
+        return response
+
+    async def acall(self, request):
+        coletor = ColetorConsultas()
+        inicio = time.perf_counter()
+        pilha = ExitStack()
+        await sync_to_async(instalar_coletor)(pilha, coletor)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pilha.close)()
+        self.registrar(request, response, time.perf_counter() - inicio, coletor)
+        return response
+
+    def registrar(self, request, response, duracao, coletor):
+        visao = getattr(request, 'nome_visao', 'desconhecida')
+        tamanho = None if response.streaming else len(response.content)
+        metricas.registrar(
+            visao, request.method, response.status_code, duracao, coletor.quantidade, coletor.tempo, tamanho
+        )
+        self.analisar(request, visao, duracao, coletor)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.nome_visao = metricas.nome_visao(view_func, request.method)
+
+    def analisar(self, request, visao, duracao, coletor):
+        lenta = duracao >= self.limite_lenta
+        # Abaixo dos dois limites não há o que registrar: as impressões nem são calculadas
+        if not lenta and coletor.quantidade < self.limite_repeticoes:
+            return
+        por_impressao = coletor.por_impressao()
+        # Só leituras: savepoints e os UPDATEs por chave do fluxo de caixa se repetem por natureza
+        repetidas = [
+            (impressao, execucoes)
+            for impressao, (execucoes, _) in por_impressao.items()
+            if execucoes >= self.limite_repeticoes and impressao[:6].upper() == 'SELECT'
+        ]
+        for impressao, execucoes in repetidas:
+            logger.warning(
+                "Possível N+1 em %s %s (%s): %d execuções de %s",
+                request.method, request.path, visao, execucoes, impressao,
+            )
+        if lenta:
+            mais_demoradas = sorted(por_impressao.items(), key=lambda item: item[1][1], reverse=True)[:3]
+            logger.warning(
+                "Requisição lenta: %s %s (%s) em %.3fs, %d consultas, %.3fs no banco.%s",
+                request.method, request.path, visao, duracao, coletor.quantidade, coletor.tempo,
+                ''.join(
+                    f"\n  {tempo:.3f}s em {execucoes}x: {impressao}"
+                    for impressao, (execucoes, tempo) in mais_demoradas
+                ),
+            )
+
+
+def usuario_autenticado(request):
+    """Usuário da sessão ou do JWT da requisição, fora das visões do DRF (None se anônimo)."""
+    # A API autentica por JWT dentro das visões do DRF; o admin, por sessão
+    if request.user.is_authenticated:
+        return request.user
+    try:
+        autenticado = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return autenticado[0] if autenticado else None
+
+
+class PerfilMiddleware(AssincronoMixin):
+    """
+    Perfil sob demanda: requisições de usuários staff com o cabeçalho
+    X-Profile: 1 ou o parâmetro ?profile=1 são executadas sob o cProfile,
+    e o perfil e a linha do tempo das consultas SQL são gravados em
+    PERFIS_DIR (api/perfis.py). A resposta traz o ID no cabeçalho
+    X-Profile-Id; os perfis são listados em api/perfis/ (só administradores).
+
+    Sem o gatilho, o custo é só a verificação do cabeçalho e do parâmetro.
+    Deve vir depois do AuthenticationMiddleware. Sob ASGI, o cProfile vê só
+    a thread do loop de eventos (incluindo outras requisições em andamento):
+    o tempo das consultas aparece como espera e fica detalhado na linha do
+    tempo SQL.
+    """
+    # Um perfil por vez em cada processo: o cProfile não admite dois ativos ao mesmo tempo
+    _em_uso = threading.Lock()
+
+    @staticmethod
+    def solicitado(request):
+        return request.META.get('HTTP_X_PROFILE') == '1' or request.GET.get('profile') == '1'
+
+    def call(self, request):
+        if not self.solicitado(request):
+            return self.get_response(request)
+        usuario = self.usuario(request)
+        if usuario is None or not usuario.is_staff:
+            return self.get_response(request)
+        if not self._em_uso.acquire(blocking=False):
+            response = self.get_response(request)
+            response['X-Profile'] = 'ocupado'
+            return response
+        try:
+            return self.perfilar(request, usuario)
+        finally:
+            self._em_uso.release()
+
+    async def acall(self, request):
+        if not self.solicitado(request):
+            return await self.get_response(request)
+        usuario = await sync_to_async(self.usuario)(request)
+        if usuario is None or not usuario.is_staff:
+            return await self.get_response(request)
+        if not self._em_uso.acquire(blocking=False):
+            response = await self.get_response(request)
+            response['X-Profile'] = 'ocupado'
+            return response
+        try:
+            return await self.aperfilar(request, usuario)
+        finally:
+            self._em_uso.release()
+
+    @staticmethod
+    def usuario(request):
+        return usuario_autenticado(request)
+
+    def perfilar(self, request, usuario):
+        coletor = ColetorConsultas(linha_do_tempo=True)
+        profiler = cProfile.Profile()
+        inicio = time.perf_counter()
+        with ExitStack() as pilha:
+            instalar_coletor(pilha, coletor)
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duracao = time.perf_counter() - inicio
+        return self.salvar(request, response, usuario, profiler, coletor, duracao)
+
+    async def aperfilar(self, request, usuario):
+        coletor = ColetorConsultas(linha_do_tempo=True)
+        profiler = cProfile.Profile()
+        inicio = time.perf_counter()
+        pilha = ExitStack()
+        await sync_to_async(instalar_coletor)(pilha, coletor)
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+            await sync_to_async(pilha.close)()
+        duracao = time.perf_counter() - inicio
+        return await sync_to_async(self.salvar)(request, response, usuario, profiler, coletor, duracao)
+
+    def salvar(self, request, response, usuario, profiler, coletor, duracao):
+        perfil_id = perfis.salvar(profiler, {
+            'metodo': request.method,
+            'caminho': request.get_full_path(),
+            'visao': getattr(request, 'nome_visao', 'desconhecida'),
+            'status': response.status_code,
+            'usuario': usuario.get_username(),
+            'duracao': round(duracao * 1000, 3),
+            'consultas': coletor.quantidade,
+            'tempo_banco': round(coletor.tempo * 1000, 3),
+        }, coletor.consultas)
+        response['X-Profile-Id'] = perfil_id
+        logger.info("Perfil %s gravado: %s %s em %.3fs", perfil_id, request.method, request.path, duracao)
+        return response
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:23
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remover_parcelas_duplicadas(apps, schema_editor):
+    # Importações antigas podiam duplicar (plano, numero_parcela). Mantém a
+    # parcela de menor ID e aponta para ela os recebimentos das duplicadas.
+    Parcela = apps.get_model('api', 'Parcela')
+    ControleDeRecebimento = apps.get_model('api', 'ControleDeRecebimento')
+    duplicadas = (
+        Parcela.objects.values('plano_id', 'numero_parcela')
+        .annotate(total=Count('id'), manter=Min('id'))
+        .filter(total__gt=1)
+    )
+    for grupo in duplicadas:
+        outras = Parcela.objects.filter(
+            plano_id=grupo['plano_id'], numero_parcela=grupo['numero_parcela']
+        ).exclude(id=grupo['manter'])
+        ControleDeRecebimento.objects.filter(parcela__in=outras).update(parcela_id=grupo['manter'])
+        outras.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_venda_canal_entrada'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='controlederecebimento',
+            index=models.Index(fields=['status', 'data_prevista_recebimento'], name='receb_status_prevista_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='controlederecebimento',
+            index=models.Index(fields=['data_prevista_recebimento'], name='receb_prevista_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='controlederecebimento',
+            index=models.Index(fields=['venda', 'parcela'], name='receb_venda_parcela_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['data_venda'], name='venda_data_venda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['consultor', 'data_venda'], name='venda_consultor_data_idx'),
+        ),
+        migrations.RunPython(remover_parcelas_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='parcela',
+            constraint=models.UniqueConstraint(fields=('plano', 'numero_parcela'), name='parcela_plano_numero_uniq'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:25
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def preencher_valores(apps, schema_editor):
+    # Mesmo cálculo de Venda.atualizar_valores(), indisponível no modelo histórico
+    Venda = apps.get_model('api', 'Venda')
+    centavos = Decimal('0.01')
+    ultimo_id = 0
+    while True:
+        lote = list(
+            Venda.objects.filter(id__gt=ultimo_id).order_by('id').select_related('plano')
+            .only('id', 'valor_plano', 'desconto_consultor', 'plano__taxa_plano_valor',
+                  'plano__taxa_plano_tipo', 'plano__comissionamento_total')[:1000]
+        )
+        if not lote:
+            break
+        for venda in lote:
+            plano = venda.plano
+            valor = venda.valor_plano - venda.desconto_consultor
+            if plano.taxa_plano_tipo == 'Valor Fixo':
+                valor -= plano.taxa_plano_valor
+            elif plano.taxa_plano_tipo == 'Porcentagem':
+                valor -= valor * (plano.taxa_plano_valor / Decimal(100))
+            venda.valor_liquido = valor.quantize(centavos, rounding=ROUND_HALF_UP)
+            venda.comissao_prevista = (valor * (plano.comissionamento_total / Decimal(100))).quantize(
+                centavos, rounding=ROUND_HALF_UP
+            )
+        Venda.objects.bulk_update(lote, ['valor_liquido', 'comissao_prevista'])
+        ultimo_id = lote[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venda',
+            name='comissao_prevista',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0.0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='valor_liquido',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(preencher_valores, migrations.RunPython.noop),
+    ]
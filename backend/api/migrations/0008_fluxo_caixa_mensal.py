@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def preencher_fluxo_caixa(apps, schema_editor):
+    # Carga inicial do resumo; depois ele é mantido de forma incremental
+    ControleDeRecebimento = apps.get_model('api', 'ControleDeRecebimento')
+    FluxoCaixaMensal = apps.get_model('api', 'FluxoCaixaMensal')
+    linhas = (
+        ControleDeRecebimento.objects
+        .annotate(mes=TruncMonth('data_prevista_recebimento'))
+        .values('mes', 'venda__plano_id', 'venda__consultor_id', 'status')
+        .annotate(valor_total=Sum('valor_parcela'), quantidade=Count('id'))
+        .order_by()
+    )
+    FluxoCaixaMensal.objects.bulk_create(
+        (
+            FluxoCaixaMensal(
+                mes=linha['mes'], plano_id=linha['venda__plano_id'], consultor_id=linha['venda__consultor_id'],
+                status=linha['status'], valor_total=linha['valor_total'], quantidade=linha['quantidade'],
+            )
+            for linha in linhas
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_venda_valores_persistidos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FluxoCaixaMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('status', models.CharField(choices=[('Recebido', 'Recebido'), ('Não Recebido', 'Não Recebido'), ('Atrasado', 'Atrasado')], max_length=20)),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0.0, max_digits=16)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('consultor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.consultor')),
+                ('plano', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.plano')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('mes', 'plano', 'consultor', 'status'), name='fluxo_caixa_chave_uniq')],
+            },
+        ),
+        migrations.RunPython(preencher_fluxo_caixa, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_fluxo_caixa_mensal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='controlederecebimento',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='Exclusao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('venda', 'Venda'), ('controlederecebimento', 'Controle de Recebimento')], max_length=30)),
+                ('objeto_id', models.BigIntegerField()),
+                ('excluido_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['modelo', 'excluido_em'], name='exclusao_modelo_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:43
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_sincronizacao_incremental'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('importar_vendas', 'Importar vendas'), ('exportar_vendas', 'Exportar vendas'), ('exportar_recebimentos', 'Exportar recebimentos'), ('regenerar_cronogramas', 'Regenerar cronogramas'), ('reconstruir_fluxo_caixa', 'Reconstruir fluxo de caixa')], max_length=30)),
+                ('parametros', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=20)),
+                ('progresso', models.PositiveSmallIntegerField(default=0)),
+                ('mensagem', models.CharField(blank=True, max_length=255)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('erro', models.TextField(blank=True)),
+                ('arquivo_entrada', models.CharField(blank=True, max_length=255)),
+                ('arquivo_saida', models.CharField(blank=True, max_length=255)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True)),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+                ('atualizada_em', models.DateTimeField(auto_now=True)),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'criada_em'], name='tarefa_status_criada_idx')],
+            },
+        ),
+    ]
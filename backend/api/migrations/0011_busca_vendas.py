@@ -0,0 +1,54 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:45
+
+import re
+
+from django.db import migrations, models
+
+
+def preencher_documento_normalizado(apps, schema_editor):
+    Venda = apps.get_model('api', 'Venda')
+    ultimo_id = 0
+    while True:
+        lote = list(Venda.objects.filter(id__gt=ultimo_id).order_by('id').only('id', 'cliente_documento')[:1000])
+        if not lote:
+            break
+        for venda in lote:
+            venda.cliente_documento_normalizado = re.sub(r'\D', '', venda.cliente_documento or '')
+        Venda.objects.bulk_update(lote, ['cliente_documento_normalizado'])
+        ultimo_id = lote[-1].id
+
+
+def criar_indice_fulltext(apps, schema_editor):
+    # Busca por palavras do nome (MATCH ... AGAINST, ver api/filtros.py); só no MySQL
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('CREATE FULLTEXT INDEX venda_cliente_nome_ft ON api_venda (cliente_nome)')
+
+
+def remover_indice_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX venda_cliente_nome_ft ON api_venda')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_tarefas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venda',
+            name='cliente_documento_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['data_vigencia'], name='venda_data_vigencia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['cliente_nome'], name='venda_cliente_nome_idx'),
+        ),
+        migrations.RunPython(preencher_documento_normalizado, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_fulltext, remover_indice_fulltext),
+    ]
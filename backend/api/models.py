@@ -1,9 +1,14 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
 from django.utils import timezone
 import datetime
-from django.db.models.signals import pre_save, post_save
+import re
+from django.db.models.signals import post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
+from django.db.models.functions import Round
+
+from .exclusoes import ExclusaoEmConjuntoMixin, ExclusaoEmConjuntoQuerySet
 
 
 #class Cliente(models.Model):
@@ -14,7 +19,7 @@ from decimal import Decimal
 #    def __str__(self):
 #        return self.nome
 
-class Plano(models.Model):
+class Plano(ExclusaoEmConjuntoMixin, models.Model):
     TIPO_CHOICES = (
         ('PME', 'PME'),
         ('PF', 'Pessoa Física'),
@@ -32,33 +37,123 @@ class Plano(models.Model):
     comissionamento_total = models.DecimalField(max_digits=6, decimal_places=2)  # Ex: 300.00%
     tipo = models.CharField(max_length=50, choices=TIPO_CHOICES)
     numero_parcelas = models.PositiveIntegerField()
-    taxa_plano_valor = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    taxa_plano_valor = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     taxa_plano_tipo = models.CharField(max_length=20, choices=TAXA_TIPO_CHOICES, default='Valor Fixo')
 
+    objects = ExclusaoEmConjuntoQuerySet.as_manager()
+
     class Meta:
         unique_together = ('operadora', 'tipo')
 
     def __str__(self):
         return f"{self.operadora} - {self.tipo}"
 
-class Parcela(models.Model):
+    # Campos que alteram os valores persistidos nas vendas do plano
+    CAMPOS_VALORES = ('comissionamento_total', 'taxa_plano_valor', 'taxa_plano_tipo')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valores_anteriores = instance._capturar_valores()
+        return instance
+
+    def _capturar_valores(self):
+        return {campo: self.__dict__.get(campo) for campo in self.CAMPOS_VALORES}
+
+    def save(self, *args, **kwargs):
+        valores_alterados = (
+            not self._state.adding
+            and getattr(self, '_valores_anteriores', None) != self._capturar_valores()
+        )
+        criando = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if valores_alterados:
+                self.recalcular_vendas()
+            elif not criando:
+                self.marcar_vendas_alteradas()
+        self._valores_anteriores = self._capturar_valores()
+
+    def expressoes_valores(self):
+        """Expressões SQL de valor_liquido e comissao_prevista para as vendas deste plano."""
+        decimal = models.DecimalField(max_digits=14, decimal_places=2)
+        centavos = Decimal('0.01')
+        valor = models.F('valor_plano') - models.F('desconto_consultor')
+        taxa = models.Value(Decimal(str(self.taxa_plano_valor)).quantize(centavos, ROUND_HALF_UP), output_field=decimal)
+        if self.taxa_plano_tipo == 'Valor Fixo':
+            liquido = valor - taxa
+        elif self.taxa_plano_tipo == 'Porcentagem':
+            liquido = valor - valor * taxa / models.Value(Decimal(100), output_field=decimal)
+        else:
+            liquido = valor
+        comissionamento = Decimal(str(self.comissionamento_total)).quantize(centavos, ROUND_HALF_UP)
+        comissao = liquido * models.Value(comissionamento, output_field=decimal) / models.Value(
+            Decimal(100), output_field=decimal
+        )
+        return (
+            Round(models.ExpressionWrapper(liquido, output_field=decimal), 2),
+            Round(models.ExpressionWrapper(comissao, output_field=decimal), 2),
+        )
+
+    def recalcular_vendas(self, batch_size=1000):
+        """
+        Atualiza valor_liquido e comissao_prevista de todas as vendas do plano.
+        No MySQL, com um único UPDATE (aritmética DECIMAL exata); nos demais
+        bancos, com Venda.atualizar_valores() em lotes, já que o SQLite faz a
+        conta em inteiros e floats e o resultado difere do save() em centavos.
+        """
+        vendas = Venda.objects.filter(plano=self)
+        agora = timezone.now()
+        if connection.vendor == 'mysql':
+            valor_liquido, comissao_prevista = self.expressoes_valores()
+            return vendas.update(valor_liquido=valor_liquido, comissao_prevista=comissao_prevista, updated_at=agora)
+
+        vendas = vendas.only('id', 'valor_plano', 'desconto_consultor', 'cliente_documento', 'plano').order_by('id')
+        total = 0
+        ultimo_id = 0
+        while True:
+            lote = list(vendas.filter(id__gt=ultimo_id)[:batch_size])
+            if not lote:
+                return total
+            for venda in lote:
+                venda.plano = self
+                venda.atualizar_valores()
+                venda.updated_at = agora
+            Venda.objects.bulk_update(lote, ['valor_liquido', 'comissao_prevista', 'updated_at'])
+            total += len(lote)
+            ultimo_id = lote[-1].id
+
+    def marcar_vendas_alteradas(self):
+        """Renova updated_at das vendas do plano, que o incluem na sua representação."""
+        return Venda.objects.filter(plano=self).update(updated_at=timezone.now())
+
+class Parcela(ExclusaoEmConjuntoMixin, models.Model):
     plano = models.ForeignKey(Plano, on_delete=models.CASCADE)
     numero_parcela = models.PositiveIntegerField()
     porcentagem_parcela = models.DecimalField(max_digits=6, decimal_places=2)
 
+    objects = ExclusaoEmConjuntoQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['plano', 'numero_parcela'], name='parcela_plano_numero_uniq'),
+        ]
+
     def __str__(self):
         return f"Parcela {self.numero_parcela} - Plano {self.plano.operadora}"
 
-class Consultor(models.Model):
+class Consultor(ExclusaoEmConjuntoMixin, models.Model):
     nome = models.CharField(max_length=255)
     telefone = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
 
+    objects = ExclusaoEmConjuntoQuerySet.as_manager()
+
     def __str__(self):
         return self.nome
 
 
-class Venda(models.Model):
+class Venda(ExclusaoEmConjuntoMixin, models.Model):
     numero_proposta = models.CharField(max_length=100, unique=True)
     
     # Novos campos para dados do cliente
@@ -71,7 +166,7 @@ class Venda(models.Model):
     plano = models.ForeignKey('Plano', on_delete=models.CASCADE)
     consultor = models.ForeignKey('Consultor', on_delete=models.CASCADE)
     valor_plano = models.DecimalField(max_digits=10, decimal_places=2)
-    desconto_consultor = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    desconto_consultor = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     data_venda = models.DateField(default=timezone.now)
     data_vigencia = models.DateField()
     data_vencimento = models.DateField()
@@ -88,8 +183,32 @@ class Venda(models.Model):
         choices=canal_entrada,
         default='Indicação'
     )
+    # Valores derivados do plano, persistidos para filtros, ordenação e somas em SQL.
+    # Mantidos por save(), Plano.recalcular_vendas() e o comando backfill_valores.
+    valor_liquido = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), db_index=True, editable=False)
+    comissao_prevista = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), db_index=True, editable=False)
+    # CPF/CNPJ só com dígitos, para a busca por prefixo (?busca=). Mantido por
+    # atualizar_valores(), como os valores acima.
+    cliente_documento_normalizado = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
+    # Última alteração, para a sincronização incremental (?changed_since=). Gravações
+    # com bulk_update/update não passam por auto_now e devem preenchê-lo.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ExclusaoEmConjuntoQuerySet.as_manager()
 
-    def valor_liquido(self):
+    class Meta:
+        indexes = [
+            # Dashboards e indicadores: período, com ou sem filtro de consultor
+            models.Index(fields=['data_venda'], name='venda_data_venda_idx'),
+            models.Index(fields=['consultor', 'data_venda'], name='venda_consultor_data_idx'),
+            # Filtros e ordenação da listagem; cliente_nome também atende à busca
+            # por prefixo (LIKE 'termo%'). No MySQL há ainda um índice FULLTEXT
+            # em cliente_nome, criado pela migração 0011.
+            models.Index(fields=['data_vigencia'], name='venda_data_vigencia_idx'),
+            models.Index(fields=['cliente_nome'], name='venda_cliente_nome_idx'),
+        ]
+
+    def calcular_valor_liquido(self):
         valor = self.valor_plano - self.desconto_consultor
 
         taxa_valor = self.plano.taxa_plano_valor
@@ -102,43 +221,96 @@ class Venda(models.Model):
     
         return valor
 
+    def calcular_comissao_prevista(self):
+        return self.calcular_valor_liquido() * (self.plano.comissionamento_total / Decimal(100))
+
+    # Campos persistidos recalculados por atualizar_valores(); gravações com
+    # bulk_update devem incluí-los
+    CAMPOS_CALCULADOS = ('valor_liquido', 'comissao_prevista', 'cliente_documento_normalizado')
+
+    def atualizar_valores(self):
+        """Recalcula os campos persistidos de CAMPOS_CALCULADOS."""
+        centavos = Decimal('0.01')
+        self.valor_liquido = self.calcular_valor_liquido().quantize(centavos, rounding=ROUND_HALF_UP)
+        self.comissao_prevista = self.calcular_comissao_prevista().quantize(centavos, rounding=ROUND_HALF_UP)
+        self.cliente_documento_normalizado = normalizar_documento(self.cliente_documento)
 
     def __str__(self):
         return f"Proposta {self.numero_proposta} - {self.cliente_nome}"
 
+    # Campos que alteram o cronograma de recebimentos
+    CAMPOS_CRONOGRAMA = ('plano_id', 'valor_plano', 'desconto_consultor', 'data_vigencia')
+    # Campos que alteram a contribuição da venda ao FluxoCaixaMensal
+    CAMPOS_MONITORADOS = CAMPOS_CRONOGRAMA + ('consultor_id',)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valores_monitorados = instance._capturar_valores_monitorados()
+        return instance
+
+    def _capturar_valores_monitorados(self):
+        return {campo: self.__dict__.get(campo) for campo in self.CAMPOS_MONITORADOS}
+
+    def _campos_alterados(self, campos):
+        valores_anteriores = getattr(self, '_valores_monitorados', None)
+        if valores_anteriores is None:
+            return True
+        return any(valores_anteriores[campo] != self.__dict__.get(campo) for campo in campos)
+
+    def cronograma_alterado(self):
+        return self._campos_alterados(self.CAMPOS_CRONOGRAMA)
+
     def save(self, *args, **kwargs):
-        super(Venda, self).save(*args, **kwargs)
-        # Atualiza ou recria os controles de recebimento conforme a lógica já existente
-        self.controlederecebimento_set.all().delete()
-        valor_liquido = self.valor_liquido()
-        valor_plano_sem_descontos = self.valor_plano
-
-        parcelas = Parcela.objects.filter(plano=self.plano).order_by('numero_parcela')
-        previous_data_recebimento_or_prevista = None
-
-        for parcela in parcelas:
-            if parcela.numero_parcela == 1:
-                valor_parcela = valor_liquido * (parcela.porcentagem_parcela / Decimal(100))
-                data_prevista = self.data_vigencia + datetime.timedelta(days=30)
+        from .cronograma import sincronizar_recebimentos
+        from .fluxo_caixa import atualizando
+
+        criando = self._state.adding
+        self.atualizar_valores()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.CAMPOS_CALCULADOS) | {'updated_at'}
+        with transaction.atomic():
+            if criando or not self._campos_alterados(self.CAMPOS_MONITORADOS):
+                super(Venda, self).save(*args, **kwargs)
             else:
-                valor_parcela = valor_plano_sem_descontos * (parcela.porcentagem_parcela / Decimal(100))
-                data_base = previous_data_recebimento_or_prevista or (self.data_vigencia + datetime.timedelta(days=30 * (parcela.numero_parcela - 1)))
-                data_prevista = data_base + datetime.timedelta(days=30)
+                # Plano ou consultor podem mudar: o resumo é ajustado pela diferença
+                with atualizando(models.Q(venda_id=self.pk)):
+                    super(Venda, self).save(*args, **kwargs)
+                    if self.cronograma_alterado():
+                        sincronizar_recebimentos(self)
+            # Regenera os controles de recebimento apenas quando algo que os afeta mudou
+            if criando:
+                sincronizar_recebimentos(self)
+        self._valores_monitorados = self._capturar_valores_monitorados()
+
+
+def normalizar_documento(documento):
+    """CPF/CNPJ apenas com os dígitos."""
+    return re.sub(r'\D', '', documento or '')
 
-            ControleDeRecebimento.objects.create(
-                venda=self,
-                parcela=parcela,
-                valor_parcela=valor_parcela,
-                data_prevista_recebimento=data_prevista,
-                status='Não Recebido'
-            )
-            previous_data_recebimento_or_prevista = data_prevista  # ou atualizar conforme a lógica
 
+def filtro_atrasados(hoje=None):
+    """Parcelas vencidas: já marcadas como 'Atrasado' ou 'Não Recebido' com previsão anterior a hoje."""
+    hoje = hoje or datetime.date.today()
+    return models.Q(status='Atrasado') | models.Q(status='Não Recebido', data_prevista_recebimento__lt=hoje)
 
 
+class ControleDeRecebimentoQuerySet(ExclusaoEmConjuntoQuerySet, models.QuerySet):
+    def atrasados(self, hoje=None):
+        return self.filter(filtro_atrasados(hoje))
 
+    def com_status_efetivo(self, hoje=None):
+        """Anota `status_efetivo`, que já considera atrasadas as parcelas vencidas ainda não varridas."""
+        hoje = hoje or datetime.date.today()
+        return self.annotate(status_efetivo=models.Case(
+            models.When(status='Não Recebido', data_prevista_recebimento__lt=hoje, then=models.Value('Atrasado')),
+            default=models.F('status'),
+            output_field=models.CharField(),
+        ))
 
-class ControleDeRecebimento(models.Model):
+
+class ControleDeRecebimento(ExclusaoEmConjuntoMixin, models.Model):
     STATUS_CHOICES = (
         ('Recebido', 'Recebido'),
         ('Não Recebido', 'Não Recebido'),
@@ -151,39 +323,198 @@ class ControleDeRecebimento(models.Model):
     data_recebimento = models.DateField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Não Recebido')
     numero_extrato = models.CharField(max_length=100, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ControleDeRecebimentoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Parcelas atrasadas e sweep_overdue: status + data prevista
+            models.Index(fields=['status', 'data_prevista_recebimento'], name='receb_status_prevista_idx'),
+            # Previsão de recebimentos por período
+            models.Index(fields=['data_prevista_recebimento'], name='receb_prevista_idx'),
+            # Propagação de datas: parcelas de uma venda
+            models.Index(fields=['venda', 'parcela'], name='receb_venda_parcela_idx'),
+        ]
 
     def __str__(self):
         return f"Recebimento Parcela {self.parcela.numero_parcela} - Venda {self.venda.numero_proposta}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda o valor carregado para detectar alterações sem um SELECT extra
+        instance = super().from_db(db, field_names, values)
+        instance._data_recebimento_anterior = instance.__dict__.get('data_recebimento')
+        instance._fluxo_anterior = instance.valores_fluxo_caixa()
+        return instance
+
+    def valores_fluxo_caixa(self):
+        """(data prevista, status, valor) que determinam a contribuição ao FluxoCaixaMensal."""
+        return (
+            self.__dict__.get('data_prevista_recebimento'),
+            self.__dict__.get('status'),
+            self.__dict__.get('valor_parcela'),
+        )
+
+    def data_recebimento_alterada(self):
+        if not hasattr(self, '_data_recebimento_anterior'):
+            return True
+        return self._data_recebimento_anterior != self.data_recebimento
     
 
-# Definição dos sinais fora da classe Venda
+class FluxoCaixaMensal(models.Model):
+    """
+    Resumo materializado dos recebimentos por mês previsto, plano (operadora
+    e tipo), consultor e status. Mantido de forma incremental por
+    api/fluxo_caixa.py e reconstruído pelo comando rebuild_cashflow.
+    """
+    mes = models.DateField()  # primeiro dia do mês de data_prevista_recebimento
+    plano = models.ForeignKey(Plano, on_delete=models.CASCADE)
+    consultor = models.ForeignKey(Consultor, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=ControleDeRecebimento.STATUS_CHOICES)
+    valor_total = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    quantidade = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'plano', 'consultor', 'status'], name='fluxo_caixa_chave_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} - {self.plano} - {self.consultor} - {self.status}"
+
+
+class Exclusao(models.Model):
+    """
+    Registro (tombstone) de vendas e recebimentos excluídos, devolvido pela
+    sincronização incremental para que os clientes removam suas cópias.
+    """
+    MODELO_CHOICES = (
+        ('venda', 'Venda'),
+        ('controlederecebimento', 'Controle de Recebimento'),
+    )
+    modelo = models.CharField(max_length=30, choices=MODELO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    excluido_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['modelo', 'excluido_em'], name='exclusao_modelo_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id} excluído em {self.excluido_em:%d/%m/%Y %H:%M}"
+
+
+class Tarefa(models.Model):
+    """
+    Tarefa em segundo plano (importação, exportação, regeneração de
+    cronogramas), executada pelo comando run_jobs e acompanhada pelo
+    frontend em api/jobs/<id>/. Ver api/tarefas.py.
+    """
+    TIPO_CHOICES = (
+        ('importar_vendas', 'Importar vendas'),
+        ('exportar_vendas', 'Exportar vendas'),
+        ('exportar_recebimentos', 'Exportar recebimentos'),
+        ('regenerar_cronogramas', 'Regenerar cronogramas'),
+        ('reconstruir_fluxo_caixa', 'Reconstruir fluxo de caixa'),
+    )
+    STATUS_CHOICES = (
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    )
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    parametros = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pendente')
+    progresso = models.PositiveSmallIntegerField(default=0)  # 0 a 100
+    mensagem = models.CharField(max_length=255, blank=True)
+    resultado = models.JSONField(null=True, blank=True)
+    erro = models.TextField(blank=True)
+    # Caminhos relativos a TAREFAS_DIR
+    arquivo_entrada = models.CharField(max_length=255, blank=True)
+    arquivo_saida = models.CharField(max_length=255, blank=True)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    criado_por = models.ForeignKey('auth.User', null=True, blank=True, on_delete=models.SET_NULL)
+    criada_em = models.DateTimeField(auto_now_add=True)
+    iniciada_em = models.DateTimeField(null=True, blank=True)
+    concluida_em = models.DateTimeField(null=True, blank=True)
+    # Renovado pelo worker enquanto a tarefa executa; tarefas 'executando'
+    # sem renovação recente foram interrompidas e voltam para a fila
+    atualizada_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'criada_em'], name='tarefa_status_criada_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_status_display()})"
 
-@receiver(pre_save, sender=ControleDeRecebimento)
-def store_previous_data_recebimento(sender, instance, **kwargs):
-    if instance.pk:
-        # Obtém a instância antes da atualização
-        previous_instance = ControleDeRecebimento.objects.get(pk=instance.pk)
-        instance._previous_data_recebimento = previous_instance.data_recebimento
-    else:
-        instance._previous_data_recebimento = None
+
+# Definição dos sinais fora da classe Venda
 
 @receiver(post_save, sender=ControleDeRecebimento)
 def update_expected_dates(sender, instance, created, **kwargs):
+    from .fluxo_caixa import registrar_alteracao
+    registrar_alteracao(instance, None if created else getattr(instance, '_fluxo_anterior', None))
+    instance._fluxo_anterior = instance.valores_fluxo_caixa()
+
+    if not created and instance.data_recebimento_alterada():
+        # A data de recebimento foi alterada: reprograma as parcelas seguintes
+        from .cronograma import propagar_datas_previstas
+        propagar_datas_previstas(instance.venda_id, instance.parcela.numero_parcela)
+    instance._data_recebimento_anterior = instance.data_recebimento
+
+
+def _exclusao_de_venda(origin):
+    """Indica se a exclusão partiu de vendas (inclusive via plano ou consultor)."""
+    modelos = (Venda, Plano, Consultor)
+    return isinstance(origin, modelos) or getattr(origin, 'model', None) in modelos
+
+
+# Os dois sinais abaixo só contabilizam exclusões feitas fora de
+# exclusoes.excluindo(), que já desconta do resumo todos os recebimentos
+# removidos de uma vez
+
+@receiver(post_delete, sender=ControleDeRecebimento)
+def remover_do_fluxo_caixa(sender, instance, origin=None, **kwargs):
+    # Exclusões em cascata de vendas são descontadas de uma vez em
+    # descontar_venda_do_fluxo_caixa
+    if _exclusao_de_venda(origin):
+        return
+    from .fluxo_caixa import registrar_alteracao
+    registrar_alteracao(None, instance.valores_fluxo_caixa(), venda_id=instance.venda_id)
+
+
+@receiver(pre_delete, sender=Venda)
+def descontar_venda_do_fluxo_caixa(sender, instance, **kwargs):
+    from .fluxo_caixa import descontar_vendas
+    descontar_vendas([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Plano)
+@receiver([post_save, post_delete], sender=Parcela)
+@receiver([post_save, post_delete], sender=Consultor)
+def invalidar_cache_referencia(sender, **kwargs):
+    from .cache import invalidar
+    invalidar(sender)
+
+
+@receiver(post_save, sender=Consultor)
+def marcar_vendas_do_consultor(sender, instance, created, **kwargs):
+    # O consultor faz parte da representação das vendas: a sincronização
+    # incremental (?changed_since=) deve reenviá-las
     if not created:
-        previous_data_recebimento = getattr(instance, '_previous_data_recebimento', None)
-        if previous_data_recebimento != instance.data_recebimento:
-            # A data de recebimento foi alterada
-            subsequent_installments = ControleDeRecebimento.objects.filter(
-                venda=instance.venda,
-                parcela__numero_parcela__gt=instance.parcela.numero_parcela
-            ).order_by('parcela__numero_parcela')
-
-            previous_date = instance.data_recebimento or instance.data_prevista_recebimento
-
-            for installment in subsequent_installments:
-                data_base = previous_date
-                new_data_prevista = data_base + datetime.timedelta(days=30)
-                if installment.data_prevista_recebimento != new_data_prevista:
-                    installment.data_prevista_recebimento = new_data_prevista
-                    installment.save(update_fields=['data_prevista_recebimento'])
-                previous_date = installment.data_recebimento or installment.data_prevista_recebimento
+        Venda.objects.filter(consultor=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Venda)
+@receiver(post_delete, sender=ControleDeRecebimento)
+def registrar_exclusao(sender, instance, **kwargs):
+    # Se a venda do recebimento continua existindo, sua representação
+    # (parcelas_recebimento) mudou. Ver api/exclusoes.py
+    from .exclusoes import registrar
+    venda_id = instance.venda_id if sender is ControleDeRecebimento else None
+    registrar(sender._meta.model_name, instance.pk, venda_id)
@@ -0,0 +1,28 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacao(CursorPagination):
+    """
+    Paginação por cursor (keyset) ordenada pela chave primária, que é
+    indexada e estável: o custo de cada página independe da profundidade.
+
+    Para manter compatibilidade com os clientes atuais, a listagem só é
+    paginada quando o cliente envia ?cursor= ou ?page_size=, exceto com
+    `sempre_paginar` (listagens assíncronas).
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    sempre_paginar = False
+
+    def paginacao_solicitada(self, request):
+        if self.sempre_paginar:
+            return True
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.paginacao_solicitada(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,103 @@
+# backend/api/perfis.py
+"""
+Perfis de requisições sob demanda, gravados pelo PerfilMiddleware.
+
+Cada perfil tem dois arquivos em settings.PERFIS_DIR: <id>.prof (estatísticas
+do cProfile, abertas com pstats ou snakeviz) e <id>.json (dados da
+requisição, resumo das funções mais custosas e a linha do tempo das
+consultas SQL). O diretório funciona como um buffer circular: ao gravar,
+os perfis mais antigos além de settings.PERFIS_MAXIMO são removidos.
+"""
+
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+# <nanossegundos>-<8 hex>: ordena pela criação e não permite caminhos
+FORMATO_ID = re.compile(r'^\d{19,}-[0-9a-f]{8}$')
+
+
+def _caminho(perfil_id, extensao):
+    return os.path.join(settings.PERFIS_DIR, f'{perfil_id}.{extensao}')
+
+
+def caminho_prof(perfil_id):
+    """Caminho do arquivo .prof, ou None se o ID for inválido ou o perfil não existir."""
+    if not FORMATO_ID.match(perfil_id):
+        return None
+    caminho = _caminho(perfil_id, 'prof')
+    return caminho if os.path.exists(caminho) else None
+
+
+def salvar(profiler, dados, consultas):
+    """Grava o perfil e retorna o ID. `consultas` é a linha do tempo (início, duração, sql)."""
+    os.makedirs(settings.PERFIS_DIR, exist_ok=True)
+    perfil_id = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+
+    profiler.dump_stats(_caminho(perfil_id, 'prof'))
+    resumo = io.StringIO()
+    pstats.Stats(profiler, stream=resumo).sort_stats('cumulative').print_stats(40)
+    registro = dict(
+        dados,
+        id=perfil_id,
+        criado_em=timezone.now().isoformat(),
+        resumo=resumo.getvalue(),
+        sql=[
+            {'inicio': round(inicio * 1000, 3), 'duracao': round(duracao * 1000, 3), 'sql': sql}
+            for inicio, duracao, sql in consultas
+        ],
+    )
+    with open(_caminho(perfil_id, 'json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(registro, arquivo, ensure_ascii=False)
+
+    _descartar_antigos()
+    return perfil_id
+
+
+def _ids():
+    try:
+        nomes = os.listdir(settings.PERFIS_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(nome[:-5] for nome in nomes if nome.endswith('.json') and FORMATO_ID.match(nome[:-5]))
+
+
+def _descartar_antigos():
+    ids = _ids()
+    for perfil_id in ids[:max(0, len(ids) - settings.PERFIS_MAXIMO)]:
+        for extensao in ('json', 'prof'):
+            try:
+                os.remove(_caminho(perfil_id, extensao))
+            except FileNotFoundError:
+                # Já removido por outro processo
+                pass
+
+
+def carregar(perfil_id):
+    """Registro completo do perfil, ou None se não existir."""
+    if not FORMATO_ID.match(perfil_id):
+        return None
+    try:
+        with open(_caminho(perfil_id, 'json'), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return None
+
+
+def listar():
+    """Perfis guardados, do mais recente ao mais antigo, sem o resumo e a linha do tempo."""
+    perfis = []
+    for perfil_id in reversed(_ids()):
+        registro = carregar(perfil_id)
+        if registro is not None:
+            registro.pop('resumo', None)
+            registro.pop('sql', None)
+            perfis.append(registro)
+    return perfis
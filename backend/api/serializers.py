@@ -1,5 +1,15 @@
+import os
 from rest_framework import serializers
-from .models import Plano, Parcela, Consultor, Venda, ControleDeRecebimento
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from .cache import invalidar
+from .cronograma import criar_vendas_em_lote, sincronizar_recebimentos_em_lote
+from .fluxo_caixa import atualizando
+from .models import Plano, Parcela, Consultor, Venda, ControleDeRecebimento, Tarefa
+from .tarefas import enfileirar, salvar_entrada
 from django.contrib.auth.models import User
 
 class UserSerializer(serializers.ModelSerializer):
@@ -17,43 +27,292 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
+class CamposDinamicosMixin:
+    """
+    Permite ao cliente escolher a representação pela query string:
+
+    - ?fields=id,plano,valor_plano limita os campos retornados;
+    - ?expand=plano,consultor expande apenas as relações listadas; as demais
+      relações de `campos_expansiveis` são devolvidas como IDs. Sem o
+      parâmetro, todas continuam expandidas.
+    """
+    # nome do campo -> função que cria o campo "plano" (somente IDs)
+    campos_expansiveis = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+
+        expandir = self.relacoes_expandidas(request)
+        for nome, criar_campo_plano in self.campos_expansiveis.items():
+            if nome in self.fields and nome not in expandir:
+                self.fields[nome] = criar_campo_plano()
+
+        campos = self.campos_solicitados(request)
+        if campos is not None:
+            for nome in set(self.fields) - campos:
+                self.fields.pop(nome)
+
+    @staticmethod
+    def _lista_param(request, nome):
+        valor = request.query_params.get(nome)
+        if valor is None:
+            return None
+        return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+    @classmethod
+    def campos_solicitados(cls, request):
+        return cls._lista_param(request, 'fields')
+
+    @classmethod
+    def relacoes_expandidas(cls, request):
+        expandir = cls._lista_param(request, 'expand')
+        return set(cls.campos_expansiveis) if expandir is None else expandir
+
+
+class ChavePrimariaPrecarregada(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField que usa os objetos pré-carregados pela ListaEmLoteSerializer."""
+    precarregados = None
+
+    def to_internal_value(self, data):
+        if self.precarregados is not None and self.pk_field is None and not isinstance(data, bool):
+            objeto = self.precarregados.get(str(data))
+            if objeto is not None:
+                return objeto
+        # Sem pré-carga ou chave inexistente: consulta e mensagens de erro padrão
+        return super().to_internal_value(data)
+
+
+def _valor_chave(valor):
+    return valor.pk if isinstance(valor, models.Model) else valor
+
+
+class ListaEmLoteSerializer(serializers.ListSerializer):
+    """
+    Criação e atualização de listas com bulk_create/bulk_update.
+
+    A validação é feita em uma passada: as chaves estrangeiras de todos os
+    itens são carregadas com um in_bulk por campo, e as restrições de
+    unicidade são conferidas com uma consulta por restrição (em vez de uma
+    por item), além das repetições dentro do próprio lote. A gravação fica a
+    cargo de criar_em_lote()/atualizar_em_lote() do serializer filho.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._precarregar_relacionados(data)
+        restricoes = self._extrair_validadores_unicos()
+        self._alvos = []
+        validados = super().to_internal_value(data)
+        self._validar_unicidade(validados, restricoes)
+        return validados
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+        if not hasattr(self, '_instancias'):
+            self._instancias = {instancia.pk: instancia for instancia in self.instance}
+        try:
+            alvo = self._instancias.get(int(data.get('id')))
+        except (AttributeError, TypeError, ValueError):
+            alvo = None
+        if alvo is None:
+            raise serializers.ValidationError({'id': ['Informe o ID de um registro existente.']})
+        self.child.instance = alvo
+        self.child.initial_data = data
+        validado = super().run_child_validation(data)
+        self._alvos.append(alvo)
+        return validado
+
+    def _precarregar_relacionados(self, data):
+        for nome, campo in self.child.fields.items():
+            if isinstance(campo, ChavePrimariaPrecarregada) and not campo.read_only:
+                ids = {
+                    str(item[nome]) for item in data
+                    if isinstance(item, dict) and isinstance(item.get(nome), (int, str)) and str(item[nome]).isdigit()
+                }
+                campo.precarregados = {
+                    str(pk): objeto for pk, objeto in campo.get_queryset().in_bulk(ids).items()
+                }
+
+    def _extrair_validadores_unicos(self):
+        """Remove os validadores de unicidade do filho e devolve (queryset, campos, fontes) de cada um."""
+        restricoes = []
+        validadores = []
+        for validador in self.child.validators:
+            if isinstance(validador, UniqueTogetherValidator):
+                fontes = [self.child.fields[nome].source for nome in validador.fields]
+                restricoes.append((validador.queryset, list(validador.fields), fontes))
+            else:
+                validadores.append(validador)
+        self.child.validators = validadores
+        for nome, campo in self.child.fields.items():
+            unicos = [validador for validador in campo.validators if isinstance(validador, UniqueValidator)]
+            if unicos:
+                campo.validators = [validador for validador in campo.validators if validador not in unicos]
+                restricoes.append((unicos[0].queryset, [nome], [campo.source]))
+        return restricoes
+
+    def _validar_unicidade(self, validados, restricoes):
+        erros = [{} for _ in validados]
+        alvos = self._alvos if self.instance is not None else [None] * len(validados)
+        for queryset, nomes, fontes in restricoes:
+            chaves = []
+            for dados, alvo in zip(validados, alvos):
+                if alvo is None and any(fonte not in dados for fonte in fontes):
+                    chaves.append(None)
+                    continue
+                chaves.append(tuple(
+                    _valor_chave(dados[fonte] if fonte in dados else getattr(alvo, fonte)) for fonte in fontes
+                ))
+            preenchidas = [chave for chave in chaves if chave is not None and None not in chave]
+            if not preenchidas:
+                continue
+            filtro = {f'{fonte}__in': {chave[i] for chave in preenchidas} for i, fonte in enumerate(fontes)}
+            existentes = queryset.filter(**filtro).exclude(pk__in=[alvo.pk for alvo in alvos if alvo is not None])
+            # values_list devolve as chaves estrangeiras como IDs, como _valor_chave
+            cadastradas = set(existentes.values_list(*fontes))
+            vistas = set()
+            mensagem = f"Já existe um registro com estes valores de {', '.join(nomes)}."
+            for indice, chave in enumerate(chaves):
+                if chave is None or None in chave:
+                    continue
+                if chave in cadastradas or chave in vistas:
+                    erros[indice].setdefault(api_settings.NON_FIELD_ERRORS_KEY, []).append(mensagem)
+                vistas.add(chave)
+        if any(erros):
+            raise serializers.ValidationError(erros)
+
+    def create(self, validated_data):
+        modelo = self.child.Meta.model
+        return self.child.criar_em_lote([modelo(**dados) for dados in validated_data])
+
+    def update(self, instance, validated_data):
+        campos = set()
+        for alvo, dados in zip(self._alvos, validated_data):
+            for atributo, valor in dados.items():
+                setattr(alvo, atributo, valor)
+            campos.update(dados)
+        if campos:
+            self.child.atualizar_em_lote(self._alvos, sorted(campos))
+        return self._alvos
+
+
+class EmLoteMixin:
+    """
+    Gravação em lote para o ListaEmLoteSerializer (Meta.list_serializer_class).
+    `chave_natural` identifica os registros criados quando o banco não devolve
+    as chaves primárias do bulk_create (ex.: MySQL).
+    """
+    serializer_related_field = ChavePrimariaPrecarregada
+    chave_natural = ()
+
+    def criar_em_lote(self, instancias):
+        modelo = self.Meta.model
+        modelo.objects.bulk_create(instancias)
+        if any(instancia.pk is None for instancia in instancias):
+            attnames = [modelo._meta.get_field(campo).attname for campo in self.chave_natural]
+            filtro = {
+                f'{attname}__in': {getattr(instancia, attname) for instancia in instancias} for attname in attnames
+            }
+            ids = {tuple(valores[:-1]): valores[-1] for valores in modelo.objects.filter(**filtro).values_list(*attnames, 'pk')}
+            for instancia in instancias:
+                instancia.pk = ids[tuple(getattr(instancia, attname) for attname in attnames)]
+                instancia._state.adding = False
+        return instancias
+
+    def atualizar_em_lote(self, instancias, campos):
+        self.Meta.model.objects.bulk_update(instancias, campos)
+        return instancias
+
+
 #class ClienteSerializer(serializers.ModelSerializer):
 #    class Meta:
 #        model = Cliente
 #        fields = '__all__'
 
-class PlanoSerializer(serializers.ModelSerializer):
+class PlanoSerializer(EmLoteMixin, CamposDinamicosMixin, serializers.ModelSerializer):
+    chave_natural = ('operadora', 'tipo')
+
     class Meta:
         model = Plano
         fields = '__all__'
+        list_serializer_class = ListaEmLoteSerializer
+
+    def criar_em_lote(self, instancias):
+        super().criar_em_lote(instancias)
+        invalidar(Plano)
+        return instancias
+
+    def atualizar_em_lote(self, instancias, campos):
+        super().atualizar_em_lote(instancias, campos)
+        invalidar(Plano)
+        # bulk_update não passa por Plano.save(): recalcula as vendas dos planos alterados
+        for plano in instancias:
+            if plano._valores_anteriores != plano._capturar_valores():
+                plano.recalcular_vendas()
+            else:
+                plano.marcar_vendas_alteradas()
+        return instancias
+
+class ParcelaSerializer(EmLoteMixin, CamposDinamicosMixin, serializers.ModelSerializer):
+    chave_natural = ('plano', 'numero_parcela')
 
-class ParcelaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Parcela
         fields = '__all__'
+        list_serializer_class = ListaEmLoteSerializer
+
+    def criar_em_lote(self, instancias):
+        super().criar_em_lote(instancias)
+        invalidar(Parcela)
+        return instancias
 
-class ConsultorSerializer(serializers.ModelSerializer):
+    def atualizar_em_lote(self, instancias, campos):
+        super().atualizar_em_lote(instancias, campos)
+        invalidar(Parcela)
+        return instancias
+
+class ConsultorSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Consultor
         fields = '__all__'
 
 
 
-class ControleDeRecebimentoSerializer(serializers.ModelSerializer):
+class ControleDeRecebimentoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = ControleDeRecebimento
         fields = '__all__'
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Querysets anotados com com_status_efetivo() exibem o status já considerando o vencimento
+        status_efetivo = getattr(instance, 'status_efetivo', None)
+        if status_efetivo and 'status' in data:
+            data['status'] = status_efetivo
+        return data
+
+
+class VendaSerializer(EmLoteMixin, CamposDinamicosMixin, serializers.ModelSerializer):
+    campos_expansiveis = {
+        'plano': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'consultor': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'parcelas_recebimento': lambda: serializers.PrimaryKeyRelatedField(
+            source='controlederecebimento_set', many=True, read_only=True
+        ),
+    }
 
-class VendaSerializer(serializers.ModelSerializer):
     # Representação para leitura
     plano = PlanoSerializer(read_only=True)
     consultor = ConsultorSerializer(read_only=True)
     parcelas_recebimento = ControleDeRecebimentoSerializer(source='controlederecebimento_set', many=True, read_only=True)
     
     # Campos para escrita: esses campos irão receber os IDs
-    plano_id = serializers.PrimaryKeyRelatedField(queryset=Plano.objects.all(), write_only=True, source='plano')
-    consultor_id = serializers.PrimaryKeyRelatedField(queryset=Consultor.objects.all(), write_only=True, source='consultor')
+    plano_id = ChavePrimariaPrecarregada(queryset=Plano.objects.all(), write_only=True, source='plano')
+    consultor_id = ChavePrimariaPrecarregada(queryset=Consultor.objects.all(), write_only=True, source='consultor')
     
     class Meta:
         model = Venda
@@ -75,11 +334,153 @@ class VendaSerializer(serializers.ModelSerializer):
             'data_vencimento',
             'parcelas_recebimento',
             'canal_entrada',
+            'valor_liquido',
+            'comissao_prevista',
+            'updated_at',
         ]
+        read_only_fields = ['valor_liquido', 'comissao_prevista', 'updated_at']
+        list_serializer_class = ListaEmLoteSerializer
 
     def create(self, validated_data):
         venda = Venda.objects.create(**validated_data)
         return venda
 
+    def criar_em_lote(self, instancias):
+        criar_vendas_em_lote(instancias)
+        return instancias
+
+    def atualizar_em_lote(self, instancias, campos):
+        agora = timezone.now()
+        with atualizando(Q(venda_id__in=[venda.pk for venda in instancias])):
+            for venda in instancias:
+                venda.atualizar_valores()
+                venda.updated_at = agora
+            Venda.objects.bulk_update(instancias, list(campos) + list(Venda.CAMPOS_CALCULADOS) + ['updated_at'])
+            # Regenera (por diferença) apenas os cronogramas afetados
+            sincronizar_recebimentos_em_lote([venda for venda in instancias if venda.cronograma_alterado()])
+        return instancias
+
+
+class ParcelaSimuladaSerializer(serializers.Serializer):
+    numero_parcela = serializers.IntegerField(min_value=1)
+    porcentagem_parcela = serializers.DecimalField(max_digits=6, decimal_places=2)
+
+
+class AlteracaoPlanoSerializer(serializers.Serializer):
+    """Alteração hipotética de planos, identificados por `id` ou por `operadora` (e `tipo`)."""
+    id = serializers.IntegerField(required=False)
+    operadora = serializers.CharField(required=False)
+    tipo = serializers.ChoiceField(choices=Plano.TIPO_CHOICES, required=False)
+    taxa_plano_valor = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    taxa_plano_tipo = serializers.ChoiceField(choices=Plano.TAXA_TIPO_CHOICES, required=False)
+    parcelas = ParcelaSimuladaSerializer(many=True, required=False)
+
+    def validate(self, attrs):
+        if attrs.get('id') is None and not attrs.get('operadora'):
+            raise serializers.ValidationError("Informe o 'id' do plano ou a 'operadora'.")
+        numeros = [parcela['numero_parcela'] for parcela in attrs.get('parcelas', [])]
+        if len(numeros) != len(set(numeros)):
+            raise serializers.ValidationError({'parcelas': ["Números de parcela repetidos."]})
+        return attrs
+
+
+class SimulacaoSerializer(serializers.Serializer):
+    planos = AlteracaoPlanoSerializer(many=True, required=False)
+    data_inicio = serializers.DateField(required=False)
+    data_fim = serializers.DateField(required=False)
+    consultor = serializers.IntegerField(required=False)
+    operadora = serializers.CharField(required=False)
+    tipo = serializers.ChoiceField(choices=Plano.TIPO_CHOICES, required=False)
+
+    def parametros(self):
+        """Argumentos de simulacao.simular() a partir dos dados validados."""
+        dados = dict(self.validated_data)
+        dados['alteracoes'] = dados.pop('planos', [])
+        return dados
+
+
+class ParametrosImportacaoSerializer(serializers.Serializer):
+    upsert = serializers.BooleanField(default=False)
+    workers = serializers.IntegerField(min_value=1, max_value=8, default=1)
+
+
+class ParametrosExportacaoSerializer(serializers.Serializer):
+    formato = serializers.ChoiceField(choices=['csv', 'xlsx', 'parquet'], default='csv')
+    data_inicio = serializers.DateField(required=False)
+    data_fim = serializers.DateField(required=False)
+    consultor = serializers.IntegerField(required=False)
+
 
+class ParametrosCronogramasSerializer(serializers.Serializer):
+    plano = serializers.PrimaryKeyRelatedField(queryset=Plano.objects.all(), required=False)
 
+    def to_internal_value(self, data):
+        dados = super().to_internal_value(data)
+        if 'plano' in dados:
+            dados['plano'] = dados['plano'].pk
+        return dados
+
+
+# tipo de tarefa -> parâmetros aceitos
+PARAMETROS_TAREFAS = {
+    'importar_vendas': ParametrosImportacaoSerializer,
+    'exportar_vendas': ParametrosExportacaoSerializer,
+    'exportar_recebimentos': ParametrosExportacaoSerializer,
+    'regenerar_cronogramas': ParametrosCronogramasSerializer,
+    'reconstruir_fluxo_caixa': serializers.Serializer,
+}
+
+
+class TarefaSerializer(serializers.ModelSerializer):
+    """
+    Criação (tipo, parametros e, para importar_vendas, o `arquivo` enviado
+    como multipart) e acompanhamento de tarefas em segundo plano.
+    """
+    arquivo = serializers.FileField(write_only=True, required=False)
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Tarefa
+        fields = [
+            'id', 'tipo', 'parametros', 'arquivo', 'status', 'progresso', 'mensagem', 'resultado', 'erro',
+            'download', 'criada_em', 'iniciada_em', 'concluida_em',
+        ]
+        read_only_fields = [
+            'status', 'progresso', 'mensagem', 'resultado', 'erro', 'criada_em', 'iniciada_em', 'concluida_em',
+        ]
+
+    def get_download(self, obj):
+        if obj.status != 'concluida' or not obj.arquivo_saida:
+            return None
+        request = self.context.get('request')
+        caminho = f'/api/jobs/{obj.pk}/download/'
+        return request.build_absolute_uri(caminho) if request else caminho
+
+    def validate_parametros(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Informe um objeto JSON.")
+        return value
+
+    def validate(self, attrs):
+        parametros = PARAMETROS_TAREFAS[attrs['tipo']](data=attrs.get('parametros', {}))
+        if not parametros.is_valid():
+            raise serializers.ValidationError({'parametros': parametros.errors})
+        attrs['parametros'] = parametros.validated_data
+
+        arquivo = attrs.get('arquivo')
+        if attrs['tipo'] == 'importar_vendas':
+            if arquivo is None:
+                raise serializers.ValidationError({'arquivo': ["Envie o arquivo XLSX ou CSV a importar."]})
+            if os.path.splitext(arquivo.name)[1].lower() not in ('.xlsx', '.csv'):
+                raise serializers.ValidationError({'arquivo': ["Use um arquivo .xlsx ou .csv."]})
+        elif arquivo is not None:
+            raise serializers.ValidationError({'arquivo': ["Este tipo de tarefa não recebe arquivo."]})
+        return attrs
+
+    def create(self, validated_data):
+        arquivo = validated_data.pop('arquivo', None)
+        return enfileirar(
+            validated_data['tipo'], validated_data['parametros'],
+            usuario=self.context['request'].user,
+            arquivo_entrada=salvar_entrada(arquivo) if arquivo is not None else '',
+        )
@@ -0,0 +1,255 @@
+# backend/api/simulacao.py
+"""
+Projeção vetorizada do fluxo de caixa das comissões, com simulação de
+alterações nos planos ("e se a operadora X mudar as porcentagens das
+parcelas ou a taxa do plano?") sem gravar nada no banco.
+
+Vendas, planos, parcelas e recebimentos já registrados são carregados em
+DataFrames e o cronograma de todas as vendas é calculado de uma vez, com a
+mesma regra de cronograma.calcular_cronograma(): a primeira parcela incide
+sobre o valor líquido e vence 30 dias após a vigência; as demais incidem
+sobre o valor do plano e vencem 30 dias após o recebimento (ou a previsão)
+da anterior.
+
+Os valores são tratados como inteiros em unidades de 1e-8 centavo, o que
+torna as contas exatas, e arredondados para centavos como
+Decimal.quantize() (ROUND_HALF_EVEN); o resultado coincide centavo a
+centavo com os recebimentos gerados por Venda.save().
+
+Requer os pacotes opcionais numpy e pandas (requirements-opcionais.txt).
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, F, Q
+from django.db.models.functions import Cast, Round
+
+from .cronograma import PRAZO_ENTRE_PARCELAS
+from .models import Plano, Parcela, Venda, ControleDeRecebimento
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # dependências opcionais
+    np = pd = None
+
+# Valores monetários e percentuais com duas casas viram inteiros (x 100);
+# os produtos ficam em unidades de 1e-8 centavo (ESCALA por centavo).
+ESCALA = 10 ** 8
+PRAZO_DIAS = PRAZO_ENTRE_PARCELAS.days
+
+
+class SimulacaoIndisponivel(Exception):
+    pass
+
+
+def _exigir_dependencias():
+    if pd is None:
+        raise SimulacaoIndisponivel("A simulação requer os pacotes 'numpy' e 'pandas' (pip install numpy pandas).")
+
+
+def _centesimos(campo):
+    """Expressão SQL com o valor decimal (duas casas) multiplicado por 100, como inteiro."""
+    return Cast(Round(F(campo) * 100), BigIntegerField())
+
+
+def _centesimos_python(valor):
+    return int((Decimal(str(valor)) * 100).to_integral_value())
+
+
+def _arredondar(valores, divisor):
+    """Divisão inteira com arredondamento para o par mais próximo (ROUND_HALF_EVEN)."""
+    sinal = np.sign(valores)
+    quociente, resto = np.divmod(np.abs(valores), divisor)
+    sobe = (2 * resto > divisor) | ((2 * resto == divisor) & (quociente % 2 == 1))
+    return sinal * (quociente + sobe)
+
+
+def carregar_dados(consultor=None, operadora=None, tipo=None):
+    """Carrega vendas, planos, parcelas e recebimentos registrados em DataFrames."""
+    _exigir_dependencias()
+    vendas = Venda.objects.all()
+    planos = Plano.objects.all()
+    if consultor is not None:
+        vendas = vendas.filter(consultor_id=consultor)
+    if operadora:
+        vendas = vendas.filter(plano__operadora=operadora)
+        planos = planos.filter(operadora=operadora)
+    if tipo:
+        vendas = vendas.filter(plano__tipo=tipo)
+        planos = planos.filter(tipo=tipo)
+
+    df_vendas = pd.DataFrame.from_records(
+        vendas.annotate(valor=_centesimos('valor_plano'), desconto=_centesimos('desconto_consultor'))
+        .values_list('id', 'plano_id', 'consultor_id', 'valor', 'desconto', 'data_vigencia'),
+        columns=['venda_id', 'plano_id', 'consultor_id', 'valor', 'desconto', 'data_vigencia'],
+    )
+    df_planos = pd.DataFrame.from_records(
+        planos.annotate(taxa=_centesimos('taxa_plano_valor')).values_list('id', 'operadora', 'tipo', 'taxa', 'taxa_plano_tipo'),
+        columns=['plano_id', 'operadora', 'tipo', 'taxa', 'taxa_tipo'],
+    )
+    df_parcelas = pd.DataFrame.from_records(
+        Parcela.objects.filter(plano__in=planos)
+        .annotate(porcentagem=_centesimos('porcentagem_parcela'))
+        .values_list('plano_id', 'numero_parcela', 'porcentagem'),
+        columns=['plano_id', 'numero_parcela', 'porcentagem'],
+    )
+    # Só os recebimentos já registrados influenciam o cronograma
+    df_recebidos = pd.DataFrame.from_records(
+        ControleDeRecebimento.objects
+        .filter(Q(status='Recebido') | Q(data_recebimento__isnull=False), venda__in=vendas)
+        .order_by('pk')
+        .values_list('venda_id', 'parcela__numero_parcela', 'data_recebimento', 'status'),
+        columns=['venda_id', 'numero_parcela', 'data_recebimento', 'status'],
+    ).drop_duplicates(['venda_id', 'numero_parcela'])
+    return df_vendas, df_planos, df_parcelas, df_recebidos
+
+
+def aplicar_alteracoes(df_planos, df_parcelas, alteracoes):
+    """
+    Aplica as alterações de planos (sem gravar). Cada alteração identifica os
+    planos por `id` ou por `operadora` (e opcionalmente `tipo`) e pode trazer
+    taxa_plano_valor, taxa_plano_tipo e `parcelas` (lista de
+    {numero_parcela, porcentagem_parcela}, que substitui as do plano).
+    """
+    df_planos = df_planos.copy()
+    for alteracao in alteracoes:
+        if alteracao.get('id') is not None:
+            selecionados = df_planos['plano_id'] == alteracao['id']
+        else:
+            selecionados = df_planos['operadora'] == alteracao['operadora']
+            if alteracao.get('tipo'):
+                selecionados &= df_planos['tipo'] == alteracao['tipo']
+        if alteracao.get('taxa_plano_valor') is not None:
+            df_planos.loc[selecionados, 'taxa'] = _centesimos_python(alteracao['taxa_plano_valor'])
+        if alteracao.get('taxa_plano_tipo'):
+            df_planos.loc[selecionados, 'taxa_tipo'] = alteracao['taxa_plano_tipo']
+        if alteracao.get('parcelas') is not None:
+            plano_ids = df_planos.loc[selecionados, 'plano_id']
+            novas = pd.DataFrame(
+                [
+                    (plano_id, parcela['numero_parcela'], _centesimos_python(parcela['porcentagem_parcela']))
+                    for plano_id in plano_ids for parcela in alteracao['parcelas']
+                ],
+                columns=['plano_id', 'numero_parcela', 'porcentagem'],
+            )
+            df_parcelas = pd.concat(
+                [df_parcelas[~df_parcelas['plano_id'].isin(plano_ids)], novas], ignore_index=True
+            )
+    return df_planos, df_parcelas
+
+
+def projetar_recebimentos(df_vendas, df_planos, df_parcelas, df_recebidos):
+    """
+    Calcula todas as parcelas de todas as vendas. Retorna um DataFrame com
+    venda_id, plano_id, consultor_id, numero_parcela, valor (centavos),
+    data_prevista e data_recebimento (NaT quando não recebida) e recebido.
+    """
+    _exigir_dependencias()
+    parcelas = df_parcelas.sort_values(['plano_id', 'numero_parcela'], kind='stable')
+    parcelas = parcelas.assign(
+        posicao=parcelas.groupby('plano_id').cumcount(),
+        primeiro_numero=parcelas.groupby('plano_id')['numero_parcela'].transform('min'),
+    )
+    linhas = (
+        df_vendas
+        .merge(df_planos[['plano_id', 'taxa', 'taxa_tipo']], on='plano_id')
+        .merge(parcelas, on='plano_id')
+        .merge(df_recebidos, on=['venda_id', 'numero_parcela'], how='left')
+        .sort_values(['venda_id', 'posicao'], kind='stable')
+        .reset_index(drop=True)
+    )
+
+    # Valores (inteiros): base em centavos, taxa e porcentagem em centésimos
+    valor = linhas['valor'].to_numpy(dtype='int64')
+    base = valor - linhas['desconto'].to_numpy(dtype='int64')
+    taxa = linhas['taxa'].to_numpy(dtype='int64')
+    porcentagem = linhas['porcentagem'].to_numpy(dtype='int64')
+    # valor líquido em 1e-4 centavo, como Venda.calcular_valor_liquido()
+    liquido = np.where(
+        linhas['taxa_tipo'].to_numpy() == 'Porcentagem',
+        base * 10_000 - base * taxa,
+        np.where(linhas['taxa_tipo'].to_numpy() == 'Valor Fixo', (base - taxa) * 10_000, base * 10_000),
+    )
+    primeira = linhas['numero_parcela'].to_numpy() == 1
+    valores = np.where(primeira, liquido, valor * 10_000) * porcentagem
+    linhas['valor_parcela'] = _arredondar(valores, ESCALA)
+
+    # Datas: cada parcela vence PRAZO_DIAS após o recebimento da anterior ou,
+    # sem recebimento, após a previsão da anterior. A partir do último
+    # recebimento ("âncora") as previsões avançam PRAZO_DIAS por posição.
+    vigencia = pd.to_datetime(linhas['data_vigencia'])
+    recebimento = pd.to_datetime(linhas['data_recebimento'])
+    posicao = linhas['posicao']
+    ancora_data = recebimento.groupby(linhas['venda_id']).shift(1)
+    ancora_posicao = posicao.groupby(linhas['venda_id']).shift(1).where(ancora_data.notna())
+    ancora_data = ancora_data.groupby(linhas['venda_id']).ffill()
+    ancora_posicao = ancora_posicao.groupby(linhas['venda_id']).ffill()
+
+    primeira_prevista = vigencia + pd.to_timedelta(linhas['primeiro_numero'] * PRAZO_DIAS, unit='D')
+    sem_ancora = primeira_prevista + pd.to_timedelta(posicao * PRAZO_DIAS, unit='D')
+    com_ancora = ancora_data + pd.to_timedelta((posicao - ancora_posicao) * PRAZO_DIAS, unit='D')
+    linhas['data_prevista'] = com_ancora.where(ancora_data.notna(), sem_ancora)
+    linhas['data_recebimento'] = recebimento
+    linhas['recebido'] = linhas['status'] == 'Recebido'
+    return linhas[[
+        'venda_id', 'plano_id', 'consultor_id', 'numero_parcela', 'valor_parcela',
+        'data_prevista', 'data_recebimento', 'recebido',
+    ]]
+
+
+def fluxo_mensal(recebimentos, hoje=None, data_inicio=None, data_fim=None):
+    """
+    Agrupa a projeção por mês da data prevista, no formato de api/fluxo-caixa/.
+    Parcelas não recebidas com data prevista anterior a `hoje` contam como atrasadas.
+    """
+    _exigir_dependencias()
+    if recebimentos.empty:
+        return []
+    hoje = pd.Timestamp(hoje or datetime.date.today())
+    mes = recebimentos['data_prevista'].dt.to_period('M')
+    valor = recebimentos['valor_parcela']
+    recebido = recebimentos['recebido']
+    atrasado = ~recebido & (recebimentos['data_prevista'] < hoje)
+    tabela = pd.DataFrame({
+        'mes': mes,
+        'previsto': valor,
+        'recebido': valor.where(recebido, 0),
+        'pendente': valor.where(~recebido & ~atrasado, 0),
+        'atrasado': valor.where(atrasado, 0),
+        'quantidade': 1,
+    })
+    if data_inicio is not None:
+        tabela = tabela[tabela['mes'] >= pd.Period(data_inicio, 'M')]
+    if data_fim is not None:
+        tabela = tabela[tabela['mes'] <= pd.Period(data_fim, 'M')]
+    agrupado = tabela.groupby('mes').sum().sort_index()
+
+    centavos = Decimal('0.01')
+    return [
+        {
+            'mes': periodo.start_time.date(),
+            **{
+                campo: Decimal(int(linha[campo])) * centavos
+                for campo in ('previsto', 'recebido', 'pendente', 'atrasado')
+            },
+            'quantidade': int(linha['quantidade']),
+        }
+        for periodo, linha in agrupado.iterrows()
+    ]
+
+
+def simular(alteracoes=(), consultor=None, operadora=None, tipo=None, data_inicio=None, data_fim=None, hoje=None):
+    """
+    Projeta o fluxo mensal com os planos atuais e com as alterações
+    informadas. Retorna {'atual': [...], 'simulado': [...]}.
+    """
+    df_vendas, df_planos, df_parcelas, df_recebidos = carregar_dados(consultor, operadora, tipo)
+    periodo = {'hoje': hoje, 'data_inicio': data_inicio, 'data_fim': data_fim}
+    atual = fluxo_mensal(projetar_recebimentos(df_vendas, df_planos, df_parcelas, df_recebidos), **periodo)
+    if not alteracoes:
+        return {'atual': atual, 'simulado': atual}
+    df_planos, df_parcelas = aplicar_alteracoes(df_planos, df_parcelas, alteracoes)
+    simulado = fluxo_mensal(projetar_recebimentos(df_vendas, df_planos, df_parcelas, df_recebidos), **periodo)
+    return {'atual': atual, 'simulado': simulado}
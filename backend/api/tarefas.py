@@ -0,0 +1,300 @@
+# backend/api/tarefas.py
+"""
+Tarefas em segundo plano, guardadas na tabela Tarefa e executadas pelo
+comando run_jobs (sem broker externo).
+
+A API cria a tarefa com status 'pendente'; o worker a reserva com um UPDATE
+condicional (status='pendente' -> 'executando'), o que permite vários
+workers sobre a mesma tabela, executa a função registrada para o tipo e
+grava o resultado ou o erro. O progresso e a última linha de saída são
+gravados com UPDATEs diretos, no máximo uma vez por INTERVALO_PROGRESSO,
+para o frontend acompanhar em api/jobs/<id>/.
+
+Os arquivos enviados para importação e os gerados pelas exportações ficam
+em settings.TAREFAS_DIR; a API nunca recebe caminhos do cliente.
+"""
+
+import os
+import re
+import time
+import traceback
+import uuid
+
+from django.conf import settings
+from django.core.management import call_command, load_command_class
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import importacao
+from .cronograma import regenerar_cronogramas
+from .exportacao import filtrar_recebimentos, filtrar_vendas
+from .fluxo_caixa import reconstruir
+from .models import Tarefa, Venda, ControleDeRecebimento
+
+INTERVALO_PROGRESSO = 1.0  # segundos
+MAXIMO_TENTATIVAS = 3
+
+# tipo -> função(tarefa, saida) que executa a tarefa e retorna o resultado
+TIPOS = {}
+
+
+def registrar(tipo):
+    def decorador(funcao):
+        TIPOS[tipo] = funcao
+        return funcao
+    return decorador
+
+
+def caminho(nome):
+    """Caminho absoluto de um arquivo de tarefa (nome relativo a TAREFAS_DIR)."""
+    return os.path.join(settings.TAREFAS_DIR, nome)
+
+
+def _preparar(nome):
+    os.makedirs(os.path.dirname(caminho(nome)), exist_ok=True)
+    return caminho(nome)
+
+
+def salvar_entrada(arquivo):
+    """Grava um arquivo enviado (UploadedFile) em TAREFAS_DIR e retorna o nome relativo."""
+    extensao = os.path.splitext(arquivo.name)[1].lower()
+    nome = os.path.join('entrada', f'{uuid.uuid4().hex}{extensao}')
+    with open(_preparar(nome), 'wb') as destino:
+        for bloco in arquivo.chunks():
+            destino.write(bloco)
+    return nome
+
+
+def enfileirar(tipo, parametros=None, usuario=None, arquivo_entrada=''):
+    return Tarefa.objects.create(
+        tipo=tipo, parametros=parametros or {}, criado_por=usuario, arquivo_entrada=arquivo_entrada
+    )
+
+
+class SaidaTarefa:
+    """
+    Pseudo-arquivo passado como stdout dos comandos: grava a última linha
+    escrita em Tarefa.mensagem e, se `acompanhar` reconhecer a linha, o
+    percentual em Tarefa.progresso.
+    """
+
+    def __init__(self, tarefa_id, acompanhar=None):
+        self.tarefa_id = tarefa_id
+        self.acompanhar = acompanhar
+        self.ultima_linha = ''
+        self.progresso = None
+        self._gravado_em = 0.0
+
+    def write(self, texto):
+        for linha in texto.splitlines():
+            if linha.strip():
+                self.ultima_linha = linha.strip()
+                if self.acompanhar is not None:
+                    percentual = self.acompanhar(self.ultima_linha)
+                    if percentual is not None:
+                        self.progresso = percentual
+        self.gravar()
+
+    def flush(self):
+        pass
+
+    def gravar(self, forcar=False):
+        agora = time.monotonic()
+        if not forcar and agora - self._gravado_em < INTERVALO_PROGRESSO:
+            return
+        self._gravado_em = agora
+        campos = {'mensagem': self.ultima_linha[:255], 'atualizada_em': timezone.now()}
+        if self.progresso is not None:
+            campos['progresso'] = self.progresso
+        Tarefa.objects.filter(pk=self.tarefa_id).update(**campos)
+
+    def relatar(self, processados, total, mensagem):
+        """Progresso informado diretamente pelas tarefas que não usam comandos."""
+        self.ultima_linha = mensagem
+        self.progresso = _percentual(processados, total)
+        self.gravar()
+
+
+def _percentual(processados, total):
+    if not total:
+        return None
+    # 100 fica para a conclusão da tarefa
+    return max(0, min(99, processados * 100 // total))
+
+
+def por_contagem(padrao, total):
+    """Extrai o percentual de linhas como '<processados> ...' dado o total conhecido."""
+    expressao = re.compile(padrao)
+
+    def acompanhar(linha):
+        encontrado = expressao.search(linha)
+        if encontrado:
+            return _percentual(int(encontrado.group(1)), total)
+        return None
+    return acompanhar
+
+
+@registrar('importar_vendas')
+def importar_vendas(tarefa, saida):
+    from .management.commands.import_vendas import Command
+
+    arquivo = caminho(tarefa.arquivo_entrada)
+    ultima_linha = importacao.contar_linhas(arquivo)
+    if ultima_linha is None:
+        # CSV: conta as linhas (aproximado se houver campos com quebra de linha)
+        with open(arquivo, encoding='utf-8-sig') as entrada:
+            ultima_linha = sum(1 for _ in entrada)
+    saida.acompanhar = por_contagem(r'^(\d+) linhas processadas', ultima_linha - 1)
+
+    rejeitadas = os.path.join('saida', f'tarefa_{tarefa.pk}_rejeitadas.csv')
+    comando = Command(stdout=saida, stderr=saida)
+    call_command(
+        comando, arquivo,
+        upsert=tarefa.parametros.get('upsert', False),
+        workers=tarefa.parametros.get('workers', 1),
+        reject_file=_preparar(rejeitadas),
+    )
+    if comando.total_rejeitados:
+        tarefa.arquivo_saida = rejeitadas
+    else:
+        os.remove(caminho(rejeitadas))
+    return {
+        'importadas': comando.count,
+        'atualizadas': comando.atualizadas,
+        'rejeitadas': comando.total_rejeitados,
+    }
+
+
+def _exportar(tarefa, saida, nome_comando, queryset):
+    parametros = tarefa.parametros
+    filtros = {nome: parametros.get(nome) for nome in ('data_inicio', 'data_fim', 'consultor')}
+    formato = parametros.get('formato', 'csv')
+    saida.acompanhar = por_contagem(r'^(\d+) linhas exportadas', queryset.count())
+
+    nome = os.path.join('saida', f'tarefa_{tarefa.pk}.{formato}')
+    opcoes = {nome_opcao: valor for nome_opcao, valor in filtros.items() if valor is not None}
+    comando = load_command_class('api', nome_comando)
+    call_command(comando, _preparar(nome), formato=formato, verbosity=2, stdout=saida, **opcoes)
+    tarefa.arquivo_saida = nome
+    # A mensagem do comando traz o caminho no servidor
+    saida.ultima_linha = f"Exportação concluída: {comando.total} linhas."
+    return {'linhas': comando.total}
+
+
+@registrar('exportar_vendas')
+def exportar_vendas(tarefa, saida):
+    parametros = tarefa.parametros
+    vendas = filtrar_vendas(
+        Venda.objects.all(), parametros.get('data_inicio'), parametros.get('data_fim'), parametros.get('consultor')
+    )
+    return _exportar(tarefa, saida, 'export_vendas', vendas)
+
+
+@registrar('exportar_recebimentos')
+def exportar_recebimentos(tarefa, saida):
+    parametros = tarefa.parametros
+    recebimentos = filtrar_recebimentos(
+        ControleDeRecebimento.objects.all(),
+        parametros.get('data_inicio'), parametros.get('data_fim'), parametros.get('consultor')
+    )
+    return _exportar(tarefa, saida, 'export_recebimentos', recebimentos)
+
+
+@registrar('regenerar_cronogramas')
+def regenerar(tarefa, saida):
+    def relatar_progresso(processadas, total):
+        saida.relatar(processadas, total, f"{processadas} de {total} vendas processadas")
+
+    criados, alterados, removidos = regenerar_cronogramas(
+        tarefa.parametros.get('plano'), progresso=relatar_progresso
+    )
+    saida.ultima_linha = (
+        f"Cronogramas regenerados: {criados} recebimentos criados, {alterados} alterados e {removidos} removidos."
+    )
+    return {'criados': criados, 'alterados': alterados, 'removidos': removidos}
+
+
+@registrar('reconstruir_fluxo_caixa')
+def reconstruir_fluxo_caixa(tarefa, saida):
+    total = reconstruir()
+    saida.ultima_linha = f"Fluxo de caixa reconstruído: {total} linhas no resumo."
+    return {'linhas': total}
+
+
+def reservar(limite):
+    """Passa até `limite` tarefas pendentes (as mais antigas) para 'executando' e retorna seus IDs."""
+    candidatas = list(
+        Tarefa.objects.filter(status='pendente').order_by('criada_em', 'pk').values_list('pk', flat=True)[:limite * 2]
+    )
+    reservadas = []
+    for tarefa_id in candidatas:
+        agora = timezone.now()
+        # Outro worker pode ter reservado a mesma tarefa entre a leitura e o UPDATE
+        if Tarefa.objects.filter(pk=tarefa_id, status='pendente').update(
+            status='executando', iniciada_em=agora, atualizada_em=agora, tentativas=F('tentativas') + 1
+        ):
+            reservadas.append(tarefa_id)
+            if len(reservadas) >= limite:
+                break
+    return reservadas
+
+
+def renovar(tarefa_ids):
+    """Sinaliza que as tarefas continuam em execução."""
+    if tarefa_ids:
+        Tarefa.objects.filter(pk__in=tarefa_ids, status='executando').update(atualizada_em=timezone.now())
+
+
+def reenfileirar_interrompidas(prazo):
+    """
+    Devolve à fila as tarefas 'executando' sem renovação há mais de `prazo`
+    (worker encerrado no meio da execução); após MAXIMO_TENTATIVAS, marca erro.
+    Retorna (reenfileiradas, com_erro).
+    """
+    agora = timezone.now()
+    interrompidas = Tarefa.objects.filter(status='executando', atualizada_em__lt=agora - prazo)
+    com_erro = interrompidas.filter(tentativas__gte=MAXIMO_TENTATIVAS).update(
+        status='erro', mensagem='Execução interrompida.', erro='Worker interrompido durante a execução.',
+        concluida_em=agora, atualizada_em=agora
+    )
+    reenfileiradas = interrompidas.update(
+        status='pendente', progresso=0, mensagem='Reenfileirada após interrupção do worker.', atualizada_em=agora
+    )
+    return reenfileiradas, com_erro
+
+
+def executar(tarefa_id):
+    """Executa uma tarefa já reservada e grava o resultado. Retorna o status final."""
+    try:
+        tarefa = Tarefa.objects.get(pk=tarefa_id)
+        saida = SaidaTarefa(tarefa.pk)
+        try:
+            resultado = TIPOS[tarefa.tipo](tarefa, saida)
+        except Exception as e:
+            agora = timezone.now()
+            Tarefa.objects.filter(pk=tarefa.pk).update(
+                status='erro', mensagem=str(e)[:255], erro=traceback.format_exc(),
+                concluida_em=agora, atualizada_em=agora
+            )
+            return 'erro'
+        finally:
+            if tarefa.arquivo_entrada and os.path.exists(caminho(tarefa.arquivo_entrada)):
+                os.remove(caminho(tarefa.arquivo_entrada))
+
+        agora = timezone.now()
+        Tarefa.objects.filter(pk=tarefa.pk).update(
+            status='concluida', progresso=100, mensagem=saida.ultima_linha[:255], resultado=resultado,
+            arquivo_saida=tarefa.arquivo_saida, concluida_em=agora, atualizada_em=agora
+        )
+        return 'concluida'
+    finally:
+        # Cada thread do worker tem sua própria conexão
+        connections.close_all()
+
+
+def inicializar_processo():
+    """Inicializador dos processos do worker (necessário no método 'spawn')."""
+    import django
+    django.setup()
+
@@ -1,5 +1,5 @@
-from rest_framework import viewsets, generics, status
-from .models import Plano, Parcela, Consultor, Venda, ControleDeRecebimento
+from rest_framework import viewsets, generics, mixins, status
+from .models import Plano, Parcela, Consultor, Venda, ControleDeRecebimento, FluxoCaixaMensal, Exclusao, Tarefa, filtro_atrasados
 from .serializers import (
     UserSerializer,
     PlanoSerializer,
@@ -7,14 +7,41 @@ from .serializers import (
     ConsultorSerializer,
     VendaSerializer,
     ControleDeRecebimentoSerializer,
+    SimulacaoSerializer,
+    TarefaSerializer,
 )
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils import timezone
-from rest_framework.decorators import api_view
-from datetime import date
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes
+from datetime import date, datetime, timedelta
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django.contrib.auth.models import User
+from django.db.models import Q, F, Count, Sum, Max, Exists, OuterRef, DecimalField
+from django.db.models.functions import TruncMonth
+from django.utils.dateparse import parse_date, parse_datetime
+from decimal import Decimal
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ParseError, ValidationError
+from rest_framework.settings import api_settings
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .cache import chave, versoes
+from .cronograma import registrar_recebimentos
+from .exclusoes import excluindo
+from . import metricas, perfis, simulacao, tarefas
+from .filtros import FiltroListagem
+from .middleware import usuario_autenticado
+from .exportacao import COLUNAS_RECEBIMENTOS, filtrar_vendas, filtrar_recebimentos, iterar_em_blocos
+import csv
+import hashlib
+import hmac
+import os
+import zlib
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -25,55 +52,704 @@ class RegisterView(generics.CreateAPIView):
 #    serializer_class = ClienteSerializer
 #    permission_classes = [IsAuthenticated]
 
-class PlanoViewSet(viewsets.ModelViewSet):
+class ListagemEmCacheMixin:
+    """
+    Guarda a listagem no cache enquanto as versões de `modelos_cache` não
+    mudam e responde 304 quando o ETag/Last-Modified do cliente é o atual.
+    """
+    modelos_cache = ()
+
+    def list(self, request, *args, **kwargs):
+        versoes_atuais = versoes(*self.modelos_cache)
+        if versoes_atuais is None:
+            return super().list(request, *args, **kwargs)
+
+        etag = '"%s"' % '-'.join(map(str, versoes_atuais))
+        ultima_alteracao = max(versoes_atuais) // 1_000_000_000
+        nao_modificado = get_conditional_response(request, etag=etag, last_modified=ultima_alteracao)
+        if nao_modificado is not None:
+            return nao_modificado
+
+        chave_lista = chave('lista', versoes_atuais, self.basename, request.build_absolute_uri())
+        dados = cache.get(chave_lista)
+        if dados is None:
+            dados = super().list(request, *args, **kwargs).data
+            cache.set(chave_lista, dados)
+        response = Response(dados)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(ultima_alteracao)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+class OperacoesEmLoteMixin:
+    """
+    Operações em lote, cada uma em uma única transação:
+
+    - POST na listagem com uma lista de objetos cria todos (bulk_create);
+    - PATCH em <rota>/bulk/ com uma lista de objetos com 'id' altera apenas
+      os campos enviados (bulk_update);
+    - DELETE em <rota>/bulk/ com uma lista de IDs exclui todos.
+
+    A validação é feita antes de gravar qualquer item; se algum for inválido,
+    nada é gravado e a resposta traz os erros na posição de cada item.
+    """
+    MAXIMO_ITENS_LOTE = 1000
+
+    def _ler_lote(self, request):
+        itens = request.data
+        if not isinstance(itens, list) or not itens:
+            raise ParseError("Envie uma lista não vazia.")
+        if len(itens) > self.MAXIMO_ITENS_LOTE:
+            raise ParseError(f"Envie no máximo {self.MAXIMO_ITENS_LOTE} itens por requisição.")
+        return itens
+
+    def _gravar_lote(self, serializer, status_resposta):
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                instancias = serializer.save()
+        except IntegrityError as e:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [str(e)]})
+        # Relê os registros para devolver a representação completa e atual
+        gravados = self.get_queryset().filter(pk__in=[instancia.pk for instancia in instancias]).order_by('pk')
+        return Response(self.get_serializer(gravados, many=True).data, status=status_resposta)
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        itens = self._ler_lote(request)
+        return self._gravar_lote(self.get_serializer(data=itens, many=True), status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        itens = self._ler_lote(request)
+        if request.method == 'DELETE':
+            return self._excluir_em_lote(itens)
+        ids = {item.get('id') for item in itens if isinstance(item, dict) and isinstance(item.get('id'), int)}
+        instancias = list(self.get_queryset().prefetch_related(None).filter(pk__in=ids))
+        serializer = self.get_serializer(instancias, data=itens, many=True, partial=True)
+        return self._gravar_lote(serializer, status.HTTP_200_OK)
+
+    def _excluir_em_lote(self, ids):
+        if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            raise ParseError("Envie uma lista de IDs inteiros.")
+        queryset = self.get_queryset().prefetch_related(None).filter(pk__in=ids)
+        with transaction.atomic():
+            encontrados = set(queryset.select_for_update().values_list('pk', flat=True))
+            faltando = sorted(set(ids) - encontrados)
+            if faltando:
+                raise NotFound(f"Registros não encontrados: {', '.join(map(str, faltando))}.")
+            # Tombstones e fluxo de caixa gravados em conjunto (api/exclusoes.py)
+            with excluindo(queryset.model, sorted(encontrados)):
+                queryset.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class PlanoViewSet(OperacoesEmLoteMixin, ListagemEmCacheMixin, viewsets.ModelViewSet):
     queryset = Plano.objects.all()
     serializer_class = PlanoSerializer
     permission_classes = [IsAuthenticated]
+    modelos_cache = (Plano,)
 
-class ParcelaViewSet(viewsets.ModelViewSet):
+class ParcelaViewSet(OperacoesEmLoteMixin, ListagemEmCacheMixin, viewsets.ModelViewSet):
     queryset = Parcela.objects.all()
     serializer_class = ParcelaSerializer
     permission_classes = [IsAuthenticated]
+    modelos_cache = (Parcela,)
 
-class ConsultorViewSet(viewsets.ModelViewSet):
+class ConsultorViewSet(ListagemEmCacheMixin, viewsets.ModelViewSet):
     queryset = Consultor.objects.all()
     serializer_class = ConsultorSerializer
     permission_classes = [IsAuthenticated]
+    modelos_cache = (Consultor,)
+
+class SincronizacaoMixin:
+    """
+    Sincronização incremental e GET condicional da listagem.
+
+    - ?changed_since=<data e hora ISO 8601> devolve só os registros alterados
+      depois do instante informado (`alterados`), os IDs excluídos desde então
+      (`excluidos`) e o `sincronizado_em` a enviar na próxima chamada. O
+      intervalo recua MARGEM_SINCRONIZACAO para não perder transações
+      confirmadas depois do instante anterior; registros repetidos devem ser
+      simplesmente sobrescritos pelo cliente.
+    - As listagens não paginadas enviam um ETag calculado a partir da
+      quantidade e da última alteração dos registros. Com If-None-Match, o
+      ETag é conferido com uma única consulta de agregação antes de carregar
+      os registros, e a resposta é 304 quando nada mudou. O ETag inclui as
+      versões de cache (api/cache.py) dos `modelos_aninhados`, serializados
+      dentro de cada registro, e um resumo da query string, já que filtros e
+      ordenação mudam a resposta sem mudar a quantidade ou a última alteração.
+    """
+    modelo_exclusao = None
+    modelos_aninhados = ()
+    MARGEM_SINCRONIZACAO = timedelta(minutes=1)
+
+    def filtro_alterados(self, desde):
+        return Q(updated_at__gt=desde)
+
+    def agregados_impressao(self):
+        return {'quantidade': Count('id', distinct=True), 'ultima_alteracao': Max('updated_at')}
+
+    def impressao(self, instancias):
+        # Deve coincidir com agregados_impressao() aplicado às mesmas instâncias
+        return {
+            'quantidade': len(instancias),
+            'ultima_alteracao': max((instancia.updated_at for instancia in instancias), default=None),
+        }
+
+    def impressao_aninhados(self):
+        if not self.modelos_aninhados:
+            return {}
+        # None quando algum deles foi alterado na transação em andamento
+        versoes_atuais = versoes(*self.modelos_aninhados) or ()
+        return {'versoes_aninhados': '.'.join(map(str, versoes_atuais))}
+
+    def impressao_consulta(self, request):
+        consulta = request.META.get('QUERY_STRING', '').encode()
+        return {'consulta': hashlib.sha1(consulta).hexdigest()[:16]}
+
+    @staticmethod
+    def _etag(*impressoes):
+        partes = []
+        for impressao in impressoes:
+            for nome in sorted(impressao):
+                valor = impressao[nome]
+                if isinstance(valor, datetime):
+                    valor = int(valor.timestamp() * 1_000_000)
+                partes.append(str(valor))
+        return '"%s"' % '-'.join(partes)
+
+    def _nao_modificado(self, request, calcular_etag):
+        if 'HTTP_IF_NONE_MATCH' not in request.META:
+            return None
+        return get_conditional_response(request, etag=calcular_etag())
+
+    def list(self, request, *args, **kwargs):
+        if 'changed_since' in request.query_params:
+            return self.listar_alteracoes(request)
+        if self.paginator is not None and self.paginator.paginacao_solicitada(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        aninhados = self.impressao_aninhados()
+        consulta = self.impressao_consulta(request)
+        nao_modificado = self._nao_modificado(
+            request, lambda: self._etag(queryset.aggregate(**self.agregados_impressao()), aninhados, consulta)
+        )
+        if nao_modificado is not None:
+            return nao_modificado
+        instancias = list(queryset)
+        response = Response(self.get_serializer(instancias, many=True).data)
+        response['ETag'] = self._etag(self.impressao(instancias), aninhados, consulta)
+        return response
+
+    def listar_alteracoes(self, request):
+        desde = parse_datetime(request.query_params['changed_since'])
+        if desde is None:
+            raise ParseError("Parâmetro 'changed_since' inválido. Use data e hora no formato ISO 8601.")
+        if timezone.is_naive(desde):
+            desde = timezone.make_aware(desde)
+        sincronizado_em = timezone.now()
+        desde -= self.MARGEM_SINCRONIZACAO
 
-class VendaViewSet(viewsets.ModelViewSet):
-    queryset = Venda.objects.all()
+        alterados = self.filter_queryset(self.get_queryset()).filter(self.filtro_alterados(desde))
+        exclusoes = Exclusao.objects.filter(modelo=self.modelo_exclusao, excluido_em__gt=desde)
+        aninhados = self.impressao_aninhados()
+        consulta = self.impressao_consulta(request)
+        nao_modificado = self._nao_modificado(request, lambda: self._etag(
+            alterados.aggregate(**self.agregados_impressao()),
+            exclusoes.aggregate(exclusoes=Count('id'), ultima_exclusao=Max('excluido_em')),
+            aninhados,
+            consulta,
+        ))
+        if nao_modificado is not None:
+            return nao_modificado
+
+        instancias = list(alterados)
+        excluidos = list(exclusoes.values_list('objeto_id', 'excluido_em'))
+        response = Response({
+            'sincronizado_em': sincronizado_em,
+            'alterados': self.get_serializer(instancias, many=True).data,
+            'excluidos': [objeto_id for objeto_id, _ in excluidos],
+        })
+        response['ETag'] = self._etag(self.impressao(instancias), {
+            'exclusoes': len(excluidos),
+            'ultima_exclusao': max((excluido_em for _, excluido_em in excluidos), default=None),
+        }, aninhados, consulta)
+        return response
+
+class VendaViewSet(OperacoesEmLoteMixin, SincronizacaoMixin, viewsets.ModelViewSet):
+    # Carrega plano, consultor e recebimentos em número constante de consultas
+    queryset = Venda.objects.select_related('plano', 'consultor').prefetch_related('controlederecebimento_set')
     serializer_class = VendaSerializer
     permission_classes = [IsAuthenticated]
+    modelo_exclusao = 'venda'
+    # plano e consultor são serializados dentro de cada venda
+    modelos_aninhados = (Plano, Consultor)
+    filter_backends = [FiltroListagem]
+    filtros_periodo = {'data_venda': 'data_venda', 'data_vigencia': 'data_vigencia'}
+    filtros_valor = {
+        'consultor': ('consultor_id', int),
+        'plano': ('plano_id', int),
+        'operadora': ('plano__operadora', str),
+        'canal_entrada': ('canal_entrada', str),
+    }
+    campos_ordenacao = {
+        campo: campo for campo in (
+            'id', 'numero_proposta', 'cliente_nome', 'data_venda', 'data_vigencia',
+            'valor_plano', 'valor_liquido', 'comissao_prevista',
+        )
+    }
+    prefixo_busca = ''
+
+    def inclui_parcelas(self):
+        campos = VendaSerializer.campos_solicitados(self.request)
+        return campos is None or 'parcelas_recebimento' in campos
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.inclui_parcelas():
+            queryset = queryset.prefetch_related(None)
+        return queryset
+
+    # A representação inclui os recebimentos: alterações neles também contam
+    def filtro_alterados(self, desde):
+        recebimentos_alterados = ControleDeRecebimento.objects.filter(venda=OuterRef('pk'), updated_at__gt=desde)
+        return Q(updated_at__gt=desde) | Q(Exists(recebimentos_alterados))
+
+    def agregados_impressao(self):
+        agregados = super().agregados_impressao()
+        if self.inclui_parcelas():
+            agregados['ultima_alteracao_parcelas'] = Max('controlederecebimento__updated_at')
+        return agregados
 
-class ControleDeRecebimentoViewSet(viewsets.ModelViewSet):
+    def impressao(self, instancias):
+        impressao = super().impressao(instancias)
+        if self.inclui_parcelas():
+            impressao['ultima_alteracao_parcelas'] = max(
+                (
+                    recebimento.updated_at
+                    for venda in instancias
+                    for recebimento in venda.controlederecebimento_set.all()
+                ),
+                default=None,
+            )
+        return impressao
+
+class ControleDeRecebimentoViewSet(SincronizacaoMixin, viewsets.ModelViewSet):
     queryset = ControleDeRecebimento.objects.all()
     serializer_class = ControleDeRecebimentoSerializer
     permission_classes = [IsAuthenticated]
+    modelo_exclusao = 'controlederecebimento'
+    filter_backends = [FiltroListagem]
+    filtros_periodo = {
+        'data_prevista_recebimento': 'data_prevista_recebimento',
+        'data_venda': 'venda__data_venda',
+        'data_vigencia': 'venda__data_vigencia',
+    }
+    filtros_valor = {
+        'venda': ('venda_id', int),
+        'status': ('status', str),
+        'consultor': ('venda__consultor_id', int),
+        'plano': ('venda__plano_id', int),
+        'operadora': ('venda__plano__operadora', str),
+        'canal_entrada': ('venda__canal_entrada', str),
+    }
+    campos_ordenacao = {
+        campo: campo for campo in ('id', 'data_prevista_recebimento', 'valor_parcela', 'status')
+    }
+    prefixo_busca = 'venda__'
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        CSV em streaming dos recebimentos, com dados da venda, plano e consultor.
+        Aceita data_inicio, data_fim, consultor, status e gzip=1.
+        """
+        recebimentos = filtrar_recebimentos(ControleDeRecebimento.objects.all(), **ler_filtros(request))
+        status_param = request.query_params.get('status')
+        if status_param:
+            recebimentos = recebimentos.filter(status=status_param)
+
+        compactar = request.query_params.get('gzip') in ('1', 'true')
+        conteudo = _linhas_csv(recebimentos, COLUNAS_RECEBIMENTOS)
+        nome_arquivo = 'recebimentos.csv'
+        content_type = 'text/csv; charset=utf-8'
+        if compactar:
+            conteudo = _compactar_gzip(conteudo)
+            nome_arquivo += '.gz'
+            content_type = 'application/gzip'
+
+        response = StreamingHttpResponse(conteudo, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+        return response
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de armazená-la."""
+    def write(self, valor):
+        return valor
+
+
+def _linhas_csv(queryset, colunas):
+    writer = csv.writer(_Eco())
+    yield writer.writerow([cabecalho for cabecalho, _, _ in colunas]).encode('utf-8')
+    for linhas in iterar_em_blocos(queryset, colunas):
+        yield ''.join(writer.writerow(linha) for linha in linhas).encode('utf-8')
+
+
+def _compactar_gzip(blocos):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for bloco in blocos:
+        dados = compressor.compress(bloco)
+        if dados:
+            yield dados
+    yield compressor.flush()
+
+class SimulacaoView(APIView):
+    """
+    Projeção do fluxo de caixa mensal com alterações hipotéticas nos planos,
+    calculada em memória (api/simulacao.py) sem gravar nada.
+
+    Corpo: {"planos": [{"id" ou "operadora" (+ "tipo"), "taxa_plano_valor",
+    "taxa_plano_tipo", "parcelas": [{"numero_parcela", "porcentagem_parcela"}]}],
+    "data_inicio", "data_fim", "consultor", "operadora", "tipo"}; todos
+    opcionais. A resposta traz o fluxo mensal atual e o simulado.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = SimulacaoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            resultado = simulacao.simular(**serializer.parametros())
+        except simulacao.SimulacaoIndisponivel as e:
+            return Response({'detail': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(resultado)
+
+
+
+class TarefaViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                    viewsets.GenericViewSet):
+    """
+    Tarefas em segundo plano (api/tarefas.py), executadas pelo comando run_jobs.
+
+    POST cria a tarefa e responde 202 com o registro a acompanhar em
+    api/jobs/<id>/ (status, progresso, mensagem, resultado). Corpo:
+    {"tipo", "parametros"}; importar_vendas é enviada como multipart com
+    o campo `arquivo` e "parametros" em JSON. Quando a tarefa gera um
+    arquivo (exportações, linhas rejeitadas na importação), `download`
+    aponta para api/jobs/<id>/download/.
+    Cada usuário vê as próprias tarefas; administradores veem todas.
+    """
+    serializer_class = TarefaSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Tarefa.objects.order_by('-criada_em', '-pk')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(criado_por=self.request.user)
+        status_param = self.request.query_params.get('status')
+        if status_param:
+            queryset = queryset.filter(status=status_param)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        response['Location'] = f"/api/jobs/{response.data['id']}/"
+        return response
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        tarefa = self.get_object()
+        if tarefa.status != 'concluida' or not tarefa.arquivo_saida:
+            raise NotFound("A tarefa não gerou arquivo.")
+        try:
+            arquivo = open(tarefas.caminho(tarefa.arquivo_saida), 'rb')
+        except FileNotFoundError:
+            raise NotFound("O arquivo da tarefa não está mais disponível.")
+        return FileResponse(arquivo, as_attachment=True, filename=os.path.basename(tarefa.arquivo_saida))
+
+
+class PerfilViewSet(viewsets.ViewSet):
+    """
+    Perfis gravados pelo PerfilMiddleware (api/perfis.py), só para
+    administradores: a listagem traz os dados de cada requisição; o
+    detalhe inclui o resumo do cProfile e a linha do tempo do SQL; e
+    api/perfis/<id>/download/ devolve o arquivo .prof.
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        return Response(perfis.listar())
+
+    def retrieve(self, request, pk=None):
+        registro = perfis.carregar(pk)
+        if registro is None:
+            raise NotFound("Perfil não encontrado.")
+        return Response(registro)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        caminho = perfis.caminho_prof(pk)
+        if caminho is None:
+            raise NotFound("Perfil não encontrado.")
+        return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=f'{pk}.prof')
 
 class ParcelasAtrasadasList(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        hoje = date.today()
-        # Atualizar status para 'Atrasado' se data prevista < hoje e status ainda for 'Não Recebido'
-        ControleDeRecebimento.objects.filter(
-            status='Não Recebido',
-            data_prevista_recebimento__lt=hoje
-        ).update(status='Atrasado')
-
-        # Obter parcelas com status 'Atrasado'
-        parcelas_atrasadas = ControleDeRecebimento.objects.filter(status='Atrasado')
+        # Leitura pura: as parcelas vencidas ainda não varridas pelo sweep_overdue
+        # já são consideradas atrasadas pela consulta
+        parcelas_atrasadas = ControleDeRecebimento.objects.atrasados().com_status_efetivo()
         serializer = ControleDeRecebimentoSerializer(parcelas_atrasadas, many=True)
         return Response(serializer.data)
 
 @api_view(['POST'])
 def marcar_parcela_recebida(request, pk):
     try:
-        parcela = ControleDeRecebimento.objects.get(pk=pk)
+        parcela = ControleDeRecebimento.objects.select_related('parcela').get(pk=pk)
     except ControleDeRecebimento.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
     
     parcela.status = 'Recebido'
     parcela.data_recebimento = timezone.now().date()
     parcela.save()
-    return Response(status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response(status=status.HTTP_200_OK)
+
+
+MAXIMO_MARCACOES = 1000
+
+def _ler_marcacao(item, hoje):
+    """Valida um item de marcar-recebidas e devolve (id, data_recebimento, numero_extrato)."""
+    if not isinstance(item, dict):
+        raise ValueError("item deve ser um objeto")
+    pk = item.get('id')
+    if not isinstance(pk, int) or isinstance(pk, bool):
+        raise ValueError("'id' deve ser um inteiro")
+    data_recebimento = hoje
+    if item.get('data_recebimento'):
+        data_recebimento = parse_date(str(item['data_recebimento']))
+        if data_recebimento is None:
+            raise ValueError("'data_recebimento' inválida; use AAAA-MM-DD")
+    numero_extrato = item.get('numero_extrato')
+    if numero_extrato is not None:
+        numero_extrato = str(numero_extrato)
+        if len(numero_extrato) > 100:
+            raise ValueError("'numero_extrato' deve ter no máximo 100 caracteres")
+    return pk, data_recebimento, numero_extrato
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def marcar_parcelas_recebidas(request):
+    """
+    Marca várias parcelas como recebidas (conciliação de extrato).
+
+    Corpo: lista de {id, data_recebimento (opcional, padrão hoje),
+    numero_extrato (opcional)}. Todas as marcações válidas são gravadas em
+    uma única transação; a resposta traz o resultado de cada item.
+    """
+    itens = request.data
+    if not isinstance(itens, list) or not itens:
+        raise ParseError("Envie uma lista não vazia de parcelas.")
+    if len(itens) > MAXIMO_MARCACOES:
+        raise ParseError(f"Envie no máximo {MAXIMO_MARCACOES} parcelas por requisição.")
+
+    hoje = timezone.now().date()
+    resultados = []
+    marcacoes = {}
+    for item in itens:
+        try:
+            pk, data_recebimento, numero_extrato = _ler_marcacao(item, hoje)
+            if pk in marcacoes:
+                raise ValueError("parcela repetida na requisição")
+        except ValueError as e:
+            resultados.append({'id': item.get('id') if isinstance(item, dict) else None, 'sucesso': False, 'erro': str(e)})
+            continue
+        marcacoes[pk] = (data_recebimento, numero_extrato)
+        resultados.append({'id': pk, 'sucesso': True})
+
+    encontrados = registrar_recebimentos(marcacoes) if marcacoes else set()
+    for resultado in resultados:
+        if resultado['sucesso'] and resultado['id'] not in encontrados:
+            resultado.update(sucesso=False, erro='parcela não encontrada')
+    return Response({
+        'marcadas': len(encontrados),
+        'resultados': resultados,
+    })
+
+
+def ler_filtros(request):
+    """Lê data_inicio, data_fim (AAAA-MM-DD) e consultor (ID) da query string."""
+    filtros = {}
+    for nome in ('data_inicio', 'data_fim'):
+        valor = request.query_params.get(nome)
+        if valor:
+            data = parse_date(valor)
+            if data is None:
+                raise ParseError(f"Parâmetro '{nome}' inválido. Use o formato AAAA-MM-DD.")
+            filtros[nome] = data
+    consultor = request.query_params.get('consultor')
+    if consultor:
+        if not consultor.isdigit():
+            raise ParseError("Parâmetro 'consultor' inválido.")
+        filtros['consultor'] = int(consultor)
+    return filtros
+
+
+VALOR_MONETARIO = DecimalField(max_digits=14, decimal_places=2)
+
+def _somar(campo, filtro=None):
+    return Sum(campo, filter=filtro, default=Decimal('0.00'), output_field=VALOR_MONETARIO)
+
+
+def consultas_indicadores(filtros):
+    """
+    Consultas (ainda não executadas) dos indicadores, na ordem da resposta:
+    {nome: (queryset, agregações)} para os totais e {nome: queryset} para
+    os agrupamentos. Compartilhadas pela IndicadoresView e pela versão
+    assíncrona (api/assincrono.py), que só diferem em como as executam.
+    """
+    vendas = filtrar_vendas(Venda.objects.all(), **filtros)
+    recebimentos = filtrar_recebimentos(ControleDeRecebimento.objects.all(), **filtros)
+
+    # valor_liquido e comissao_prevista são colunas persistidas em Venda
+    metricas_vendas = {
+        'quantidade': Count('id'),
+        'volume': _somar('valor_plano'),
+        'valor_liquido': _somar('valor_liquido'),
+        'comissao_prevista': _somar('comissao_prevista'),
+    }
+
+    hoje = date.today()
+    atrasado = filtro_atrasados(hoje)
+    metricas_recebimentos = {
+        'quantidade': Count('id'),
+        'previsto': _somar('valor_parcela'),
+        'recebido': _somar('valor_parcela', Q(status='Recebido')),
+        'pendente': _somar('valor_parcela', Q(status='Não Recebido', data_prevista_recebimento__gte=hoje)),
+        'atrasado': _somar('valor_parcela', atrasado),
+        'quantidade_recebida': Count('id', filter=Q(status='Recebido')),
+        'quantidade_atrasada': Count('id', filter=atrasado),
+    }
+
+    def agrupar(queryset, metricas, *campos, **renomear):
+        if renomear:
+            queryset = queryset.annotate(**renomear)
+        return queryset.values(*campos).annotate(**metricas).order_by(*campos)
+
+    totais = {
+        'vendas': (vendas, metricas_vendas),
+        'comissoes': (recebimentos, metricas_recebimentos),
+    }
+    agrupamentos = {
+        'por_consultor': agrupar(
+            vendas, metricas_vendas, 'consultor_id', 'consultor_nome', consultor_nome=F('consultor__nome')
+        ),
+        'por_operadora': agrupar(vendas, metricas_vendas, 'operadora', operadora=F('plano__operadora')),
+        'por_tipo': agrupar(vendas, metricas_vendas, 'tipo', tipo=F('plano__tipo')),
+        'por_canal': agrupar(vendas, metricas_vendas, 'canal_entrada'),
+        'por_mes': agrupar(vendas, metricas_vendas, 'mes', mes=TruncMonth('data_venda')),
+        'recebimentos_por_mes': agrupar(
+            recebimentos, metricas_recebimentos, 'mes', mes=TruncMonth('data_prevista_recebimento')
+        ),
+    }
+    return totais, agrupamentos
+
+
+def completar_indicadores(indicadores):
+    """Acrescenta os valores derivados aos resultados das consultas_indicadores()."""
+    resumo_vendas = indicadores['vendas']
+    quantidade = resumo_vendas['quantidade']
+    # Ticket médio: volume vendido (valor_plano) por venda, como nos dashboards
+    resumo_vendas['ticket_medio'] = (
+        (resumo_vendas['volume'] / quantidade).quantize(Decimal('0.01')) if quantidade else Decimal('0.00')
+    )
+    return indicadores
+
+
+class IndicadoresView(APIView):
+    """
+    Indicadores agregados no banco de dados para os dashboards.
+
+    Parâmetros opcionais: data_inicio, data_fim (AAAA-MM-DD) e consultor (ID).
+    O período filtra as vendas por data_venda e os recebimentos por
+    data_prevista_recebimento, como nos dashboards.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        totais, agrupamentos = consultas_indicadores(ler_filtros(request))
+        indicadores = {nome: queryset.aggregate(**metricas) for nome, (queryset, metricas) in totais.items()}
+        indicadores.update({nome: list(queryset) for nome, queryset in agrupamentos.items()})
+        return Response(completar_indicadores(indicadores))
+
+
+class FluxoCaixaView(APIView):
+    """
+    Fluxo de caixa mensal das comissões, lido do resumo FluxoCaixaMensal.
+
+    Parâmetros opcionais: data_inicio, data_fim (AAAA-MM-DD, aplicados ao mês
+    da data prevista), consultor (ID), operadora, tipo e agrupar
+    (operadora, tipo ou consultor). Parcelas vencidas passam a contar como
+    atrasadas quando o comando sweep_overdue as marca.
+    """
+    permission_classes = [IsAuthenticated]
+    AGRUPAMENTOS = {
+        'operadora': ('operadora', F('plano__operadora')),
+        'tipo': ('tipo', F('plano__tipo')),
+        'consultor': ('consultor_nome', F('consultor__nome')),
+    }
+
+    def get(self, request):
+        filtros = ler_filtros(request)
+        resumo = FluxoCaixaMensal.objects.all()
+        if 'data_inicio' in filtros:
+            resumo = resumo.filter(mes__gte=filtros['data_inicio'].replace(day=1))
+        if 'data_fim' in filtros:
+            resumo = resumo.filter(mes__lte=filtros['data_fim'])
+        if 'consultor' in filtros:
+            resumo = resumo.filter(consultor_id=filtros['consultor'])
+        for campo in ('operadora', 'tipo'):
+            valor = request.query_params.get(campo)
+            if valor:
+                resumo = resumo.filter(**{f'plano__{campo}': valor})
+
+        campos = ['mes']
+        agrupar = request.query_params.get('agrupar')
+        if agrupar:
+            if agrupar not in self.AGRUPAMENTOS:
+                raise ParseError("Parâmetro 'agrupar' inválido. Use operadora, tipo ou consultor.")
+            nome, expressao = self.AGRUPAMENTOS[agrupar]
+            if agrupar == 'consultor':
+                campos.append('consultor_id')
+            resumo = resumo.annotate(**{nome: expressao})
+            campos.append(nome)
+
+        linhas = resumo.values(*campos).annotate(
+            previsto=_somar('valor_total'),
+            recebido=_somar('valor_total', Q(status='Recebido')),
+            pendente=_somar('valor_total', Q(status='Não Recebido')),
+            atrasado=_somar('valor_total', Q(status='Atrasado')),
+            quantidade=Sum('quantidade', default=0),
+        ).order_by(*campos)
+        return Response(list(linhas))
+
+
+def metricas_prometheus(request):
+    """
+    Métricas de desempenho por visão no formato texto do Prometheus. Fica
+    fora do DRF para que o token do coletor não passe pela autenticação JWT.
+    Exige o token METRICAS_TOKEN ou um usuário staff; sem token configurado,
+    só staff.
+    """
+    token = settings.METRICAS_TOKEN
+    autorizado = bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not autorizado:
+        usuario = usuario_autenticado(request)
+        if usuario is None or not usuario.is_staff:
+            return HttpResponse(status=403)
+    return HttpResponse(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -49,6 +49,7 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CursorPaginacao',
 }
 
 SIMPLE_JWT = {
@@ -59,6 +60,7 @@ SIMPLE_JWT = {
 
 
 MIDDLEWARE = [
+    'api.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,8 +69,35 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.PerfilMiddleware',
 ]
 
+# Métricas por visão (api/metricas.py), expostas em api/metrics/ no formato do
+# Prometheus. O endpoint atende usuários staff e, com METRICAS_TOKEN definido,
+# o coletor que enviar "Authorization: Bearer <token>"; sem token
+# configurado, só staff. Requisições acima de METRICAS_LIMITE_LENTA
+# segundos e consultas repetidas METRICAS_LIMITE_REPETICOES vezes ou mais
+# (possível N+1) são registradas no log 'api.desempenho'.
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+METRICAS_LIMITE_LENTA = config('METRICAS_LIMITE_LENTA', default=1.0, cast=float)
+METRICAS_LIMITE_REPETICOES = config('METRICAS_LIMITE_REPETICOES', default=10, cast=int)
+
+# Perfis sob demanda (X-Profile: 1 ou ?profile=1, só staff): buffer circular
+# com os PERFIS_MAXIMO mais recentes, listados em api/perfis/.
+PERFIS_DIR = config('PERFIS_DIR', default=os.path.join(BASE_DIR, 'perfis'))
+PERFIS_MAXIMO = config('PERFIS_MAXIMO', default=50, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': config('API_LOG_LEVEL', default='INFO')},
+    },
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
@@ -101,17 +130,41 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Configurável pelo .env para rodar os benchmarks (seed_benchmark e
+# run_benchmarks) num banco local dedicado, ex.: DB_ENGINE=django.db.backends.sqlite3
+# e DB_NAME=benchmark.sqlite3. Os padrões são os do banco de desenvolvimento.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'application',          
-        'USER': 'alazzari',           
-        'PASSWORD': 'Default8465@!',  
-        'HOST': 'localhost',         
-        'PORT': '3306',              
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.mysql'),
+        'NAME': config('DB_NAME', default='application'),
+        'USER': config('DB_USER', default='alazzari'),
+        'PASSWORD': config('DB_PASSWORD', default='Default8465@!'),
+        'HOST': config('DB_HOST', default='localhost'),
+        'PORT': config('DB_PORT', default='3306'),
     }
 }
 
+# Só para benchmarks: milissegundos de espera somados a cada consulta, para
+# simular um banco remoto quando o local responde em microssegundos
+# (ex.: benchmark_asgi --latencia-ms). Zero desliga.
+DB_LATENCIA_SIMULADA_MS = config('DB_LATENCIA_SIMULADA_MS', default=0, cast=float)
+
+
+# Cache dos dados de referência (planos, parcelas e consultores). O backend
+# em arquivo é compartilhado pelos processos do servidor, o que mantém a
+# invalidação consistente; CACHE_BACKEND permite trocar por Redis/Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache')),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=86400, cast=int),
+    }
+}
+
+
+# Tarefas em segundo plano (api/tarefas.py): arquivos enviados para
+# importação e arquivos gerados pelas exportações, fora do repositório.
+TAREFAS_DIR = config('TAREFAS_DIR', default=os.path.join(BASE_DIR, 'tarefas'))
 
 
 # Password validation
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import routers
-from api import views
+from api import assincrono, views
 from rest_framework_simplejwt.views import ( # type: ignore
     TokenObtainPairView,
     TokenRefreshView,
@@ -15,12 +15,25 @@ router.register(r'controlederecebimento', views.ControleDeRecebimentoViewSet)
 router.register(r'parcela', views.ParcelaViewSet)
 router.register(r'plano', views.PlanoViewSet)
 router.register(r'venda', views.VendaViewSet)
+router.register(r'jobs', views.TarefaViewSet, basename='tarefa')
+router.register(r'perfis', views.PerfilViewSet, basename='perfil')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
     path('api/parcelas-atrasadas/', views.ParcelasAtrasadasList.as_view(), name='parcelas-atrasadas'),
     path('api/parcelas/<int:pk>/marcar-recebida/', views.marcar_parcela_recebida, name='marcar-parcela-recebida'),
+    path('api/parcelas/marcar-recebidas/', views.marcar_parcelas_recebidas, name='marcar-parcelas-recebidas'),
+    path('api/indicadores/', views.IndicadoresView.as_view(), name='indicadores'),
+    path('api/fluxo-caixa/', views.FluxoCaixaView.as_view(), name='fluxo-caixa'),
+    path('api/simulacao/', views.SimulacaoView.as_view(), name='simulacao'),
+    path('api/metrics/', views.metricas_prometheus, name='metricas'),
+
+    # Leituras assíncronas para o servidor ASGI (api/assincrono.py)
+    path('api/async/parcelas-atrasadas/', assincrono.parcelas_atrasadas, name='parcelas-atrasadas-async'),
+    path('api/async/venda/', assincrono.listar_vendas, name='venda-async'),
+    path('api/async/controlederecebimento/', assincrono.listar_recebimentos, name='controlederecebimento-async'),
+    path('api/async/indicadores/', assincrono.indicadores, name='indicadores-async'),
     
     # Rotas de autenticação JWT
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),